@@ -0,0 +1,367 @@
+# assembler.py
+# Text assembler for the simulator's ISA, and a loader that caches the
+# assembled program on disk.
+#
+#   prog = load_program("kernel.s")      # AsmProgram, from the cache when the source is unchanged
+#   sim = Tomasulo(prog.instructions, config=prog.fit(Config()))
+#   prog.load_memory(sim.memory)
+#
+# Source format (one statement per line, ';' starts a comment, case-insensitive
+# mnemonics and registers):
+#
+#       .equ    N, 4            ; named constant
+#       .data                   ; data section: .org / .word / .space
+#       .org    16              ; next data word goes to address 16
+#   xs: .word   5, 7, -1, 0x10  ; consecutive words; values may be symbols
+#   buf: .space N               ; N zero words
+#       .text                   ; code section (the default)
+#   start:
+#       LD      R1, xs          ; R1 = mem[xs]
+#       LD      R2, xs+1(R0)    ; address = imm(base)
+#       ADD     R3, R1, R2
+#       ADD     R4, R3, #N      ; second source may be an immediate
+#       MUL     R5, R4, R1
+#       ST      R5, 4(R6)       ; mem[R6 + 4] = R5
+#       NOP
+#   loop:
+#       SUB     R1, R1, #1
+#       BNE     R1, loop        ; branch if R1 != 0 (BEQ / BNE / BLT / BGE)
+#       BLT     R2, R3, start   ; branch if R2 < R3
+#       JMP     done            ; unconditional
+#   done:
+#
+# Immediates are decimal, 0x hex or a symbol (label or .equ) with an
+# optional +/- offset, with or without a leading '#'. Data labels are word
+# addresses, code labels instruction indices. A branch target may be one past
+# the last instruction, which ends the program.
+#
+# Assembled programs are PackedPrograms (the 12-byte records of
+# instruction.py / trace_file.py), which the simulator decodes without any
+# parsing. load_program() keeps them in a cache directory keyed by a hash of
+# the source text, so reloading a large program (sweeps, the GUI) costs
+# one file read.
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from instruction import Instruction, Opcode, PackedProgram, reg_name
+from register_file import INT64_MIN, INT64_MAX
+
+ALU_OPS = ("ADD", "SUB", "MUL", "DIV")
+BRANCH_OPS = ("BEQ", "BNE", "BLT", "BGE")
+IMM_MIN, IMM_MAX = -(1 << 31), (1 << 31) - 1   # Instruction.RECORD stores a signed 32-bit immediate
+REG_MAX = 0xFFFF                               # and 16-bit register numbers
+
+_REG = re.compile(r"[Rr](\d+)$")
+_MEM = re.compile(r"(.*?)\(\s*([Rr]\d+)\s*\)$")           # imm(Rb) / (Rb)
+_EXPR = re.compile(r"([A-Za-z_.][\w.]*)\s*([+-]\s*\w+)?$")  # symbol[+-offset]
+_LABEL = re.compile(r"([A-Za-z_.][\w.]*)\s*:")
+
+
+class AsmError(ValueError):
+    def __init__(self, name: str, line: int, message: str):
+        super().__init__(f"{name}:{line}: {message}")
+        self.line = line
+
+
+@dataclass
+class AsmProgram:
+    instructions: PackedProgram
+    data: List[Tuple[int, List[int]]] = field(default_factory=list)  # (address, words), like sweep's mem_init
+    labels: Dict[str, int] = field(default_factory=dict)
+    num_registers: int = 0   # highest register used + 1
+
+    @property
+    def data_end(self) -> int:
+        """First address after the initialized data (memory must be at least this large)."""
+        return max((addr + len(words) for addr, words in self.data), default=0)
+
+    def load_memory(self, memory):
+        for addr, words in self.data:
+            memory.store_range(addr, words)
+
+    def fit(self, config):
+        """config, grown if needed to hold the program's registers and data."""
+        from dataclasses import replace
+        return replace(config, num_registers=max(config.num_registers, self.num_registers),
+                       mem_size=max(config.mem_size, self.data_end))
+
+    def __len__(self):
+        return len(self.instructions)
+
+
+def _int(text: str) -> int:
+    return int(text.replace(" ", ""), 0)
+
+
+class _Assembler:
+    def __init__(self, name: str):
+        self.name = name
+        self.symbols: Dict[str, int] = {}
+        self.labels: Dict[str, int] = {}
+        self.line = 0
+
+    def error(self, message: str):
+        raise AsmError(self.name, self.line, message)
+
+    def value(self, text: str) -> int:
+        """Immediate: integer or symbol[+-offset], optional leading '#'."""
+        text = text.strip()
+        if text.startswith("#"):
+            text = text[1:].strip()
+        if not text:
+            self.error("missing value")
+        try:
+            return _int(text)
+        except ValueError:
+            pass
+        m = _EXPR.match(text)
+        if not m:
+            self.error(f"bad value {text!r}")
+        sym, offset = m.group(1), m.group(2)
+        if sym not in self.symbols:
+            self.error(f"undefined symbol {sym!r}")
+        try:
+            return self.symbols[sym] + (_int(offset) if offset else 0)
+        except ValueError:
+            self.error(f"bad offset in {text!r}")
+
+    def imm(self, text: str) -> int:
+        v = self.value(text)
+        if not IMM_MIN <= v <= IMM_MAX:
+            self.error(f"immediate {v} does not fit in 32 bits")
+        return v
+
+    def reg(self, text: str) -> int:
+        m = _REG.match(text.strip())
+        if not m:
+            self.error(f"expected a register, got {text.strip()!r}")
+        r = int(m.group(1))
+        if r > REG_MAX:
+            self.error(f"register R{r} out of range")
+        self.max_reg = max(self.max_reg, r)
+        return r
+
+    def address(self, text: str) -> Tuple[Optional[int], int]:
+        """Memory operand: imm(Rb) / (Rb) / imm -> (base register or None, offset)."""
+        text = text.strip()
+        m = _MEM.match(text)
+        if m:
+            return self.reg(m.group(2)), (self.imm(m.group(1)) if m.group(1).strip() else 0)
+        return None, self.imm(text)
+
+    def split(self, text: str) -> Tuple[Optional[str], str, str]:
+        """Strip the comment and a leading label; returns (label, mnemonic / directive, operands)."""
+        text = text.split(";", 1)[0].strip()
+        label = None
+        m = _LABEL.match(text)
+        if m:
+            label, text = m.group(1), text[m.end():].strip()
+        parts = text.split(None, 1)
+        if not parts:
+            return label, "", ""
+        return label, parts[0], parts[1].strip() if len(parts) > 1 else ""
+
+    def run(self, source: str) -> AsmProgram:
+        lines = source.splitlines()
+        # pass 1: symbols (code labels count instructions, data labels words)
+        section, pc, addr = ".text", 0, 0
+        for self.line, text in enumerate(lines, 1):
+            label, op, args = self.split(text)
+            op = op.lower()
+            if op in (".text", ".data"):
+                section = op
+            elif op == ".org":
+                addr = self.value(args)
+            if label is not None:
+                if label in self.symbols:
+                    self.error(f"symbol {label!r} defined twice")
+                self.symbols[label] = pc if section == ".text" else addr
+                self.labels[label] = self.symbols[label]
+            if op == ".equ":
+                name, sep, val = args.partition(",")
+                if not sep or not name.strip():
+                    self.error(".equ needs NAME, VALUE")
+                if name.strip() in self.symbols:
+                    self.error(f"symbol {name.strip()!r} defined twice")
+                self.symbols[name.strip()] = self.value(val)
+            elif op == ".word":
+                addr += len(args.split(","))
+            elif op == ".space":
+                addr += self.value(args)
+            elif op and not op.startswith("."):
+                if section != ".text":
+                    self.error("instruction in the .data section")
+                pc += 1
+        # pass 2: encode
+        self.code_size = pc
+        self.max_reg = -1
+        prog = PackedProgram()
+        data: List[Tuple[int, List[int]]] = []
+        section, addr = ".text", 0
+        for self.line, text in enumerate(lines, 1):
+            _, op, args = self.split(text)
+            if not op:
+                continue
+            op = op.upper()
+            if op.startswith("."):
+                op = op.lower()
+                if op in (".org", ".word", ".space") and section != ".data":
+                    self.error(f"{op} outside the .data section")
+                if op in (".text", ".data"):
+                    section = op
+                elif op == ".org":
+                    addr = self.value(args)
+                    if addr < 0:
+                        self.error("negative .org address")
+                elif op == ".word":
+                    words = [self.value(v) for v in args.split(",")]
+                    if not all(INT64_MIN <= w <= INT64_MAX for w in words):
+                        self.error("data word does not fit in 64 bits")
+                    if data and data[-1][0] + len(data[-1][1]) == addr:
+                        data[-1][1].extend(words)
+                    else:
+                        data.append((addr, words))
+                    addr += len(words)
+                elif op == ".space":
+                    n = self.value(args)
+                    if n < 0:
+                        self.error("negative .space size")
+                    addr += n
+                elif op != ".equ":
+                    self.error(f"unknown directive {op}")
+                continue
+            prog.append(self.instruction(op, [a for a in args.split(",")] if args else []))
+        return AsmProgram(prog, data, dict(self.labels), self.max_reg + 1)
+
+    def instruction(self, op: str, args: List[str]) -> Instruction:
+        def need(n):
+            if len(args) != n:
+                self.error(f"{op} takes {n} operands, got {len(args)}")
+        if op == "NOP":
+            need(0)
+            return Instruction(Opcode.NOP)
+        if op in ALU_OPS:
+            need(3)
+            rd, rs1 = self.reg(args[0]), self.reg(args[1])
+            if _REG.match(args[2].strip()):
+                return Instruction(op, dest=reg_name(rd), src1=reg_name(rs1), src2=reg_name(self.reg(args[2])))
+            return Instruction(op, dest=reg_name(rd), src1=reg_name(rs1), imm=self.imm(args[2]))
+        if op in ("LD", "ST"):
+            need(2)
+            r = reg_name(self.reg(args[0]))
+            base, offset = self.address(args[1])
+            base = reg_name(base) if base is not None else None
+            if op == "LD":
+                return Instruction(op, dest=r, src1=base, imm=offset)
+            return Instruction(op, src1=base, src2=r, imm=offset)
+        if op in BRANCH_OPS:
+            if len(args) not in (2, 3):
+                self.error(f"{op} takes 2 or 3 operands (Ra, [Rb,] target), got {len(args)}")
+            ra = reg_name(self.reg(args[0]))
+            rb = reg_name(self.reg(args[1])) if len(args) == 3 else None
+            return Instruction(op, src1=ra, src2=rb, imm=self.target(args[-1]))
+        if op == "JMP":
+            need(1)
+            return Instruction(op, imm=self.target(args[0]))
+        self.error(f"unknown instruction {op}")
+
+    def target(self, text: str) -> int:
+        t = self.imm(text)
+        if not 0 <= t <= self.code_size:
+            self.error(f"branch target {t} outside the program (0..{self.code_size})")
+        return t
+
+
+def assemble(source: str, name: str = "<string>") -> AsmProgram:
+    """Assemble source text; raises AsmError (a ValueError) with the line number."""
+    return _Assembler(name).run(source)
+
+
+# --- on-disk cache ---
+# file: magic b"TASM", u16 version, u32 instructions, u32 data segments,
+#       u32 label-table bytes, u32 register count; then the packed
+#       instructions, per segment u64 address + u32 words + int64 words,
+#       and the labels as JSON
+CACHE_MAGIC = b"TASM"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sHIIII")
+_SEGMENT = struct.Struct("<QI")
+
+
+def default_cache_dir() -> str:
+    return os.environ.get("TOMASULO_ASM_CACHE") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "tomasulo", "asm")
+
+
+def source_key(source: bytes) -> str:
+    """Cache key: hash of the source and of the cache format."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(CACHE_MAGIC + CACHE_VERSION.to_bytes(2, "little"))
+    h.update(source)
+    return h.hexdigest()
+
+
+def save_binary(prog: AsmProgram, path: str):
+    from array import array
+    labels = json.dumps(prog.labels).encode()
+    parts = [CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(prog.instructions), len(prog.data),
+                               len(labels), prog.num_registers), prog.instructions.tobytes()]
+    for addr, words in prog.data:
+        parts.append(_SEGMENT.pack(addr, len(words)))
+        parts.append(array("q", words).tobytes())
+    parts.append(labels)
+    # write then rename, so concurrent loaders (sweep workers) never see half a file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(parts))
+    os.replace(tmp, path)
+
+
+def load_binary(path: str) -> AsmProgram:
+    from array import array
+    with open(path, "rb") as f:
+        blob = f.read()
+    magic, version, n, nseg, nlabels, nregs = CACHE_HEADER.unpack_from(blob)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        raise ValueError(f"{path}: not a version {CACHE_VERSION} assembled program")
+    pos = CACHE_HEADER.size
+    size = n * Instruction.RECORD.size
+    prog = PackedProgram.frombytes(blob[pos:pos + size])
+    pos += size
+    data = []
+    for _ in range(nseg):
+        addr, count = _SEGMENT.unpack_from(blob, pos)
+        pos += _SEGMENT.size
+        words = array("q")
+        words.frombytes(blob[pos:pos + 8 * count])
+        pos += 8 * count
+        data.append((addr, words.tolist()))
+    labels = json.loads(blob[pos:pos + nlabels])
+    return AsmProgram(prog, data, labels, nregs)
+
+
+def load_program(path: str, cache: bool = True, cache_dir: Optional[str] = None) -> AsmProgram:
+    """Assemble `path`, or load it from the cache if this exact source was assembled before."""
+    with open(path, "rb") as f:
+        source = f.read()
+    if not cache:
+        return assemble(source.decode(), path)
+    cache_dir = cache_dir or default_cache_dir()
+    cached = os.path.join(cache_dir, source_key(source) + ".tasm")
+    try:
+        return load_binary(cached)
+    except (OSError, ValueError, struct.error):
+        pass   # not cached yet, or unreadable: assemble again
+    prog = assemble(source.decode(), path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        save_binary(prog, cached)
+    except OSError as e:
+        print(f"warning: could not cache {path}: {e}", file=sys.stderr)
+    return prog
@@ -0,0 +1,430 @@
+# batch_engine.py
+# Vectorized engine: advances many independent simulations of the same
+# program in lockstep, one NumPy operation per pipeline stage for all of them.
+#
+# All per-machine state is stored struct-of-arrays with a leading simulation
+# axis: ROB/RS/FU bookkeeping lives in flat ring arrays of S * W entries, the
+# entry of tag t in simulation s at s * W + t % W (W = largest ROB), rename
+# table and registers in (S, R), memory in (S, mem words). Every stage of Tomasulo.run_cycle (issue, dispatch,
+# FU step, writeback/broadcast, commit) is a masked array operation over all
+# simulations, so the Python overhead is paid once per cycle, not once per
+# simulation. Rows of finished simulations are dropped once at least half of
+# the live ones are done; results are kept by original config index.
+#
+# The timing model is exactly the scalar one (see Tomasulo) and validate=True
+# steps a scalar Tomasulo next to every simulation and asserts that both agree
+# cycle for cycle. Programs must be straight-line (no branches or jumps).
+# Requires numpy.
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from config import Config, UNITS
+from instruction import Opcode, UNIT_NONE, OPND_NONE, OPND_REG, OPND_IMM
+from tomasulo import COUNTERS, Tomasulo
+
+INF = np.int64(1 << 62)
+NUNITS = len(UNITS)
+# per-simulation arrays (leading axis = live row) and flat S * W ring arrays
+PER_SIM = ("ids", "pc", "head", "tail", "rs_used", "occupied", "regs", "ren", "mem", "completed", "stalls",
+           "alive", "rob", "iw", "cw", "dw", "rs_size", "lat", "cnt", "occ", "mem_size")
+RING = ("disp", "wb", "rel", "value", "addr", "vj", "vk")
+STALL_CAUSES = ("rob_full",) + tuple("rs_full_" + u for u in UNITS) + ("mispredict", "prf_full")
+
+
+def _unsupported(cfg: Config) -> Optional[str]:
+    """Reason why `cfg` cannot run on the batch engine (None if it can)."""
+    if cfg.lsq:
+        return "no load/store queue model (lsq)"
+    if cfg.l1_sets:
+        return "no cache model (l1_sets)"
+    if cfg.cdb_width is not None:
+        return "unlimited CDB only (cdb_width)"
+    if not cfg.use_rob:
+        return "ROB-held values only (use_rob)"
+    return None
+
+
+class BatchEngine:
+    """
+    Run `program` on every config in `configs` at once.
+    mem_init: optional list of (addr, [values]) written to every memory first.
+    """
+    def __init__(self, program: Sequence, configs: List[Config], mem_init=None, validate: bool = False):
+        if not configs:
+            raise ValueError("no configurations")
+        for i, cfg in enumerate(configs):
+            reason = _unsupported(cfg)
+            if reason:
+                raise ValueError(f"config {i} is not supported by the batch engine: {reason}")
+        self.program = program
+        self.configs = list(configs)
+        self.mem_init = mem_init or []
+        self._decode_program(program)
+        self._init_state()
+        self.validate = validate
+        self.scalar = None
+        if validate:
+            self.scalar = [self._make_scalar(cfg) for cfg in self.configs]
+
+    # --- static program tables, indexed by ROB tag order (NOPs have no tag) ---
+    def _decode_program(self, program):
+        n = len(program)
+        self.N = n
+        self.is_nop = np.zeros(max(n, 1), dtype=bool)
+        self.tag_of = np.full(max(n, 1), -1, dtype=np.int64)
+        cols = {name: [] for name in ("op", "unit", "rd", "imm", "jk", "jr", "jv", "jp", "kk", "kr", "kv", "kp")}
+        last_writer = {}
+        max_reg = -1
+        for i in range(n):
+            instr = program[i]
+            op, unit, typ, rd, j_kind, j_val, k_kind, k_val = instr.decoded
+            if op >= Opcode.BEQ:
+                # no speculation here: issue walks the program in order, once
+                raise ValueError(f"instruction {i} {instr!r}: the batch engine runs straight-line programs only")
+            if unit == UNIT_NONE:
+                self.is_nop[i] = True
+                continue
+            t = len(cols["op"])
+            self.tag_of[i] = t
+            cols["op"].append(op)
+            cols["unit"].append(unit)
+            cols["imm"].append(instr.imm or 0)
+            for prefix, kind, val in (("j", j_kind, j_val), ("k", k_kind, k_val)):
+                if kind == OPND_NONE and (op != Opcode.LD or prefix == "j"):
+                    raise ValueError(f"instruction {i} {instr!r}: missing operand")
+                if kind == OPND_IMM and val is None:
+                    raise ValueError(f"instruction {i} {instr!r}: missing immediate")
+                reg = val if kind == OPND_REG else -1
+                cols[prefix + "k"].append(kind)
+                cols[prefix + "r"].append(reg)
+                cols[prefix + "v"].append(val if kind == OPND_IMM else 0)
+                # static producer: last earlier writer of the register (its tag), -1 if none
+                cols[prefix + "p"].append(last_writer.get(reg, -1) if kind == OPND_REG else -1)
+                max_reg = max(max_reg, reg)
+            cols["rd"].append(rd if rd is not None else -1)
+            if rd is not None:
+                last_writer[rd] = t
+                max_reg = max(max_reg, rd)
+        self.M = len(cols["op"])
+        for name, values in cols.items():
+            setattr(self, name + "_t", np.array(values if values else [0], dtype=np.int64))
+        self.max_reg = max_reg
+
+    def _init_state(self):
+        cfgs = self.configs
+        S = self.S = len(cfgs)
+        self.W = W = max(c.rob_size for c in cfgs)
+        self.R = R = max(c.num_registers for c in cfgs)
+        if self.max_reg >= min(c.num_registers for c in cfgs):
+            raise ValueError(f"program uses R{self.max_reg}, more registers than some configs have")
+        self.mem_size = np.array([c.mem_size for c in cfgs], dtype=np.int64)
+        col = lambda f: np.array([f(c) for c in cfgs], dtype=np.int64)
+        per_unit = lambda f: np.array([[f(c, u) for u in UNITS] for c in cfgs], dtype=np.int64)
+        self.rob = col(lambda c: c.rob_size)
+        self.iw = col(lambda c: c.issue_width)
+        self.cw = col(lambda c: c.commit_width)
+        self.dw = col(lambda c: c.dispatch_width or 0)     # 0: unlimited
+        self.rs_size = per_unit(lambda c, u: c.rs_sizes[u])
+        self.lat = per_unit(lambda c, u: c.fu_latencies[u])
+        self.cnt = per_unit(lambda c, u: c.fu_counts[u])
+        ii = per_unit(lambda c, u: c.fu_initiation_intervals[u] or 0)
+        self.occ = np.where(ii > 0, np.minimum(ii, self.lat), self.lat)  # cycles a unit stays busy
+
+        self.cycle = 0
+        self.pc = np.zeros(S, dtype=np.int64)
+        self.head = np.zeros(S, dtype=np.int64)     # tag of the ROB head
+        self.tail = np.zeros(S, dtype=np.int64)     # next tag to allocate
+        self.rs_used = np.zeros((S, NUNITS), dtype=np.int64)
+        self.occupied = np.zeros((S, NUNITS), dtype=np.int64)
+        self.regs = np.zeros((S, R), dtype=np.int64)
+        self.ren = np.full((S, R), -1, dtype=np.int64)   # rename table: reg -> tag, -1 if committed
+        self.mem = np.zeros((S, int(self.mem_size.max())), dtype=np.int64)
+        for addr, values in self.mem_init:
+            self.mem[:, addr:addr + len(values)] = values
+        # ROB / RS / FU ring, tag t of simulation s at s * W + t % W
+        self.disp = np.full(S * W, INF, dtype=np.int64)   # dispatch cycle
+        self.wb = np.full(S * W, INF, dtype=np.int64)     # writeback (result broadcast) cycle
+        self.rel = np.full(S * W, INF, dtype=np.int64)    # cycle whose FU step frees the unit
+        self.value = np.zeros(S * W, dtype=np.int64)
+        self.addr = np.zeros(S * W, dtype=np.int64)
+        self.vj = np.zeros(S * W, dtype=np.int64)
+        self.vk = np.zeros(S * W, dtype=np.int64)
+        self.alive = np.ones(S, dtype=bool)
+        self.completed = np.zeros(S, dtype=np.int64)
+        self.stalls = np.zeros((S, len(STALL_CAUSES)), dtype=np.int64)
+        self.ids = np.arange(S)                      # config index of each live row
+        self._wr = np.arange(W)
+        self._set_rows(S)
+        # results, by config index
+        self.finished = np.zeros(S, dtype=bool)
+        self.cycles = np.zeros(S, dtype=np.int64)
+        self.instructions = np.zeros(S, dtype=np.int64)
+        self.stall_counts = np.zeros_like(self.stalls)
+        self.final_regs = np.zeros_like(self.regs)
+        self.final_mem = np.zeros_like(self.mem)
+        self._update_done()
+
+    def _set_rows(self, n):
+        self.S = n
+        self._sims = np.arange(n)
+        self._row = self._sims[:, None] * self.W
+
+    def _compact(self):
+        """Drop the rows of finished simulations."""
+        keep = self.alive
+        for name in PER_SIM:
+            setattr(self, name, getattr(self, name)[keep])
+        for name in RING:
+            setattr(self, name, getattr(self, name).reshape(-1, self.W)[keep].ravel())
+        self._set_rows(int(keep.sum()))
+
+    def _make_scalar(self, cfg: Config) -> Tomasulo:
+        sim = Tomasulo(self.program, config=cfg)
+        for addr, values in self.mem_init:
+            sim.memory.store_range(addr, values)
+        return sim
+
+    # --- pipeline stages ---
+    def _issue(self, c):
+        W, sims = self.W, self._sims
+        issuing = self.alive.copy()
+        last = max(self.N - 1, 0)
+        for k in range(int(self.iw.max())):
+            act = issuing & (k < self.iw) & (self.pc < self.N)
+            if not act.any():
+                break
+            idx = np.minimum(self.pc, last)
+            nop = self.is_nop[idx]
+            t = np.maximum(self.tag_of[idx], 0)
+            u = self.unit_t[t]
+            rob_full = (self.tail - self.head) >= self.rob
+            rs_full = self.rs_used[sims, u] >= self.rs_size[sims, u]
+            # a full ROB stalls even a NOP (same order of checks as Tomasulo.issue_one)
+            stall = act & (rob_full | (~nop & rs_full))
+            do = act & ~nop & ~stall
+            if k == 0 and stall.any():
+                self.stalls[stall & rob_full, 0] += 1
+                rs_stall = stall & ~rob_full
+                np.add.at(self.stalls, (sims[rs_stall], 1 + u[rs_stall]), 1)
+            issuing &= ~stall
+            self.pc[act & ~stall] += 1
+            if do.any():
+                self._allocate(sims[do], t[do], u[do], c)
+
+    def _allocate(self, s, t, u, c):
+        W = self.W
+        f = s * W + t % W
+        self.disp[f] = INF
+        self.wb[f] = INF
+        self.rel[f] = INF
+        self.tail[s] += 1
+        self.rs_used[s, u] += 1
+        head = self.head[s]
+        # operands: immediates now, registers from the register file if the
+        # producer committed, from the ROB if it already broadcast, otherwise
+        # captured when the producer writes back
+        for kind_t, reg_t, imm_t, prod_t, ring in ((self.jk_t, self.jr_t, self.jv_t, self.jp_t, self.vj),
+                                                   (self.kk_t, self.kr_t, self.kv_t, self.kp_t, self.vk)):
+            kind = kind_t[t]
+            val = np.where(kind == OPND_IMM, imm_t[t], 0)
+            is_reg = kind == OPND_REG
+            p = prod_t[t]
+            in_rf = is_reg & (p < head)            # includes p == -1 (never written)
+            val[in_rf] = self.regs[s[in_rf], reg_t[t][in_rf]]
+            pf = s * W + p % W
+            in_rob = is_reg & ~in_rf & (self.wb[pf] < c)
+            val[in_rob] = self.value[pf[in_rob]]
+            ring[f] = val
+        rd = self.rd_t[t]
+        has = rd >= 0
+        self.ren[s[has], rd[has]] = t[has]
+
+    def _window(self):
+        """
+        Live ROB entries of every simulation, oldest first, as (S, width)
+        blocks: tags, validity, flat ring index, clamped tag for the static
+        tables and the flat index / liveness of both source producers.
+        """
+        width = max(int((self.tail - self.head).max()), 1)
+        head = self.head[:, None]
+        tw = head + self._wr[:width]
+        valid = tw < self.tail[:, None]          # finished simulations have head == tail
+        tc = np.minimum(tw, max(self.M - 1, 0))
+        f = self._row + tw % self.W
+        producers = []
+        for prod_t in (self.jp_t, self.kp_t):
+            p = prod_t[tc]
+            producers.append((self._row + p % self.W, p >= head))   # p < head: committed or none
+        return valid, f, tc, producers
+
+    def _dispatch(self, c, valid, f, tc, producers):
+        cand = valid & (self.disp[f] == INF)
+        if not cand.any():
+            return
+        for pf, live in producers:
+            cand &= ~live | (self.wb[pf] < c)
+        if not cand.any():
+            return
+        u = self.unit_t[tc]
+        free = self.cnt - self.occupied
+        sel = np.zeros_like(cand)
+        for uu in range(NUNITS):
+            m = cand & (u == uu)
+            sel |= m & (np.cumsum(m, axis=1) <= free[:, uu:uu + 1])
+        if (self.dw > 0).any():
+            limit = np.where(self.dw > 0, self.dw, self.W)[:, None]
+            sel &= np.cumsum(sel, axis=1) <= limit
+        s, w = np.nonzero(sel)
+        if len(s) == 0:
+            return
+        fs, uu = f[s, w], u[s, w]
+        self.disp[fs] = c
+        self.wb[fs] = c + self.lat[s, uu] - 1
+        self.rel[fs] = c + self.occ[s, uu] - 1
+        np.add.at(self.occupied, (s, uu), 1)
+
+    def _step_and_writeback(self, c, valid, f, tc, producers):
+        rel = valid & (self.rel[f] == c)
+        if rel.any():
+            s, w = np.nonzero(rel)
+            np.add.at(self.occupied, (s, self.unit_t[tc[s, w]]), -1)
+        done = valid & (self.wb[f] == c)
+        if not done.any():
+            return
+        s, w = np.nonzero(done)
+        t, fs = tc[s, w], f[s, w]
+        op = self.op_t[t]
+        vj, vk = self.vj[fs], self.vk[fs]
+        is_mem = (op == Opcode.LD) | (op == Opcode.ST)
+        addr = np.where(is_mem, vj + self.imm_t[t], 0)
+        if is_mem.any():
+            bad = is_mem & ((addr < 0) | (addr >= self.mem_size[s]))
+            if bad.any():
+                i = int(np.argmax(bad))
+                raise IndexError(f"simulation {s[i]}: address {addr[i]} outside memory")
+        with np.errstate(all="ignore"):
+            res = np.select(
+                [op == Opcode.ADD, op == Opcode.SUB, op == Opcode.MUL, op == Opcode.DIV, op == Opcode.LD, op == Opcode.ST],
+                [vj + vk, vj - vk, vj * vk,
+                 np.where(vk != 0, np.floor_divide(vj, np.where(vk != 0, vk, 1)), 0),
+                 self.mem[s, np.where(op == Opcode.LD, addr, 0)], vk], 0)
+        self.value[fs] = res
+        self.addr[fs] = addr
+        np.add.at(self.rs_used, (s, self.unit_t[t]), -1)
+        # broadcast: entries waiting on a producer that wrote back this cycle capture its value
+        for (pf, live), ring in zip(producers, (self.vj, self.vk)):
+            hit = valid & live & (self.wb[pf] == c)
+            if hit.any():
+                ring[f[hit]] = self.value[pf[hit]]
+
+    def _commit(self, c):
+        W, sims = self.W, self._sims
+        committing = self.alive.copy()
+        for k in range(int(self.cw.max())):
+            h = self.head
+            hf = sims * W + h % W
+            can = committing & (k < self.cw) & (h < self.tail) & (self.wb[hf] <= c)
+            if not can.any():
+                break
+            s = sims[can]
+            t, fc = h[can], hf[can]
+            rd = self.rd_t[t]
+            w = rd >= 0
+            sw, rw = s[w], rd[w]
+            match = self.ren[sw, rw] == t[w]
+            sw, rw = sw[match], rw[match]
+            self.regs[sw, rw] = self.value[fc[w][match]]
+            self.ren[sw, rw] = -1
+            st = self.op_t[t] == Opcode.ST
+            self.mem[s[st], self.addr[fc[st]]] = self.value[fc[st]]
+            self.head[can] += 1
+            self.completed[can] += 1
+            committing &= can
+
+    def _update_done(self):
+        done = self.alive & (self.pc >= self.N) & (self.head == self.tail)
+        if done.any():
+            self.finished[self.ids[done]] = True
+            self._record(done)
+            self.alive &= ~done
+
+    def _record(self, rows):
+        ids = self.ids[rows]
+        self.cycles[ids] = self.cycle
+        self.instructions[ids] = self.completed[rows]
+        self.stall_counts[ids] = self.stalls[rows]
+        self.final_regs[ids] = self.regs[rows]
+        self.final_mem[ids] = self.mem[rows]
+
+    def step(self):
+        """One cycle for every simulation that has not finished."""
+        self.cycle += 1
+        c = self.cycle
+        if 2 * self.alive.sum() <= self.S:
+            self._compact()
+        was_alive = self.alive.copy()
+        self._issue(c)
+        window = self._window()
+        self._dispatch(c, *window)
+        self._step_and_writeback(c, *window)
+        self._commit(c)
+        self._update_done()
+        if self.validate:
+            self._check_against_scalar(was_alive)
+
+    def run(self, max_cycles: int = 10 ** 7):
+        while self.alive.any() and self.cycle < max_cycles:
+            self.step()
+        self._record(self.alive)
+        if self.validate:
+            self._check_final()
+        return self
+
+    # --- validation against the scalar simulator ---
+    def _check_against_scalar(self, was_alive):
+        for row in np.nonzero(was_alive)[0]:
+            s = self.ids[row]
+            sim = self.scalar[s]
+            sim.run_cycle()
+            got = (int(self.pc[row]), int(self.completed[row]), int(self.tail[row] - self.head[row]))
+            want = (sim.pc, sim.completed_instructions, len(sim.rob))
+            assert got == want, f"simulation {s} cycle {self.cycle}: batch (pc, committed, rob) {got} != scalar {want}"
+            assert bool(self.alive[row]) != sim.done(), f"simulation {s} cycle {self.cycle}: done flags differ"
+
+    def _check_final(self):
+        for s, sim in enumerate(self.scalar):
+            assert int(self.cycles[s]) == sim.cycle, f"simulation {s}: cycles {self.cycles[s]} != {sim.cycle}"
+            assert int(self.instructions[s]) == sim.completed_instructions, f"simulation {s}: instruction counts differ"
+            regs = list(sim.rf.regs)
+            assert self.final_regs[s, :len(regs)].tolist() == regs, f"simulation {s}: registers differ"
+            size = self.configs[s].mem_size
+            assert self.final_mem[s, :size].tolist() == sim.memory.load_range(0, size), f"simulation {s}: memory differs"
+            assert self.stall_cycles(s) == sim.stall_cycles, f"simulation {s}: stall counters differ"
+
+    # --- results ---
+    def stall_cycles(self, s: int) -> dict:
+        return {cause: int(n) for cause, n in zip(STALL_CAUSES, self.stall_counts[s])}
+
+    def ipc(self) -> np.ndarray:
+        return np.where(self.cycles > 0, self.instructions / np.maximum(self.cycles, 1), 0.0)
+
+    def __repr__(self):
+        return f"<BatchEngine {len(self.cycles)} simulations, cycle {self.cycle}, {int(self.alive.sum())} running>"
+
+
+def simulate_batch(program, configs: List[Config], mem_init=None, max_cycles: int = 10 ** 7,
+                   validate: bool = False) -> List[dict]:
+    """Batch counterpart of sweep.simulate: one result row per config."""
+    from sweep import flatten_config
+    eng = BatchEngine(program, configs, mem_init, validate).run(max_cycles)
+    ipc = eng.ipc()
+    rows = []
+    for s, cfg in enumerate(configs):
+        row = flatten_config(cfg)
+        row.update(cycles=int(eng.cycles[s]), instructions=int(eng.instructions[s]),
+                   ipc=round(float(ipc[s]), 6), finished=bool(eng.finished[s]), **dict.fromkeys(COUNTERS, 0))
+        for cause, n in eng.stall_cycles(s).items():
+            row["stall_" + cause] = n
+        rows.append(row)
+    return rows
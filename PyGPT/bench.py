@@ -0,0 +1,204 @@
+# bench.py
+# Micro-benchmarks for the simulator hot paths.
+#   python bench.py [writeback] [dispatch] [idle] [footprint] [width] [batch] ...
+import argparse
+import time
+
+from instruction import Instruction
+from tomasulo import Tomasulo
+from reservation_station import ReservationStation
+
+
+def _scan_broadcast(stations, tag, value):
+    # the old writeback: walk every entry of every station
+    for rscol in stations:
+        for e in rscol:
+            if e.busy:
+                if e.Qj == tag:
+                    e.Vj = value
+                    e.Qj = None
+                if e.Qk == tag:
+                    e.Vk = value
+                    e.Qk = None
+
+
+def _fill_waiting(sim, n_rs, consumers_per_tag=2):
+    # n_rs busy stations per class, each waiting on some in-flight producer tag
+    sim.rs_add = ReservationStation("A", n_rs)
+    sim.rs_mul = ReservationStation("M", n_rs)
+    sim.rs_ldst = ReservationStation("L", n_rs)
+    tag = 0
+    for i, e in enumerate(e for rs in (sim.rs_add, sim.rs_mul, sim.rs_ldst) for e in rs):
+        if i % consumers_per_tag == 0:
+            tag += 1
+        e.busy = True
+        e.op = "ADD"
+        e.dest = 100000 + i
+        e.Qj = tag
+        e.Vk = 1
+        sim.cdb.subscribe(tag, e)
+    return tag
+
+
+def bench_writeback(sizes=(4, 16, 64, 256, 1024), broadcasts=2000):
+    print("writeback cost per broadcast vs RS entries per class")
+    print(f"{'rs/class':>9} {'scan (us)':>10} {'cdb (us)':>10} {'speedup':>8}")
+    for n in sizes:
+        # every waiting tag gets woken once, the remaining broadcasts are
+        # results nobody consumes (like stores or dead values)
+        scan_sim = Tomasulo([Instruction("ADD", "R1", "R0", "R0")])
+        cdb_sim = Tomasulo([Instruction("ADD", "R1", "R0", "R0")])
+        ntags = _fill_waiting(scan_sim, n)
+        _fill_waiting(cdb_sim, n)
+        tags = list(range(1, max(ntags, broadcasts) + 1))
+        stations = (scan_sim.rs_add, scan_sim.rs_mul, scan_sim.rs_ldst)
+        t0 = time.perf_counter()
+        for t in tags:
+            _scan_broadcast(stations, t, 0)
+        scan = (time.perf_counter() - t0) / len(tags)
+        t0 = time.perf_counter()
+        for t in tags:
+            cdb_sim.cdb.broadcast(t, 0)
+        cdb = (time.perf_counter() - t0) / len(tags)
+        print(f"{n:>9} {scan * 1e6:>10.2f} {cdb * 1e6:>10.2f} {scan / cdb:>7.1f}x")
+
+
+def _scan_dispatch(sim):
+    # the old dispatch: check is_ready() on every entry of every station
+    for rscol, fu in ((sim.rs_add, sim.fu_add), (sim.rs_mul, sim.fu_mul), (sim.rs_ldst, sim.fu_ld)):
+        for rs in rscol:
+            if rs.busy and rs.is_ready() and fu.can_accept():
+                rs.exec_cycles_left = fu.latency
+                fu.assign(rs, fu.latency)
+
+
+def bench_dispatch(sizes=(4, 16, 64, 256, 1024), cycles=2000, ready_per_cycle=2):
+    print("dispatch cost per cycle vs RS entries per class (mostly waiting window)")
+    print(f"{'rs/class':>9} {'scan (us)':>10} {'queue (us)':>11} {'speedup':>8}")
+    for n in sizes:
+        results = []
+        for dispatch in (_scan_dispatch, Tomasulo.start_execution):
+            sim = Tomasulo([Instruction("ADD", "R1", "R0", "R0")])
+            _fill_waiting(sim, n)
+            waiting = [e for e in sim.rs_add]
+            elapsed = 0.0
+            for c in range(cycles):
+                # a couple of operands arrive, the FUs retire what they were given
+                for e in waiting[(c * ready_per_cycle) % n:(c * ready_per_cycle) % n + ready_per_cycle]:
+                    if e.Qj is not None:
+                        e.on_broadcast(e.Qj, 0)
+                t0 = time.perf_counter()
+                dispatch(sim)
+                elapsed += time.perf_counter() - t0
+                for fu in (sim.fu_add, sim.fu_mul, sim.fu_ld):
+                    for e in fu.step():
+                        e.exec_cycles_left = None
+                        e.Qj = -1  # park it again so the window stays full
+            results.append(elapsed / cycles)
+        print(f"{n:>9} {results[0] * 1e6:>10.2f} {results[1] * 1e6:>11.2f} {results[0] / results[1]:>7.1f}x")
+
+
+def _long_latency_kernel(n):
+    # dependent MUL/DIV chain fed by loads: long stretches with nothing to do
+    prog = []
+    for i in range(n):
+        prog.append(Instruction("LD", dest="R1", imm=i % 64))
+        prog.append(Instruction("MUL", dest="R2", src1="R1", src2="R2"))
+        prog.append(Instruction("DIV", dest="R3", src1="R2", src2="R1"))
+        prog.append(Instruction("ST", src2="R3", imm=64 + i % 64))
+    return prog
+
+
+def bench_idle(n=500, latencies=(3, 20, 100)):
+    print("run() per-cycle vs event-driven on a long-latency MUL/DIV/LD kernel")
+    print(f"{'mul lat':>8} {'cycles':>8} {'per-cycle (ms)':>15} {'event (ms)':>11} {'speedup':>8}")
+    prog = _long_latency_kernel(n)
+    for lat in latencies:
+        times = []
+        for event_driven in (False, True):
+            sim = Tomasulo(prog, rob_size=8)
+            sim.fu_mul.latency = lat
+            sim.fu_ld.latency = max(2, lat // 2)
+            t0 = time.perf_counter()
+            sim.run(max_cycles=10 ** 9, event_driven=event_driven)
+            times.append(time.perf_counter() - t0)
+        print(f"{lat:>8} {sim.cycle:>8} {times[0] * 1e3:>15.1f} {times[1] * 1e3:>11.1f} {times[0] / times[1]:>7.1f}x")
+
+
+def _saxpy_kernel(n):
+    # y[i] = a * x[i] + y[i], unrolled with rotating registers so iterations overlap
+    prog = []
+    for i in range(n):
+        r = 4 * (i % 6) + 2
+        prog.append(Instruction("LD", dest=f"R{r}", imm=i % 100))
+        prog.append(Instruction("LD", dest=f"R{r + 1}", imm=100 + i % 100))
+        prog.append(Instruction("MUL", dest=f"R{r + 2}", src1="R1", src2=f"R{r}"))
+        prog.append(Instruction("ADD", dest=f"R{r + 3}", src1=f"R{r + 2}", src2=f"R{r + 1}"))
+        prog.append(Instruction("ST", src2=f"R{r + 3}", imm=100 + i % 100))
+    return prog
+
+
+def bench_width(n=400, widths=(1, 2, 4, 8)):
+    from config import Config
+    print("achieved IPC on an unrolled saxpy kernel, pipelined FUs, RS/FUs scaled with width")
+    print(f"{'width':>6} {'cycles':>8} {'IPC':>6}")
+    prog = _saxpy_kernel(n)
+    for w in widths:
+        cfg = Config(rob_size=32 * w, issue_width=w, commit_width=w,
+                     rs_sizes={"ALU": 4 * w, "MUL": 4 * w, "LDST": 4 * w},
+                     fu_counts={"ALU": w, "MUL": max(1, w // 2), "LDST": max(1, w // 2)}).with_pipelined_fus()
+        sim = Tomasulo(prog, config=cfg)
+        sim.run(max_cycles=10 ** 9, event_driven=True)
+        print(f"{w:>6} {sim.cycle:>8} {sim.ipc():>6.2f}")
+
+
+def bench_footprint(n=200000):
+    import tracemalloc
+    from instruction import PackedProgram
+    print(f"memory per instruction for {n} instructions")
+    for name, build in (("list[Instruction]", lambda: _long_latency_kernel(n // 4)),
+                        ("PackedProgram", lambda: PackedProgram(_long_latency_kernel(n // 4)))):
+        tracemalloc.start()
+        prog = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{name:>18}: {size / len(prog):7.1f} bytes")
+        del prog
+
+
+def bench_batch(n=200, sims=(16, 64, 256)):
+    from config import Config
+    from batch_engine import BatchEngine
+    print("scalar (event-driven) vs NumPy batch engine, ROB/width/MUL-latency grid on the saxpy kernel")
+    print(f"{'sims':>6} {'scalar s':>9} {'batch s':>8} {'speedup':>8}")
+    prog = _saxpy_kernel(n)
+    grid = [Config(rob_size=r, issue_width=w, commit_width=w, fu_latencies={"ALU": 1, "MUL": m, "LDST": 2})
+            for r in (8, 16, 32, 64) for w in (1, 2, 4, 8) for m in (3, 5, 10, 20)]
+    for count in sims:
+        configs = [grid[i % len(grid)] for i in range(count)]
+        t0 = time.perf_counter()
+        for cfg in configs:
+            Tomasulo(prog, config=cfg).run(max_cycles=10 ** 9, event_driven=True)
+        t1 = time.perf_counter()
+        BatchEngine(prog, configs).run()
+        t2 = time.perf_counter()
+        print(f"{count:>6} {t1 - t0:>9.2f} {t2 - t1:>8.2f} {(t1 - t0) / (t2 - t1):>7.1f}x")
+
+
+BENCHES = {
+    "writeback": bench_writeback,
+    "idle": bench_idle,
+    "dispatch": bench_dispatch,
+    "footprint": bench_footprint,
+    "width": bench_width,
+    "batch": bench_batch,
+}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Simulator micro-benchmarks")
+    ap.add_argument("bench", nargs="*", help="one of: " + ", ".join(sorted(BENCHES)))
+    args = ap.parse_args()
+    for name in args.bench or sorted(BENCHES):
+        if name not in BENCHES:
+            ap.error(f"unknown benchmark {name!r}")
+        BENCHES[name]()
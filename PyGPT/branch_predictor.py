@@ -0,0 +1,121 @@
+# branch_predictor.py
+# Direction predictors for conditional branches, and the bookkeeping the
+# core keeps per branch in flight.
+#
+#   static   backward taken, forward not taken (loops predict well)
+#   bimodal  table of 2-bit saturating counters indexed by the branch pc
+#   gshare   2-bit counters indexed by pc XOR the global taken/not-taken history
+#
+# The core calls predict() when it issues a branch, repair() when the
+# branch resolves as mispredicted (before the correct path is fetched) and
+# update() when it commits, so only branches on the correct path train the
+# tables. gshare shifts its history speculatively at predict time;
+# repair() puts it back to the branch's own history plus the real outcome,
+# rollback() to the history before the branch (when it is squashed itself).
+from typing import List, Optional, Tuple
+
+from config import Config
+
+
+class StaticPredictor:
+    def predict(self, pc: int, target: int) -> Tuple[bool, tuple]:
+        """(predicted taken, info to hand back to repair / update)."""
+        return target <= pc, ()
+
+    def repair(self, info: tuple, taken: bool):
+        pass
+
+    def rollback(self, info: tuple):
+        pass
+
+    def update(self, info: tuple, taken: bool):
+        pass
+
+    def state(self) -> Tuple[bytes, int]:
+        """(counter table, global history), for checkpoints."""
+        return b"", 0
+
+    def restore(self, counters: bytes, history: int):
+        pass
+
+
+class BimodalPredictor(StaticPredictor):
+    def __init__(self, entries: int = 1024):
+        self.mask = entries - 1
+        self.counters = bytearray([2]) * entries   # weakly taken
+
+    def predict(self, pc, target):
+        i = pc & self.mask
+        return self.counters[i] >= 2, (i,)
+
+    def update(self, info, taken):
+        i = info[0]
+        c = self.counters[i]
+        if taken:
+            if c < 3:
+                self.counters[i] = c + 1
+        elif c > 0:
+            self.counters[i] = c - 1
+
+    def state(self):
+        return bytes(self.counters), 0
+
+    def restore(self, counters, history):
+        self.counters[:] = counters
+
+
+class GsharePredictor(BimodalPredictor):
+    def __init__(self, entries: int = 1024, history_bits: int = 8):
+        super().__init__(entries)
+        self.history_mask = (1 << history_bits) - 1
+        self.history = 0
+
+    def predict(self, pc, target):
+        history = self.history
+        i = (pc ^ history) & self.mask
+        taken = self.counters[i] >= 2
+        self.history = ((history << 1) | taken) & self.history_mask
+        return taken, (i, history)
+
+    def repair(self, info, taken):
+        self.history = ((info[1] << 1) | taken) & self.history_mask
+
+    def rollback(self, info):
+        self.history = info[1]
+
+    def state(self):
+        return bytes(self.counters), self.history
+
+    def restore(self, counters, history):
+        self.counters[:] = counters
+        self.history = history
+
+
+def make_predictor(config: Config) -> StaticPredictor:
+    kind = config.branch_predictor
+    if kind == "static":
+        return StaticPredictor()
+    if kind == "bimodal":
+        return BimodalPredictor(config.predictor_entries)
+    return GsharePredictor(config.predictor_entries, config.history_bits)
+
+
+class PendingBranch:
+    """A conditional branch between issue and commit."""
+    __slots__ = ("pc", "target", "predicted", "info", "rename", "taken")
+
+    def __init__(self, pc: int, target: int, predicted: bool, info: tuple, rename: List[Optional[int]]):
+        self.pc = pc
+        self.target = target
+        self.predicted = predicted
+        self.info = info
+        self.rename = rename       # copy of RegisterFile.reg_status right after the branch issued
+        self.taken: Optional[bool] = None   # outcome, once resolved
+
+    @property
+    def mispredicted(self) -> bool:
+        return self.taken is not None and self.taken != self.predicted
+
+    def __repr__(self):
+        return (f"<Branch pc={self.pc} target={self.target} predicted={'T' if self.predicted else 'N'} "
+                f"taken={'?' if self.taken is None else 'T' if self.taken else 'N'}>")
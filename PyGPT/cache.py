@@ -0,0 +1,202 @@
+# cache.py
+# Set-associative data cache hierarchy (L1, optional L2) in front of Memory,
+# for load timing. Values still come from Memory / the LSQ; the caches only
+# decide when a load's data arrives.
+#
+#   caches = make_caches(config)        # None when config.l1_sets == 0
+#   ready = caches.read(addr, cycle)    # cycle the word is available
+#   caches.write(addr, cycle)           # committed store (write-allocate, write-back)
+#
+# Each level keeps its tags, replacement stamps and dirty bits in flat
+# arrays of sets * ways entries (array / bytearray), and a lookup is a
+# single array.index() over the ways of one set, so a cache access costs
+# about as much as a dict lookup. Misses go through MSHRs: a miss to a line
+# that is already being fetched waits for that fill (merged), and when all
+# MSHRs are busy the miss waits until the earliest one frees up.
+# Replacement: "lru" (least recently used), "fifo" (oldest fill) or
+# "random" (xorshift, so checkpoints can restore it).
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from config import REPLACEMENT, Config
+
+INVALID = -(1 << 63)   # tag of an empty way (lines of negative addresses are still valid tags)
+
+
+class CacheLevel:
+    def __init__(self, name: str, sets: int, ways: int, line_words: int, latency: int, mshrs: int,
+                 replacement: str = "lru", below: Optional["CacheLevel"] = None, memory_latency: int = 50):
+        if sets < 1 or sets & (sets - 1) or line_words < 1 or line_words & (line_words - 1):
+            raise ValueError(f"{name}: sets and line_words must be powers of two")
+        if ways < 1 or mshrs < 1:
+            raise ValueError(f"{name}: ways and mshrs must be >= 1")
+        if replacement not in REPLACEMENT:
+            raise ValueError(f"{name}: replacement must be one of {REPLACEMENT}")
+        self.name = name
+        self.sets, self.ways = sets, ways
+        self.line_shift = line_words.bit_length() - 1
+        self.set_mask = sets - 1
+        self.latency = latency
+        self.mshrs = mshrs
+        self.lru = replacement == "lru"
+        self.random = replacement == "random"
+        self.below = below
+        self.memory_latency = memory_latency   # only used by the last level
+        self.tags = array("q", [INVALID]) * (sets * ways)
+        self.stamps = array("q", bytes(8 * sets * ways))   # last use (lru) or fill time (fifo)
+        self.dirty = bytearray(sets * ways)
+        self.pending: Dict[int, int] = {}   # line being filled -> cycle the fill completes
+        self.clock = 0
+        self.rng = 0x9E3779B97F4A7C15
+        self.hits = self.misses = self.merged = self.writebacks = self.mshr_stall_cycles = 0
+
+    def _find(self, line: int) -> int:
+        """Way index (flat) holding line, or -1."""
+        base = (line & self.set_mask) * self.ways
+        try:
+            return self.tags.index(line, base, base + self.ways)
+        except ValueError:
+            return -1
+
+    def _victim(self, line: int) -> int:
+        base = (line & self.set_mask) * self.ways
+        end = base + self.ways
+        tags = self.tags
+        try:
+            return tags.index(INVALID, base, end)
+        except ValueError:
+            pass
+        if self.random:
+            x = self.rng
+            x ^= (x << 13) & 0xFFFFFFFFFFFFFFFF
+            x ^= x >> 7
+            x ^= (x << 17) & 0xFFFFFFFFFFFFFFFF
+            self.rng = x
+            return base + x % self.ways
+        stamps = self.stamps
+        return min(range(base, end), key=stamps.__getitem__)
+
+    def _fill(self, line: int) -> int:
+        i = self._victim(line)
+        if self.dirty[i]:
+            self.writebacks += 1
+            self.dirty[i] = 0
+        self.tags[i] = line
+        self.clock += 1
+        self.stamps[i] = self.clock
+        return i
+
+    def read(self, addr: int, t: int) -> int:
+        """Cycle at which the word at addr, requested at cycle t, is available."""
+        line = addr >> self.line_shift
+        pending = self.pending
+        ready = pending.get(line)
+        if ready is not None and ready > t:
+            # secondary miss: the line is on its way
+            self.misses += 1
+            self.merged += 1
+            return ready
+        i = self._find(line)
+        if i >= 0:
+            self.hits += 1
+            if self.lru:
+                self.clock += 1
+                self.stamps[i] = self.clock
+            return t + self.latency
+        self.misses += 1
+        start = t
+        if len(pending) >= self.mshrs:
+            for done in [l for l, r in pending.items() if r <= t]:
+                del pending[done]
+            if len(pending) >= self.mshrs:
+                # every MSHR busy: wait for the first one to free up
+                start = min(pending.values())
+                self.mshr_stall_cycles += start - t
+                for done in [l for l, r in pending.items() if r <= start]:
+                    del pending[done]
+        t_below = start + self.latency
+        ready = self.below.read(addr, t_below) if self.below is not None else t_below + self.memory_latency
+        pending[line] = ready
+        self._fill(line)
+        return ready
+
+    def write(self, addr: int, t: int):
+        """A committed store: write-allocate, write-back (no timing effect on the core)."""
+        line = addr >> self.line_shift
+        i = self._find(line)
+        if i >= 0:
+            self.hits += 1
+            if self.lru:
+                self.clock += 1
+                self.stamps[i] = self.clock
+        else:
+            self.misses += 1
+            i = self._fill(line)
+        self.dirty[i] = 1
+
+    # --- checkpoints ---
+    def state(self) -> Tuple[dict, List[bytes]]:
+        meta = {"pending": list(self.pending.items()), "clock": self.clock, "rng": self.rng,
+                "counters": [self.hits, self.misses, self.merged, self.writebacks, self.mshr_stall_cycles]}
+        return meta, [self.tags.tobytes(), self.stamps.tobytes(), bytes(self.dirty)]
+
+    def restore(self, meta: dict, arrays: List[bytes]):
+        self.pending = dict((l, r) for l, r in meta["pending"])
+        self.clock, self.rng = meta["clock"], meta["rng"]
+        self.hits, self.misses, self.merged, self.writebacks, self.mshr_stall_cycles = meta["counters"]
+        self.tags = array("q", arrays[0])
+        self.stamps = array("q", arrays[1])
+        self.dirty = bytearray(arrays[2])
+
+    def __repr__(self):
+        return (f"<{self.name} {self.sets}x{self.ways}x{1 << self.line_shift} hits={self.hits} "
+                f"misses={self.misses} merged={self.merged}>")
+
+
+class CacheHierarchy:
+    def __init__(self, levels: List[CacheLevel]):
+        self.levels = levels          # L1 first
+        self.l1 = levels[0]
+
+    def read(self, addr: int, t: int) -> int:
+        return self.l1.read(addr, t)
+
+    def write(self, addr: int, t: int):
+        # L1 is write-back: a store only reaches L2 when its line is evicted
+        self.l1.write(addr, t)
+
+    def counters(self) -> Dict[str, int]:
+        out = {}
+        for level in self.levels:
+            key = level.name.lower()
+            out[key + "_hits"] = level.hits
+            out[key + "_misses"] = level.misses
+        return out
+
+    def state(self) -> Tuple[list, List[bytes]]:
+        metas, arrays = [], []
+        for level in self.levels:
+            meta, arr = level.state()
+            metas.append(meta)
+            arrays.extend(arr)
+        return metas, arrays
+
+    def restore(self, metas: list, arrays: List[bytes]):
+        for i, (level, meta) in enumerate(zip(self.levels, metas)):
+            level.restore(meta, arrays[3 * i:3 * i + 3])
+
+    def __repr__(self):
+        return "<Caches " + " ".join(repr(l) for l in self.levels) + ">"
+
+
+def make_caches(config: Config) -> Optional[CacheHierarchy]:
+    """The hierarchy config describes, None without an L1 (fixed load latency)."""
+    if not config.l1_sets:
+        return None
+    l2 = None
+    if config.l2_sets:
+        l2 = CacheLevel("L2", config.l2_sets, config.l2_ways, config.l2_line_words, config.l2_latency,
+                        config.l2_mshrs, config.cache_replacement, memory_latency=config.memory_latency)
+    l1 = CacheLevel("L1", config.l1_sets, config.l1_ways, config.l1_line_words, config.l1_latency,
+                    config.l1_mshrs, config.cache_replacement, below=l2, memory_latency=config.memory_latency)
+    return CacheHierarchy([l1] + ([l2] if l2 is not None else []))
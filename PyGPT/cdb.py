@@ -0,0 +1,107 @@
+# cdb.py
+from typing import Dict, List, Sequence, Tuple
+
+from config import UNITS, Config
+
+
+class CDB:
+    """
+    Common data bus.
+    Keeps a tag -> listeners index so that a broadcast only touches the
+    consumers that are actually waiting on that ROB tag, instead of every
+    reservation station entry in the machine.
+    A listener is any object with an on_broadcast(tag, value) method
+    (RSEntry implements it).
+    """
+    def __init__(self):
+        self.waiters: Dict[int, List] = {}
+
+    def subscribe(self, tag: int, listener):
+        waiting = self.waiters.get(tag)
+        if waiting is None:
+            self.waiters[tag] = [listener]
+        else:
+            waiting.append(listener)
+
+    def broadcast(self, tag: int, value):
+        waiting = self.waiters.pop(tag, None)
+        if waiting is None:
+            return
+        for listener in waiting:
+            listener.on_broadcast(tag, value)
+
+    def pending_count(self):
+        return sum(len(w) for w in self.waiters.values())
+
+    def __repr__(self):
+        return f"<CDB waiting_tags={sorted(self.waiters)}>"
+
+
+# --- bus arbitration (Config.cdb_width / cdb_arbiter) ---
+# With a CDB of limited width, the core collects the results waiting in the
+# FU output latches as (ROB tag, unit, entry) tuples sorted by tag, and an
+# arbiter picks the ones that broadcast this cycle (the rest stay latched).
+
+class OldestFirstArbiter:
+    """Lowest ROB tags first: the results the commit stage needs soonest."""
+    def grant(self, waiting: List[Tuple[int, int, object]], width: int) -> List[Tuple[int, int, object]]:
+        return waiting[:width]
+
+    def state(self) -> int:
+        """Arbiter position, for checkpoints."""
+        return 0
+
+    def restore(self, state: int):
+        pass
+
+
+class FUPriorityArbiter(OldestFirstArbiter):
+    """Fixed unit priority, oldest first within a unit."""
+    def __init__(self, order: Sequence[int]):
+        self.rank = {u: i for i, u in enumerate(order)}   # unit -> priority, 0 highest
+
+    def grant(self, waiting, width):
+        # sort is stable: age order is kept within a unit
+        return sorted(waiting, key=lambda w: self.rank[w[1]])[:width]
+
+
+class RoundRobinArbiter(OldestFirstArbiter):
+    """Units take turns, one result per turn, starting after the last unit served."""
+    def __init__(self, units: int):
+        self.units = units
+        self.next = 0
+
+    def grant(self, waiting, width):
+        queues = [[] for _ in range(self.units)]
+        for w in waiting:
+            queues[w[1]].append(w)
+        heads = [0] * self.units
+        out = []
+        u, skipped = self.next, 0
+        while len(out) < width and skipped < self.units:
+            if heads[u] < len(queues[u]):
+                out.append(queues[u][heads[u]])
+                heads[u] += 1
+                skipped = 0
+                self.next = (u + 1) % self.units
+            else:
+                skipped += 1
+            u = (u + 1) % self.units
+        return out
+
+    def state(self):
+        return self.next
+
+    def restore(self, state):
+        self.next = state
+
+
+def make_arbiter(config: Config) -> OldestFirstArbiter:
+    kind = config.cdb_arbiter
+    if kind == "fu_priority":
+        # longest latency first: those results usually head the longest dependence chains
+        order = sorted(range(len(UNITS)), key=lambda u: -config.fu_latencies[UNITS[u]])
+        return FUPriorityArbiter(order)
+    if kind == "round_robin":
+        return RoundRobinArbiter(len(UNITS))
+    return OldestFirstArbiter()
@@ -0,0 +1,133 @@
+# changes.py
+# What changed in the machine since the last look, so a view can redraw
+# only the dirty rows instead of the whole state (gui_tomasulo.py).
+#
+#   tracker = sim.track_changes()
+#   sim.run_cycle()
+#   cs = tracker.take()     # cs.rob, cs.rs, cs.regs, cs.mem, cs.full
+#
+# The tracker wraps the few core methods that change visible state
+# (hooks.py): issue allocates a ROB entry and an RS entry and renames the
+# destination register, dispatch starts an RS entry, writeback updates the
+# ROB entry, frees the RS entry and fills the operands of the entries
+# waiting on its tag, commit frees the ROB head and writes a register or a
+# memory word, and a misprediction squash frees the younger ROB and RS
+# entries and rolls renames back. Anything done behind its back (fast_forward, a restore,
+# poking memory directly) is reported as full, meaning "redraw everything".
+from functools import partial
+from typing import Set, Tuple
+
+from hooks import Hooks
+
+
+class ChangeSet:
+    """Dirty state since the previous take()."""
+    __slots__ = ("rob", "rs", "regs", "mem", "full")
+
+    def __init__(self, full: bool = False):
+        self.rob: Set[int] = set()              # ROB tags allocated, updated or retired
+        self.rs: Set[Tuple[int, int]] = set()   # (unit class, entry index)
+        self.regs: Set[int] = set()             # register numbers (value or rename status)
+        self.mem: Set[int] = set()              # word addresses
+        self.full = full
+
+    def __bool__(self):
+        return self.full or bool(self.rob or self.rs or self.regs or self.mem)
+
+    def __repr__(self):
+        if self.full:
+            return "<ChangeSet full>"
+        return (f"<ChangeSet rob={sorted(self.rob)} rs={sorted(self.rs)} "
+                f"regs={sorted(self.regs)} mem={sorted(self.mem)}>")
+
+
+class ChangeTracker:
+    def __init__(self, sim):
+        self.sim = sim
+        self.current = ChangeSet(full=True)
+        # RS entry object -> (unit class, index)
+        self.where = {id(e): (unit, i) for unit, station in enumerate(sim.stations)
+                      for i, e in enumerate(station.entries)}
+        self.hooks = Hooks()
+        self._issue = self.hooks.wrap(sim, "issue_one", self._issue_one)
+        self._produce = self.hooks.wrap(sim, "produce_result", self._produce_result)
+        self._commit = self.hooks.wrap(sim, "commit_one", self._commit_one)
+        self._fast_forward = self.hooks.wrap(sim, "fast_forward", self._fast_forward_all)
+        self._squash = self.hooks.wrap(sim, "squash", self._squash_younger)
+        self._fu_assign = [self.hooks.wrap(fu, "assign", partial(self._assign, unit))
+                           for unit, fu in enumerate(sim.fus)]
+
+    def _assign(self, unit, rs_entry, cycles, busy=None):
+        self.current.rs.add(self.where[id(rs_entry)])
+        return self._fu_assign[unit](rs_entry, cycles, busy)
+
+    def _issue_one(self):
+        sim = self.sim
+        tag = sim.rob.next_tag
+        instr = sim.fetch.peek()
+        if not self._issue():
+            return False
+        if sim.rob.next_tag != tag:   # not a NOP
+            cs = self.current
+            cs.rob.add(tag)
+            unit, rd = instr.decoded[1], instr.decoded[3]
+            for i, e in enumerate(sim.stations[unit].entries):
+                if e.busy and e.dest == tag:
+                    cs.rs.add((unit, i))
+                    break
+            if rd is not None:
+                cs.regs.add(rd)
+        return True
+
+    def _produce_result(self, rs_entry):
+        cs = self.current
+        tag = rs_entry.dest
+        cs.rob.add(tag)
+        cs.rs.add(self.where[id(rs_entry)])
+        for waiter in self.sim.cdb.waiters.get(tag, ()):
+            cs.rs.add(self.where[id(waiter)])
+        self._produce(rs_entry)
+
+    def _commit_one(self):
+        head = self.sim.rob.peek_head()
+        if head is None or not head.ready:
+            return self._commit()
+        tag, typ, dest, addr = head.tag, head.typ, head.dest, head.addr
+        if not self._commit():
+            return False
+        cs = self.current
+        cs.rob.add(tag)
+        if typ == "STORE":
+            cs.mem.add(addr)
+        elif dest is not None:
+            cs.regs.add(dest)
+        return True
+
+    def _squash_younger(self, tag):
+        sim, cs = self.sim, self.current
+        cs.rob.update(range(tag + 1, sim.rob.next_tag))
+        for station in sim.stations:
+            for e in station.entries:
+                if e.busy and e.dest > tag:
+                    cs.rs.add(self.where[id(e)])
+        before = list(sim.rf.reg_status)
+        self._squash(tag)
+        cs.regs.update(r for r, (a, b) in enumerate(zip(before, sim.rf.reg_status)) if a != b)
+
+    def _fast_forward_all(self, n):
+        self.current.full = True
+        return self._fast_forward(n)
+
+    def mark_all(self):
+        """Report everything as changed (after modifying the machine directly)."""
+        self.current.full = True
+
+    def take(self) -> ChangeSet:
+        """Changes since the previous take() (everything, the first time)."""
+        cs, self.current = self.current, ChangeSet()
+        return cs
+
+    def close(self):
+        self.hooks.remove()
+        if self.sim.changes is self:
+            self.sim.changes = None
@@ -0,0 +1,343 @@
+# checkpoint.py
+# Snapshot / restore of the complete simulator state.
+#
+# A checkpoint file is an append-only store holding any number of
+# checkpoints of one run:
+#   header:     magic b"TCKP", u16 version, u32 page size in words
+#   checkpoint: u64 cycle, u64 pc, u32 core-state bytes, u32 page count,
+#               zlib(core state), then per page
+#               u64 page number, 16-byte digest, u32 bytes, zlib(page words)
+# The core state (config, counters, registers and rename maps, ROB, RS
+# entries, FU slots and output latches, branch predictor and branches in
+# flight, LSQ, cache tags) is a few hundred bytes plus the predictor table
+# and cache arrays. Memory is cut into pages and a checkpoint only carries
+# the pages whose digest changed since the previous checkpoint in the store
+# (pages that were never written are not stored at all), so periodic
+# checkpoints of a long run cost the pages it touched, not a full image
+# each time. Restoring checkpoint k reads the newest copy of
+# every page up to k.
+#
+# The program is not stored: restore() takes it again and continues fetching
+# at the checkpointed pc.
+import hashlib
+import json
+import os
+import struct
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from branch_predictor import PendingBranch
+from config import Config
+from instruction import Instruction
+from tomasulo import Tomasulo
+
+MAGIC = b"TCKP"
+VERSION = 2
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<QQII")
+PAGE = struct.Struct("<Q16sI")
+PAGE_WORDS = 1024
+
+_Q = struct.Struct("<q")
+_OPT = struct.Struct("<Bq")
+
+
+def _digest(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _is_zero(data) -> bool:
+    return not data.strip(b"\0")
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def int(self, v: int):
+        self.parts.append(_Q.pack(v))
+
+    def opt(self, v: Optional[int]):
+        self.parts.append(_OPT.pack(0, 0) if v is None else _OPT.pack(1, v))
+
+    def raw(self, b: bytes):
+        self.int(len(b))
+        self.parts.append(b)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def int(self) -> int:
+        v, = _Q.unpack_from(self.data, self.pos)
+        self.pos += _Q.size
+        return v
+
+    def opt(self) -> Optional[int]:
+        flag, v = _OPT.unpack_from(self.data, self.pos)
+        self.pos += _OPT.size
+        return v if flag else None
+
+    def raw(self) -> bytes:
+        n = self.int()
+        b = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return b
+
+
+def encode_core(sim: Tomasulo) -> bytes:
+    """Everything but memory and the program, as bytes."""
+    w = _Writer()
+    counters, history = sim.predictor.state()
+    meta = {"config": sim.config.to_dict(), "stall_cycles": sim.stall_cycles,
+            "branch_count": sim.branch_count, "mispredictions": sim.mispredictions,
+            "redirect_until": sim.redirect_until, "history": history,
+            "branches": [[tag, b.pc, b.target, b.predicted, list(b.info), b.rename, b.taken]
+                         for tag, b in sim.branches.items()],
+            "lsq": sim.lsq.state() if sim.lsq is not None else None,
+            "cdb_stalls": sim.cdb_stalls, "arbiter": sim.arbiter.state()}
+    if sim.prf is not None:
+        meta["prf"] = sim.prf.state()
+        meta["pregs"] = [e.preg for e in sim.rob]
+    cache_arrays = []
+    if sim.caches is not None:
+        meta["caches"], cache_arrays = sim.caches.state()
+    w.raw(json.dumps(meta).encode())
+    w.raw(counters)
+    for b in cache_arrays:
+        w.raw(b)
+    for v in (sim.cycle, sim.pc, sim.completed_instructions, sim.functional_instructions):
+        w.int(v)
+    if sim.prf is None:
+        w.raw(sim.rf.regs.tobytes())
+        w.raw(array("q", [t or 0 for t in sim.rf.reg_status]).tobytes())
+    else:
+        w.raw(sim.prf.values.tobytes())
+        w.raw(bytes(sim.prf.ready))
+    rob = sim.rob
+    w.int(rob.next_tag)
+    w.int(rob.count)
+    for e in rob:
+        w.raw(e.instr.pack())
+        w.int(e.ready)
+        w.opt(e.value)
+        w.opt(e.addr)
+    where = {}
+    for si, station in enumerate(sim.stations):
+        for ei, e in enumerate(station):
+            where[id(e)] = (si, ei)
+            w.int(e.dest if e.busy else 0)
+            if e.busy:
+                for v in (e.Vj, e.Vk, e.Qj, e.Qk, e.exec_cycles_left):
+                    w.opt(v)
+    for fu in sim.fus:
+        for v in (fu.now, fu.free, fu._seq, len(fu.in_flight)):
+            w.int(v)
+        for done_at, seq, entry in fu.in_flight:
+            si, ei = where[id(entry)]
+            for v in (done_at, seq, si, ei):
+                w.int(v)
+        w.int(len(fu.latched))
+        for entry in fu.latched:
+            for v in where[id(entry)]:
+                w.int(v)
+        w.raw(array("q", fu.busy_until).tobytes())
+    return w.getvalue()
+
+
+def decode_core(data: bytes, program) -> Tomasulo:
+    """Build a Tomasulo on `program` in the state encode_core saved (memory left empty)."""
+    r = _Reader(data)
+    meta = json.loads(r.raw())
+    sim = Tomasulo(program, config=Config.from_dict(meta["config"]))
+    sim.stall_cycles.update(meta["stall_cycles"])
+    sim.branch_count, sim.mispredictions = meta["branch_count"], meta["mispredictions"]
+    sim.redirect_until = meta["redirect_until"]
+    sim.cdb_stalls = meta["cdb_stalls"]
+    sim.arbiter.restore(meta["arbiter"])
+    sim.predictor.restore(r.raw(), meta["history"])
+    for tag, pc, target, predicted, info, rename, taken in meta["branches"]:
+        branch = PendingBranch(pc, target, predicted, tuple(info), rename)
+        branch.taken = taken
+        sim.branches[tag] = branch
+    if meta["lsq"] is not None:
+        sim.lsq.restore(meta["lsq"])
+    if sim.caches is not None:
+        metas = meta["caches"]
+        sim.caches.restore(metas, [r.raw() for _ in range(3 * len(metas))])
+    sim.cycle, sim.pc, sim.completed_instructions, sim.functional_instructions = r.int(), r.int(), r.int(), r.int()
+    if sim.fetch.stream is None:
+        sim.fetch.redirect(sim.pc)
+    else:
+        sim.fetch.skip(sim.pc)
+    if sim.prf is None:
+        sim.rf.regs = array("q", r.raw())
+        sim.rf.reg_status = [t or None for t in array("q", r.raw())]
+    else:
+        sim.prf.restore(meta["prf"], r.raw(), r.raw())
+    rob = sim.rob
+    rob.next_tag = r.int()
+    rob.count = r.int()
+    for tag in range(rob.head_tag, rob.next_tag):
+        instr = Instruction.from_record(*Instruction.RECORD.unpack(r.raw()))
+        e = rob.slots[(tag - 1) % rob.size]
+        e.reset(tag, instr, instr.decoded[3], instr.decoded[2])
+        e.ready = bool(r.int())
+        e.value = r.opt()
+        e.addr = r.opt()
+        if sim.prf is not None:
+            e.preg = meta["pregs"][tag - rob.head_tag]
+    for station in sim.stations:
+        for e in station:
+            tag = r.int()
+            if not tag:
+                continue
+            e.busy = True
+            e.dest = tag
+            e.instr = rob.get_entry(tag).instr
+            e.op = e.instr.opcode
+            e.Vj, e.Vk, e.Qj, e.Qk, e.exec_cycles_left = r.opt(), r.opt(), r.opt(), r.opt(), r.opt()
+            # CDB subscriptions and ready queues are rebuilt, the same way issue does
+            if e.Qj is not None:
+                sim.cdb.subscribe(e.Qj, e)
+            if e.Qk is not None and e.Qk != e.Qj:
+                sim.cdb.subscribe(e.Qk, e)
+            if e.is_ready():
+                station.push_ready(e)
+    for fu in sim.fus:
+        fu.now, fu.free, fu._seq, n = r.int(), r.int(), r.int(), r.int()
+        fu.in_flight = []
+        for _ in range(n):
+            done_at, seq, si, ei = r.int(), r.int(), r.int(), r.int()
+            fu.in_flight.append((done_at, seq, sim.stations[si].entries[ei]))
+        fu.latched = [sim.stations[r.int()].entries[r.int()] for _ in range(r.int())]
+        fu.busy_until = list(array("q", r.raw()))
+    return sim
+
+
+class CheckpointStore:
+    """
+    Append-only file of checkpoints of one run (see the layout above).
+    Opening an existing store appends to it; page digests are taken from
+    its page tables, so the next checkpoint is still incremental.
+    """
+    def __init__(self, path: str, page_words: int = PAGE_WORDS):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.f = open(path, "r+b" if exists else "w+b")
+        # per checkpoint: (cycle, pc, core offset, core bytes, {page: (offset, bytes)})
+        self.records: List[Tuple[int, int, int, int, Dict[int, Tuple[int, int]]]] = []
+        self.digests: Dict[int, bytes] = {}
+        if exists:
+            self._scan()
+        else:
+            self.page_words = page_words
+            self.f.write(HEADER.pack(MAGIC, VERSION, page_words))
+            self.f.flush()
+
+    def _scan(self):
+        f = self.f
+        magic, version, self.page_words = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path}: not a version {VERSION} checkpoint file")
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                break
+            cycle, pc, core_len, npages = RECORD.unpack(head)
+            core_at = f.tell()
+            f.seek(core_len, os.SEEK_CUR)
+            pages = {}
+            for _ in range(npages):
+                pno, digest, n = PAGE.unpack(f.read(PAGE.size))
+                pages[pno] = (f.tell(), n)
+                self.digests[pno] = digest
+                f.seek(n, os.SEEK_CUR)
+            self.records.append((cycle, pc, core_at, core_len, pages))
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def points(self) -> List[Tuple[int, int]]:
+        """(cycle, pc) of every checkpoint."""
+        return [(cycle, pc) for cycle, pc, *_ in self.records]
+
+    def save(self, sim: Tomasulo) -> int:
+        """Append a checkpoint of `sim`; returns its index."""
+        core = zlib.compress(encode_core(sim))
+        dirty = []
+        for pno, data in sim.memory.iter_pages(self.page_words):
+            digest = _digest(data)
+            prev = self.digests.get(pno)
+            if prev == digest or (prev is None and _is_zero(data)):
+                continue
+            dirty.append((pno, digest, zlib.compress(data)))
+        f = self.f
+        f.seek(0, os.SEEK_END)
+        f.write(RECORD.pack(sim.cycle, sim.pc, len(core), len(dirty)))
+        core_at = f.tell()
+        f.write(core)
+        pages = {}
+        for pno, digest, blob in dirty:
+            f.write(PAGE.pack(pno, digest, len(blob)))
+            pages[pno] = (f.tell(), len(blob))
+            f.write(blob)
+            self.digests[pno] = digest
+        f.flush()
+        self.records.append((sim.cycle, sim.pc, core_at, len(core), pages))
+        return len(self.records) - 1
+
+    def restore(self, program, index: int = -1) -> Tomasulo:
+        """A new Tomasulo on `program` in the state of checkpoint `index`."""
+        if index < 0:
+            index += len(self.records)
+        if not 0 <= index < len(self.records):
+            raise IndexError(f"checkpoint {index} not in store of {len(self.records)}")
+        f = self.f
+        _, _, core_at, core_len, _ = self.records[index]
+        f.seek(core_at)
+        sim = decode_core(zlib.decompress(f.read(core_len)), program)
+        latest = {}
+        for rec in self.records[:index + 1]:
+            latest.update(rec[4])
+        for pno in sorted(latest):
+            at, n = latest[pno]
+            f.seek(at)
+            data = zlib.decompress(f.read(n))
+            if not _is_zero(data):
+                words = array("q")
+                words.frombytes(data)
+                sim.memory.store_range(pno * self.page_words, words)
+        return sim
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"<CheckpointStore {self.path} {len(self.records)} checkpoints>"
+
+
+def save_checkpoint(sim: Tomasulo, path: str):
+    """Write a single-checkpoint file (any existing file is replaced)."""
+    if os.path.exists(path):
+        os.remove(path)
+    with CheckpointStore(path) as store:
+        store.save(sim)
+
+
+def load_checkpoint(path: str, program, index: int = -1) -> Tomasulo:
+    with CheckpointStore(path) as store:
+        return store.restore(program, index)
@@ -0,0 +1,111 @@
+# config.py
+from dataclasses import dataclass, field, asdict, replace
+from typing import Dict, Optional
+
+# unit classes, in UNIT_* order (see instruction.py)
+UNITS = ("ALU", "MUL", "LDST")
+# branch direction predictors (see branch_predictor.py)
+PREDICTORS = ("static", "bimodal", "gshare")
+REPLACEMENT = ("lru", "fifo", "random")
+# CDB arbitration policies (see cdb.py)
+ARBITERS = ("oldest", "fu_priority", "round_robin")
+
+
+@dataclass
+class Config:
+    """
+    Machine configuration (Python side of include/Config.h).
+    Per-class dicts are keyed by UNITS: "ALU" (ADD/SUB), "MUL" (MUL/DIV),
+    "LDST" (LD/ST). The defaults are the original hard-coded machine.
+    """
+    num_registers: int = 32
+    rob_size: int = 16
+    # True: results wait in the ROB and are copied to the register file at commit
+    # (include/Config.h use_ROB); False: merged physical register file of
+    # physical_registers entries with a rename map and free list (register_file.py)
+    use_rob: bool = True
+    physical_registers: int = 64
+    rs_sizes: Dict[str, int] = field(default_factory=lambda: {"ALU": 4, "MUL": 2, "LDST": 4})
+    fu_latencies: Dict[str, int] = field(default_factory=lambda: {"ALU": 1, "MUL": 3, "LDST": 2})
+    fu_counts: Dict[str, int] = field(default_factory=lambda: {"ALU": 2, "MUL": 1, "LDST": 1})
+    # None: unit busy for the whole latency, n: accepts a new op every n cycles
+    fu_initiation_intervals: Dict[str, Optional[int]] = field(default_factory=lambda: {"ALU": None, "MUL": None, "LDST": None})
+    issue_width: int = 1        # in-order issue, stops at the first stalled instruction
+    dispatch_width: Optional[int] = None   # RS -> FU starts per cycle, None: only limited by free FUs
+    cdb_width: Optional[int] = None        # results broadcast per cycle, None: every finished result
+    cdb_arbiter: str = "oldest"            # ARBITERS: who gets the bus when more results are waiting
+    commit_width: int = 1
+    fetch_buffer: int = 16
+    memory: str = "list"        # make_memory kind: "list", "sparse", "mmap"
+    mem_size: int = 256
+    branch_predictor: str = "bimodal"   # PREDICTORS: "static" (backward taken), "bimodal", "gshare"
+    predictor_entries: int = 1024       # 2-bit counters of bimodal / gshare, a power of two
+    history_bits: int = 8               # gshare global history length
+    mispredict_penalty: int = 0         # extra cycles before issue resumes on the correct path
+    lsq: bool = False                   # load/store queue: forwarding and memory-order replay (lsq.py)
+    # data caches (cache.py). l1_sets = 0: no cache, every load takes fu_latencies["LDST"];
+    # otherwise a load takes fu_latencies["LDST"] (address generation) plus the cache access
+    cache_replacement: str = "lru"      # REPLACEMENT: "lru", "fifo", "random"
+    l1_sets: int = 0
+    l1_ways: int = 4
+    l1_line_words: int = 8
+    l1_latency: int = 1
+    l1_mshrs: int = 4
+    l2_sets: int = 0                    # 0: L1 misses go straight to memory
+    l2_ways: int = 8
+    l2_line_words: int = 8
+    l2_latency: int = 8
+    l2_mshrs: int = 16
+    memory_latency: int = 50
+
+    def __post_init__(self):
+        for name in ("rs_sizes", "fu_latencies", "fu_counts", "fu_initiation_intervals"):
+            d = getattr(self, name)
+            missing = [u for u in UNITS if u not in d]
+            unknown = [u for u in d if u not in UNITS]
+            if missing or unknown:
+                raise ValueError(f"{name} must have exactly the keys {UNITS}, missing {missing}, unknown {unknown}")
+            bad = [u for u in UNITS if d[u] is not None and d[u] < 1]
+            if bad or (name != "fu_initiation_intervals" and None in d.values()):
+                raise ValueError(f"{name} values must be >= 1, got {d}")
+        for name in ("rob_size", "issue_width", "commit_width", "fetch_buffer", "num_registers"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be >= 1")
+        if not self.use_rob and self.physical_registers <= self.num_registers:
+            raise ValueError("physical_registers must be > num_registers")
+        if self.dispatch_width is not None and self.dispatch_width < 1:
+            raise ValueError("dispatch_width must be >= 1 or None")
+        if self.cdb_width is not None and self.cdb_width < 1:
+            raise ValueError("cdb_width must be >= 1 or None")
+        if self.cdb_arbiter not in ARBITERS:
+            raise ValueError(f"cdb_arbiter must be one of {ARBITERS}, got {self.cdb_arbiter!r}")
+        if self.branch_predictor not in PREDICTORS:
+            raise ValueError(f"branch_predictor must be one of {PREDICTORS}, got {self.branch_predictor!r}")
+        if self.predictor_entries < 1 or self.predictor_entries & (self.predictor_entries - 1):
+            raise ValueError("predictor_entries must be a power of two")
+        if self.history_bits < 0 or self.mispredict_penalty < 0:
+            raise ValueError("history_bits and mispredict_penalty must be >= 0")
+        if self.cache_replacement not in REPLACEMENT:
+            raise ValueError(f"cache_replacement must be one of {REPLACEMENT}, got {self.cache_replacement!r}")
+        for level in ("l1", "l2"):
+            if not getattr(self, level + "_sets"):
+                continue
+            for name in ("sets", "line_words"):
+                v = getattr(self, f"{level}_{name}")
+                if v < 1 or v & (v - 1):
+                    raise ValueError(f"{level}_{name} must be a power of two")
+            for name in ("ways", "mshrs"):
+                if getattr(self, f"{level}_{name}") < 1:
+                    raise ValueError(f"{level}_{name} must be >= 1")
+        if min(self.l1_sets, self.l2_sets, self.l1_latency, self.l2_latency, self.memory_latency) < 0:
+            raise ValueError("cache sizes and latencies must be >= 0")
+
+    def with_pipelined_fus(self, interval: int = 1) -> "Config":
+        return replace(self, fu_initiation_intervals={u: interval for u in UNITS})
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Config":
+        return cls(**d)
@@ -0,0 +1,116 @@
+# frontend.py
+from collections import deque
+from typing import Optional
+
+
+class FetchUnit:
+    """
+    Instruction source with a bounded fetch buffer in front of issue.
+    `program` can be
+      - a sequence (list, TraceReader, ...): fetched by index, nothing is copied;
+      - any other iterable / generator: pulled lazily, never materialized,
+        so traces of any length can be replayed.
+    The end of the program is detected when the source runs dry, the
+    length is never needed.
+    """
+    def __init__(self, program, buffer_size: int = 16):
+        if hasattr(program, "__getitem__") and hasattr(program, "__len__"):
+            self.program = program
+            self.stream = None
+        else:
+            self.program = None
+            self.stream = iter(program)
+        self.buffer_size = buffer_size
+        self.buffer = deque()
+        self.fetched = 0          # number of instructions pulled from the source
+        self.exhausted = False
+
+    def _fill(self):
+        buf = self.buffer
+        if self.stream is None:
+            prog = self.program
+            end = min(len(prog), self.fetched + self.buffer_size - len(buf))
+            for i in range(self.fetched, end):
+                buf.append(prog[i])
+            self.fetched = end
+            self.exhausted = end >= len(prog)
+        else:
+            stream = self.stream
+            while len(buf) < self.buffer_size:
+                try:
+                    buf.append(next(stream))
+                except StopIteration:
+                    self.exhausted = True
+                    break
+                self.fetched += 1
+
+    def peek(self) -> Optional[object]:
+        """Next instruction to issue (None when the program is finished)."""
+        if not self.buffer:
+            if self.exhausted:
+                return None
+            self._fill()
+            if not self.buffer:
+                return None
+        return self.buffer[0]
+
+    def pop(self):
+        return self.buffer.popleft()
+
+    def take(self, n: int):
+        """
+        Hand out up to n instructions past the fetch buffer (buffered ones
+        first), e.g. for functional execution. Consume the iterator fully.
+        """
+        buf = self.buffer
+        while n > 0 and buf:
+            n -= 1
+            yield buf.popleft()
+        if self.stream is None:
+            prog = self.program
+            start = self.fetched
+            end = min(len(prog), start + n)
+            for i in range(start, end):
+                self.fetched = i + 1
+                yield prog[i]
+            self.exhausted = self.fetched >= len(prog)
+        else:
+            stream = self.stream
+            while n > 0:
+                try:
+                    instr = next(stream)
+                except StopIteration:
+                    self.exhausted = True
+                    return
+                self.fetched += 1
+                n -= 1
+                yield instr
+
+    def skip(self, n: int):
+        """Drop the next n instructions without decoding them (when possible)."""
+        drop = min(n, len(self.buffer))
+        for _ in range(drop):
+            self.buffer.popleft()
+        n -= drop
+        if self.stream is None:
+            self.fetched = min(len(self.program), self.fetched + n)
+            self.exhausted = self.fetched >= len(self.program)
+        else:
+            for _ in self.take(n):
+                pass
+
+    def redirect(self, pc: int):
+        """Continue fetching at program index pc (a taken branch or a squash); drops the buffer."""
+        if self.stream is None:
+            self.buffer.clear()
+            self.fetched = pc
+            self.exhausted = not 0 <= pc < len(self.program)
+        else:
+            raise ValueError("branches need a program that can be indexed (list, PackedProgram, trace file), "
+                             "not a one-shot iterator")
+
+    def done(self) -> bool:
+        return not self.buffer and (self.exhausted or self.peek() is None)
+
+    def __repr__(self):
+        return f"<FetchUnit fetched={self.fetched} buffered={len(self.buffer)} exhausted={self.exhausted}>"
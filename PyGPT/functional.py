@@ -0,0 +1,116 @@
+# functional.py
+# Functional (non-timing) execution: architectural state only, no ROB, RS,
+# FUs or cycles. Used to fast-forward a run to a region of interest or a
+# checkpoint. Instructions take effect strictly in program order; the
+# detailed core commits the same results except when a load executes
+# before an older store to the same address has committed and the core
+# runs without a load/store queue (Config.lsq off), where it reads the old value.
+# Branches and jumps are followed (execute_program); the plain
+# execute() of an instruction stream has no way to jump and rejects them.
+from typing import Iterable, Optional, Tuple
+
+from instruction import Instruction, Opcode, UNIT_NONE, OPND_REG
+from register_file import wrap64, INT64_MIN, INT64_MAX
+
+ADD, SUB, MUL, DIV, LD, ST = Opcode.ADD, Opcode.SUB, Opcode.MUL, Opcode.DIV, Opcode.LD, Opcode.ST
+BEQ, BNE, BLT, BGE, JMP = Opcode.BEQ, Opcode.BNE, Opcode.BLT, Opcode.BGE, Opcode.JMP
+HAS_DEST, HAS_SRC1, HAS_SRC2, HAS_IMM = (Instruction.HAS_DEST, Instruction.HAS_SRC1,
+                                         Instruction.HAS_SRC2, Instruction.HAS_IMM)
+
+
+def execute(instructions: Iterable, regs, memory) -> int:
+    """
+    Execute `instructions` in order against `regs` (indexable register
+    values, e.g. RegisterFile.regs) and `memory`. Returns how many were
+    executed (NOPs included).
+    """
+    load, store = memory.load, memory.store
+    n = 0
+    for instr in instructions:
+        n += 1
+        op, unit, typ, rd, j_kind, j_val, k_kind, k_val = instr.decoded
+        if op >= BEQ:
+            raise ValueError(f"{instr!r}: branches need an indexable program, see execute_program")
+        if unit == UNIT_NONE:
+            continue
+        a = regs[j_val] if j_kind == OPND_REG else j_val
+        b = regs[k_val] if k_kind == OPND_REG else k_val
+        if op == ADD:
+            result = a + b
+        elif op == SUB:
+            result = a - b
+        elif op == MUL:
+            result = a * b
+        elif op == DIV:
+            result = a // b if b != 0 else 0
+        elif op == LD:
+            result = load(a + (instr.imm or 0))
+        else:  # ST
+            store(a + (instr.imm or 0), b if INT64_MIN <= b <= INT64_MAX else wrap64(b))
+            continue
+        if rd is not None:
+            regs[rd] = result if INT64_MIN <= result <= INT64_MAX else wrap64(result)
+    return n
+
+
+def execute_records(records: Iterable[tuple], regs, memory) -> Tuple[int, Optional[int]]:
+    """
+    execute() for raw Instruction.RECORD tuples (PackedProgram.records,
+    TraceReader.records): same semantics, without building Instruction
+    objects, which is most of the cost for packed programs and traces.
+    Stops right after a taken branch or a jump. Returns (number executed,
+    target of that branch or None).
+    """
+    load, store = memory.load, memory.store
+    n = 0
+    for op, flags, rd, rs1, rs2, imm in records:
+        n += 1
+        if op >= BEQ:
+            if op == JMP:
+                return n, imm
+            a = regs[rs1] if flags & HAS_SRC1 else 0
+            b = regs[rs2] if flags & HAS_SRC2 else 0
+            if a == b if op == BEQ else a != b if op == BNE else a < b if op == BLT else a >= b:
+                return n, imm
+            continue
+        if op == LD or op == ST:
+            addr = (regs[rs1] if flags & HAS_SRC1 else 0) + (imm if flags & HAS_IMM else 0)
+            if op == LD:
+                if flags & HAS_DEST:
+                    regs[rd] = load(addr)
+                else:
+                    load(addr)
+            else:
+                store(addr, regs[rs2] if flags & HAS_SRC2 else (imm if flags & HAS_IMM else None))
+            continue
+        if not ADD <= op <= DIV:
+            continue
+        a = regs[rs1] if flags & HAS_SRC1 else None
+        b = regs[rs2] if flags & HAS_SRC2 else (imm if flags & HAS_IMM else None)
+        if op == ADD:
+            result = a + b
+        elif op == SUB:
+            result = a - b
+        elif op == MUL:
+            result = a * b
+        else:
+            result = a // b if b != 0 else 0
+        if flags & HAS_DEST:
+            regs[rd] = result if INT64_MIN <= result <= INT64_MAX else wrap64(result)
+    return n, None
+
+
+def execute_program(program, pc: int, n: int, regs, memory) -> Tuple[int, int]:
+    """
+    Execute up to n instructions of a PackedProgram / TraceReader (anything
+    with records()) starting at index pc, following branches and jumps.
+    Stops early when control leaves the program. Returns (number executed,
+    index of the next instruction).
+    """
+    done = 0
+    end = len(program)
+    while done < n and 0 <= pc < end:
+        k, target = execute_records(program.records(pc, pc + n - done), regs, memory)
+        done += k
+        pc = pc + k if target is None else target
+    return done, pc
@@ -1,36 +1,100 @@
 # functional_unit.py
-from typing import Dict, List
+import heapq
+from typing import List, Optional
 
 class FunctionalUnit:
-    def __init__(self, name: str, latency: int, count: int = 1):
+    """
+    Pool of `count` identical units.
+    Instead of counting every slot down each cycle, the pool keeps its own
+    clock (number of steps taken) and a min-heap of absolute completion
+    times, so step() only touches the entries that finish.
+    A unit accepts a new op again `initiation_interval` cycles after the
+    last one; None means not pipelined (busy for the whole latency).
+    With a limited CDB, a finished result that has not won the bus yet
+    waits in its unit's output latch (latch / release) and keeps that unit
+    occupied.
+    """
+    def __init__(self, name: str, latency: int, count: int = 1, initiation_interval: Optional[int] = None):
         self.name = name
         self.latency = latency
-        # simple pool: each slot can run one RS entry
-        self.slots = [None] * count  # each slot stores (rs_entry)
+        self.count = count
+        self.initiation_interval = initiation_interval
+        self.now = 0
+        self.free = count
+        self._seq = 0
+        self.in_flight: List[tuple] = []   # heap of (done_at, seq, rs_entry)
+        self.busy_until: List[int] = []    # heap of times an occupied unit frees up
+        self.latched: List = []            # finished entries waiting for the CDB
+
+    @property
+    def pipelined(self):
+        return self.initiation_interval is not None
 
     def can_accept(self):
-        return any(slot is None for slot in self.slots)
+        return self.free > 0
 
-    def assign(self, rs_entry, cycles):
-        for i in range(len(self.slots)):
-            if self.slots[i] is None:
-                self.slots[i] = (rs_entry, cycles)
-                return True
-        return False
+    def assign(self, rs_entry, cycles, busy=None):
+        """
+        Start rs_entry; it finishes in `cycles`. busy: cycles the unit itself
+        is occupied if less (a load waiting on the cache), default cycles.
+        """
+        if self.free == 0:
+            return False
+        self.free -= 1
+        self._seq += 1
+        heapq.heappush(self.in_flight, (self.now + cycles, self._seq, rs_entry))
+        occupancy = cycles if busy is None else busy
+        if self.initiation_interval is not None:
+            occupancy = min(self.initiation_interval, occupancy)
+        heapq.heappush(self.busy_until, self.now + occupancy)
+        return True
 
     def step(self):
         """Advance one cycle. Return list of finished RS entries."""
+        self.now += 1
+        now = self.now
+        busy_until = self.busy_until
+        while busy_until and busy_until[0] <= now:
+            heapq.heappop(busy_until)
+            self.free += 1
         finished = []
-        for i, slot in enumerate(self.slots):
-            if slot is not None:
-                rs_entry, cycles_left = slot
-                cycles_left -= 1
-                if cycles_left <= 0:
-                    finished.append(rs_entry)
-                    self.slots[i] = None
-                else:
-                    self.slots[i] = (rs_entry, cycles_left)
+        in_flight = self.in_flight
+        while in_flight and in_flight[0][0] <= now:
+            finished.append(heapq.heappop(in_flight)[2])
         return finished
 
+    def latch(self, entries):
+        """Hold finished entries until they broadcast; each one blocks a unit."""
+        if entries:
+            self.latched.extend(entries)
+            self.free -= len(entries)
+
+    def release(self, entry):
+        """entry won the bus (or was squashed): its unit is free again."""
+        self.latched.remove(entry)
+        self.free += 1
+
+    def next_completion(self):
+        """Steps until the earliest in-flight entry finishes (None if idle)."""
+        return self.in_flight[0][0] - self.now if self.in_flight else None
+
+    def next_event(self):
+        """Steps until something finishes or a unit frees up (None if idle)."""
+        times = []
+        if self.busy_until:
+            times.append(self.busy_until[0])
+        if self.in_flight:
+            times.append(self.in_flight[0][0])
+        return min(times) - self.now if times else None
+
+    def advance(self, n: int):
+        """Skip n cycles in which nothing finishes or frees up (n < next_event())."""
+        self.now += n
+
+    @property
+    def slots(self):
+        # (rs_entry, cycles_left) for every op in flight, earliest first
+        return [(e, done - self.now) for done, _, e in sorted(self.in_flight)]
+
     def __repr__(self):
         return f"<FU {self.name} latency={self.latency} slots={self.slots}>"
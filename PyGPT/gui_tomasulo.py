@@ -1,17 +1,26 @@
 #https://chatgpt.com/share/68f8ba77-5804-8011-9216-624c2f8fb49b
 
+import queue
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 
 # Import your simulator
 try:
     from tomasulo import Tomasulo
     from instruction import Instruction
+    from assembler import AsmError, load_program
+    from sim_worker import SimWorker, capture
+    from changes import ChangeSet
 except Exception as e:
     # Provide a helpful message if imports fail
     raise ImportError("Couldn't import simulator modules. Make sure this file sits in the project folder and the other .py files are present. Original error: %s" % e)
 
 
+MEM_ROWS = 24  # rows of the memory window; only these are ever in the tree
+FRAME_MS = 33  # display refresh interval while the simulator runs
+HISTORY_KEYFRAMES = 500  # cycles between history keyframes: the most a timeline jump re-simulates
+
+
 class TomasuloGUI:
     def __init__(self, master):
         self.master = master
@@ -23,8 +32,18 @@ class TomasuloGUI:
 
         # simulation instance (created on reset/load)
         self.sim = None
+        self.program_path = None   # assembly file of the loaded program, None for the sample
+        self.changes = None   # ChangeTracker of self.sim, drives the incremental refresh
+        self.history = None   # History of self.sim, for the timeline
+        self.shown = None     # machine on display: self.sim, or a replay of an earlier cycle
+        self._setting_timeline = False
+        self.shown_pc = None
+        self.mem_base = 0     # first address in the memory window
         self.running = False
-        self.run_delay_ms = 500  # default delay between cycles when running
+        self.run_delay_ms = 500  # default delay between cycles when running (0: full speed)
+        # while running, the simulator lives on a SimWorker thread and sends Frames
+        self.worker = None
+        self.frames = queue.Queue()
 
         # top: controls
         ctrl_frame = ttk.Frame(master, padding=(6,6))
@@ -32,6 +51,7 @@ class TomasuloGUI:
         ctrl_frame.columnconfigure(6, weight=1)
 
         ttk.Button(ctrl_frame, text="Load Sample Program", command=self.load_sample).grid(row=0, column=0, padx=4)
+        ttk.Button(ctrl_frame, text="Load Program...", command=self.load_program_file).grid(row=0, column=7, padx=4, sticky="e")
         self.step_btn = ttk.Button(ctrl_frame, text="Step", command=self.step)
         self.step_btn.grid(row=0, column=1, padx=4)
         self.run_btn = ttk.Button(ctrl_frame, text="Run", command=self.toggle_run)
@@ -40,8 +60,19 @@ class TomasuloGUI:
 
         ttk.Label(ctrl_frame, text="Speed (ms):").grid(row=0, column=4, padx=(12,4))
         self.speed_var = tk.IntVar(value=self.run_delay_ms)
-        speed_spin = ttk.Spinbox(ctrl_frame, from_=50, to=2000, increment=50, textvariable=self.speed_var, width=6, command=self.update_speed)
+        speed_spin = ttk.Spinbox(ctrl_frame, from_=0, to=2000, increment=50, textvariable=self.speed_var, width=6, command=self.update_speed)
         speed_spin.grid(row=0, column=5, padx=4)
+        speed_spin.bind("<Return>", lambda e: self.update_speed())
+
+        # run to a target: stops at whichever comes first
+        ttk.Label(ctrl_frame, text="Run to cycle:").grid(row=1, column=0, sticky="e", padx=4, pady=(4,0))
+        self.until_cycle_var = tk.StringVar()
+        ttk.Entry(ctrl_frame, textvariable=self.until_cycle_var, width=10).grid(row=1, column=1, pady=(4,0))
+        ttk.Label(ctrl_frame, text="until instruction # commits:").grid(row=1, column=2, columnspan=2, sticky="e", padx=4, pady=(4,0))
+        self.until_instr_var = tk.StringVar()
+        ttk.Entry(ctrl_frame, textvariable=self.until_instr_var, width=10).grid(row=1, column=4, pady=(4,0))
+        self.run_to_btn = ttk.Button(ctrl_frame, text="Go", command=self.run_to)
+        self.run_to_btn.grid(row=1, column=5, padx=4, pady=(4,0))
 
         # Status / stats
         status_frame = ttk.Frame(master, padding=(6,0))
@@ -50,6 +81,8 @@ class TomasuloGUI:
         ttk.Label(status_frame, textvariable=self.cycle_var).grid(row=0, column=0, sticky="w")
         self.completed_var = tk.StringVar(value="Completed: 0")
         ttk.Label(status_frame, textvariable=self.completed_var).grid(row=0, column=1, sticky="w", padx=(12,0))
+        self.state_var = tk.StringVar(value="")
+        ttk.Label(status_frame, textvariable=self.state_var).grid(row=0, column=2, sticky="w", padx=(12,0))
 
         # main panes: left column (Program + ROB) | middle (RS) | right (Registers & Memory)
         panes = ttk.Frame(master, padding=(6,6))
@@ -88,6 +121,7 @@ class TomasuloGUI:
         for col in ("tag","instr","dest","type","ready","value","addr"):
             self.rob_tree.heading(col, text=col)
             self.rob_tree.column(col, width=80, anchor="center")
+        self.rob_tree.tag_configure('ready', background='#dff0d8')
         self.rob_tree.grid(row=0, column=0, sticky="nsew")
         rob_scroll = ttk.Scrollbar(rob_frame, orient="vertical", command=self.rob_tree.yview)
         self.rob_tree.config(yscrollcommand=rob_scroll.set)
@@ -106,6 +140,8 @@ class TomasuloGUI:
         self.rs_add_tree = self._make_rs_tree(self.rs_tabs, "ADD RS")
         self.rs_mul_tree = self._make_rs_tree(self.rs_tabs, "MUL RS")
         self.rs_ld_tree = self._make_rs_tree(self.rs_tabs, "LD/ST RS")
+        # indexed by unit class, like Tomasulo.stations
+        self.rs_trees = (self.rs_add_tree, self.rs_mul_tree, self.rs_ld_tree)
 
         # Right: Registers & Memory
         rm_frame = ttk.Frame(panes)
@@ -128,24 +164,46 @@ class TomasuloGUI:
         self.reg_tree.config(yscrollcommand=reg_scroll.set)
         reg_scroll.grid(row=0, column=1, sticky="ns")
 
-        mem_frame = ttk.LabelFrame(rm_frame, text="Memory (partial view)", padding=(6,6))
+        mem_frame = ttk.LabelFrame(rm_frame, text="Memory", padding=(6,6))
         mem_frame.grid(row=1, column=0, sticky="nsew", pady=(8,0))
-        mem_frame.rowconfigure(0, weight=1)
+        mem_frame.rowconfigure(1, weight=1)
         mem_frame.columnconfigure(0, weight=1)
 
-        self.mem_tree = ttk.Treeview(mem_frame, columns=("addr","val"), show="headings", height=12)
+        goto_frame = ttk.Frame(mem_frame)
+        goto_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0,4))
+        ttk.Label(goto_frame, text="Go to address:").grid(row=0, column=0, padx=(0,4))
+        self.mem_goto_var = tk.StringVar(value="0")
+        goto_entry = ttk.Entry(goto_frame, textvariable=self.mem_goto_var, width=12)
+        goto_entry.grid(row=0, column=1)
+        goto_entry.bind("<Return>", self._goto_memory)
+
+        # virtualized: the tree holds MEM_ROWS rows and the scrollbar moves the
+        # address window over the whole memory, however large
+        self.mem_tree = ttk.Treeview(mem_frame, columns=("addr","val"), show="headings", height=MEM_ROWS)
         self.mem_tree.heading("addr", text="addr")
         self.mem_tree.heading("val", text="value")
         self.mem_tree.column("addr", width=80, anchor="center")
         self.mem_tree.column("val", width=120, anchor="center")
-        self.mem_tree.grid(row=0, column=0, sticky="nsew")
-        mem_scroll = ttk.Scrollbar(mem_frame, orient="vertical", command=self.mem_tree.yview)
-        self.mem_tree.config(yscrollcommand=mem_scroll.set)
-        mem_scroll.grid(row=0, column=1, sticky="ns")
+        self.mem_tree.grid(row=1, column=0, sticky="nsew")
+        self.mem_scroll = ttk.Scrollbar(mem_frame, orient="vertical", command=self._scroll_memory)
+        self.mem_scroll.grid(row=1, column=1, sticky="ns")
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.mem_tree.bind(seq, self._wheel_memory)
+
+        # timeline: scrub back through the recorded history of the run
+        timeline_frame = ttk.Frame(master, padding=(6,0))
+        timeline_frame.grid(row=3, column=0, sticky="ew")
+        timeline_frame.columnconfigure(2, weight=1)
+        ttk.Label(timeline_frame, text="Timeline:").grid(row=0, column=0, padx=(0,4))
+        ttk.Button(timeline_frame, text="<", width=2, command=lambda: self._scrub_by(-1)).grid(row=0, column=1)
+        self.timeline = ttk.Scale(timeline_frame, orient="horizontal", from_=0, to=0, command=self._scrub)
+        self.timeline.grid(row=0, column=2, sticky="ew", padx=4)
+        ttk.Button(timeline_frame, text=">", width=2, command=lambda: self._scrub_by(1)).grid(row=0, column=3)
+        ttk.Button(timeline_frame, text="Live", command=self._go_live).grid(row=0, column=4, padx=(8,0))
 
         # footer: tips
-        tip = ttk.Label(master, text="Tip: load the sample program and press Run. Step executes one cycle." )
-        tip.grid(row=3, column=0, sticky="w", padx=8, pady=(4,8))
+        tip = ttk.Label(master, text="Tip: load the sample program and press Run. Step executes one cycle. Drag the timeline to look back." )
+        tip.grid(row=4, column=0, sticky="w", padx=8, pady=(4,8))
 
         self.reset_sim()
 
@@ -167,10 +225,11 @@ class TomasuloGUI:
         return tree
 
     def reset_sim(self):
-        # create a fresh simulator with sample program
-        self.load_sample()
-        self.running = False
-        self.run_btn.config(text="Run")
+        # create a fresh simulator with the current program
+        if self.program_path is not None:
+            self._load_file(self.program_path)
+        else:
+            self.load_sample()
 
     def load_sample(self):
         # build a sample program (same as earlier example) and show in listbox
@@ -182,15 +241,41 @@ class TomasuloGUI:
             Instruction("SUB", dest="R5", src1="R4", src2="R2"),
             Instruction("ST", dest=None, src1=None, src2="R5", imm=12),
         ]
-        self.sim = Tomasulo(prog, reg_count=16, rob_size=8)
+        self.program_path = None
+        self._start_program(prog, [(10, [5, 7])])
+
+    def load_program_file(self):
+        path = filedialog.askopenfilename(title="Load assembly program",
+                                          filetypes=[("Assembly source", "*.s *.asm"), ("All files", "*")])
+        if path:
+            self._load_file(path)
+
+    def _load_file(self, path):
+        # assembled once, then loaded from the assembler's cache while the file is unchanged
+        try:
+            prog = load_program(path)
+        except (OSError, AsmError) as e:
+            messagebox.showerror("Cannot load program", str(e))
+            return
+        self.program_path = path
+        self._start_program(prog.instructions, prog.data, max(16, prog.num_registers), prog.data_end)
+
+    def _start_program(self, prog, data, reg_count=16, data_end=0):
+        """New simulator for `prog` with memory initialized from (address, words) segments."""
+        self._stop_worker()
+        self.sim = Tomasulo(prog, reg_count=reg_count, rob_size=8, mem_size=max(256, data_end))
         # init memory
-        self.sim.memory.store(10, 5)
-        self.sim.memory.store(11, 7)
+        for addr, words in data:
+            self.sim.memory.store_range(addr, words)
+        self.changes = self.sim.track_changes()
+        self.history = self.sim.record_history(HISTORY_KEYFRAMES)
+        self.shown = self.sim
+        self.shown_pc = None
+        self.state_var.set("")
 
         # populate program listbox
         self.prog_listbox.delete(0, tk.END)
-        for i, instr in enumerate(prog):
-            self.prog_listbox.insert(tk.END, f"{i}: {repr(instr)}")
+        self.prog_listbox.insert(tk.END, *(f"{i}: {repr(instr)}" for i, instr in enumerate(prog)))
         # highlight PC (0)
         if self.prog_listbox.size() > 0:
             self.prog_listbox.selection_clear(0, tk.END)
@@ -203,12 +288,17 @@ class TomasuloGUI:
         try:
             self.run_delay_ms = int(self.speed_var.get())
         except Exception:
-            pass
+            return
+        if self.worker is not None:
+            self.worker.delay = self.run_delay_ms / 1000
 
     def step(self):
         if not self.sim:
             messagebox.showwarning("No simulator","Load a program first")
             return
+        if self.running:
+            return
+        self._go_live()
         # run a single cycle
         self.sim.run_cycle(verbose=False)
         self.update_all_views()
@@ -217,85 +307,228 @@ class TomasuloGUI:
         if not self.sim:
             messagebox.showwarning("No simulator","Load a program first")
             return
-        self.running = not self.running
-        self.run_btn.config(text="Pause" if self.running else "Run")
         if self.running:
-            self._run_loop()
+            self.worker.stop()   # _poll_frames finishes up once the thread has stopped
+        else:
+            self._start_worker()
 
-    def _run_loop(self):
-        if not self.running:
+    def run_to(self):
+        if not self.sim or self.running:
             return
-        # step one cycle
-        if self.sim.completed_instructions < len(self.sim.program):
-            self.sim.run_cycle(verbose=False)
-            self.update_all_views()
-            # schedule next
-            self.master.after(self.run_delay_ms, self._run_loop)
-        else:
-            self.running = False
-            self.run_btn.config(text="Run")
+        try:
+            until_cycle = int(self.until_cycle_var.get()) if self.until_cycle_var.get().strip() else None
+            until_instr = int(self.until_instr_var.get()) if self.until_instr_var.get().strip() else None
+        except ValueError:
+            messagebox.showwarning("Bad target", "Cycle and instruction targets must be whole numbers")
+            return
+        if until_cycle is None and until_instr is None:
+            messagebox.showwarning("No target", "Enter a cycle and/or an instruction number")
+            return
+        self._start_worker(until_cycle, until_instr)
+
+    def _start_worker(self, until_cycle=None, until_instruction=None):
+        if self.sim.done():
+            messagebox.showinfo("Finished","Simulation finished all instructions")
+            return
+        self._go_live()
+        self.update_speed()
+        self.worker = SimWorker(self.sim, self.changes, self.frames, until_cycle, until_instruction,
+                                delay=self.run_delay_ms / 1000)
+        self.running = True
+        self.run_btn.config(text="Pause")
+        self.step_btn.state(["disabled"])
+        self.run_to_btn.state(["disabled"])
+        self.state_var.set("running")
+        self.worker.start()
+        self.master.after(FRAME_MS, self._poll_frames)
+
+    def _stop_worker(self):
+        """Stop a running worker and wait for it (before replacing the simulator)."""
+        worker, self.worker = self.worker, None
+        if worker is not None:
+            worker.stop()
+            worker.join()
+        while not self.frames.empty():
+            self.frames.get_nowait()
+        self._run_stopped()
+
+    def _run_stopped(self):
+        self.running = False
+        self.run_btn.config(text="Run")
+        self.step_btn.state(["!disabled"])
+        self.run_to_btn.state(["!disabled"])
+
+    def _poll_frames(self):
+        worker = self.worker
+        if worker is None:
+            return   # stopped by _stop_worker
+        alive = worker.is_alive()
+        # everything published since the last frame, drawn once
+        frame = None
+        while True:
+            try:
+                newer = self.frames.get_nowait()
+            except queue.Empty:
+                break
+            frame = newer if frame is None else frame.merge(newer)
+        if frame is not None:
+            self._render(frame)
+        if alive:
+            self.master.after(FRAME_MS, self._poll_frames)
+            return
+        # the thread has finished and its last frame was drained above
+        self.worker = None
+        self._run_stopped()
+        reason = worker.stop_reason
+        self.state_var.set({"done": "finished", "cycle": f"reached cycle {self.sim.cycle}",
+                            "instruction": f"instruction {self.sim.completed_instructions} committed",
+                            "stopped": "paused"}[reason])
+        if reason == "done":
             messagebox.showinfo("Finished","Simulation finished all instructions")
 
     def update_all_views(self):
         if not self.sim:
             return
+        self._render(capture(self.sim, self.changes.take()))
+
+    def _render(self, frame):
         # update status
-        self.cycle_var.set(f"Cycle: {self.sim.cycle}")
-        self.completed_var.set(f"Completed: {self.sim.completed_instructions}")
+        self.cycle_var.set(f"Cycle: {frame.cycle}")
+        self.completed_var.set(f"Completed: {frame.completed}")
+        if self.shown is self.sim:
+            self._set_timeline(frame.cycle, frame.cycle)
 
         # highlight PC in program listbox
         if self.prog_listbox.size() > 0:
-            pc = min(self.sim.pc, self.prog_listbox.size()-1)
-            self.prog_listbox.selection_clear(0, tk.END)
-            if pc >= 0:
+            pc = min(frame.pc, self.prog_listbox.size()-1)
+            if pc != self.shown_pc:
+                self.prog_listbox.selection_clear(0, tk.END)
                 self.prog_listbox.selection_set(pc)
                 self.prog_listbox.see(pc)
+                self.shown_pc = pc
 
-        # ROB
-        for i in self.rob_tree.get_children():
-            self.rob_tree.delete(i)
-        try:
-            entries = list(self.sim.rob.entries)
-        except Exception:
-            entries = []
-        for e in entries:
-            self.rob_tree.insert("", "end", values=(e.tag, repr(e.instr), e.dest, e.typ, str(e.ready), str(e.value), str(e.addr)))
-
-        # RS tables
-        self._update_rs_tree(self.rs_add_tree, self.sim.rs_add)
-        self._update_rs_tree(self.rs_mul_tree, self.sim.rs_mul)
-        self._update_rs_tree(self.rs_ld_tree, self.sim.rs_ldst)
-
-        # Registers
-        for i in self.reg_tree.get_children():
-            self.reg_tree.delete(i)
-        for r in sorted(self.sim.rf.regs.keys(), key=lambda x: int(x[1:])):
-            val = self.sim.rf.read(r)
-            status = self.sim.rf.get_status(r)
-            self.reg_tree.insert("", "end", values=(r, val, str(status)))
-
-        # Memory (show first 64 locations by default)
-        for i in self.mem_tree.get_children():
-            self.mem_tree.delete(i)
-        memview = list(enumerate(self.sim.memory.mem[:64]))
-        for addr, val in memview:
-            self.mem_tree.insert("", "end", values=(addr, val))
-
-        # visually emphasize ROB ready entries and busy RS rows using tags
-        for iid in self.rob_tree.get_children():
-            vals = self.rob_tree.item(iid, 'values')
-            if vals and vals[4] == 'True':
-                self.rob_tree.item(iid, tags=('ready',))
+        # only the rows the simulator reports as changed are touched
+        if frame.full:
+            self._rebuild_views(frame)
+            return
+        self._update_rob(frame.rob)
+        for (unit, i), values in frame.rs.items():
+            self.rs_trees[unit].item(str(i), values=values)
+        for r, values in frame.regs.items():
+            self.reg_tree.item(str(r), values=values)
+        rows = len(self.mem_tree.get_children())
+        for addr, val in frame.mem.items():
+            if self.mem_base <= addr < self.mem_base + rows:
+                self.mem_tree.item(str(addr - self.mem_base), values=(addr, val))
+
+    def _rebuild_views(self, frame):
+        """Refill every view from a full frame (new program, or a change the tracker could not follow)."""
+        self.rob_tree.delete(*self.rob_tree.get_children())
+        self._update_rob(frame.rob)
+        for tree in self.rs_trees:
+            tree.delete(*tree.get_children())
+        for (unit, i), values in sorted(frame.rs.items()):
+            self.rs_trees[unit].insert("", "end", iid=str(i), values=values)
+        self.reg_tree.delete(*self.reg_tree.get_children())
+        for r, values in sorted(frame.regs.items()):
+            self.reg_tree.insert("", "end", iid=str(r), values=values)
+        self.mem_tree.delete(*self.mem_tree.get_children())
+        self._show_memory(self.mem_base)
+
+    def _update_rob(self, rows):
+        # ROB rows are keyed by tag; new tags are always the youngest, so they go at the end
+        for tag in sorted(rows):
+            values = rows[tag]
+            iid = str(tag)
+            if values is None:
+                if self.rob_tree.exists(iid):
+                    self.rob_tree.delete(iid)
+                continue
+            # visually emphasize ROB ready entries
+            row_tags = ('ready',) if values[4] == 'True' else ()
+            if self.rob_tree.exists(iid):
+                self.rob_tree.item(iid, values=values, tags=row_tags)
             else:
-                self.rob_tree.item(iid, tags=())
-        self.rob_tree.tag_configure('ready', background='#dff0d8')
+                self.rob_tree.insert("", "end", iid=iid, values=values, tags=row_tags)
+
+    def _show_memory(self, base):
+        """Show the window of memory starting at `base` (clamped to the memory)."""
+        size = self.shown.memory.size
+        rows = min(MEM_ROWS, size)
+        base = max(0, min(base, size - rows))
+        self.mem_base = base
+        if len(self.mem_tree.get_children()) != rows:
+            self.mem_tree.delete(*self.mem_tree.get_children())
+            for i in range(rows):
+                self.mem_tree.insert("", "end", iid=str(i))
+        for i, val in enumerate(self.shown.memory.load_range(base, rows)):
+            self.mem_tree.item(str(i), values=(base + i, val))
+        self.mem_scroll.set(base / size, (base + rows) / size)
+
+    def _scroll_memory(self, action, amount, unit=None):
+        # Scrollbar command: ("moveto", fraction) or ("scroll", n, "units" / "pages")
+        if not self.sim:
+            return
+        if action == "moveto":
+            base = int(float(amount) * self.shown.memory.size)
+        else:
+            step = MEM_ROWS if unit == "pages" else 1
+            base = self.mem_base + int(amount) * step
+        self._show_memory(base)
+
+    def _wheel_memory(self, event):
+        if self.sim:
+            up = event.num == 4 or getattr(event, "delta", 0) > 0
+            self._show_memory(self.mem_base + (-3 if up else 3))
+        return "break"
 
-    def _update_rs_tree(self, tree, rs_obj):
-        for i in tree.get_children():
-            tree.delete(i)
-        for e in rs_obj.entries:
-            exec_left = getattr(e, 'exec_cycles_left', None)
-            tree.insert("", "end", values=(e.name, str(e.op), str(e.busy), str(e.Vj), str(e.Vk), str(e.Qj), str(e.Qk), str(e.dest), str(exec_left)))
+    def _goto_memory(self, event=None):
+        if not self.sim:
+            return
+        try:
+            addr = int(self.mem_goto_var.get(), 0)
+        except ValueError:
+            messagebox.showwarning("Bad address", f"Not an address: {self.mem_goto_var.get()!r}")
+            return
+        self._show_memory(addr)
+
+    # --- timeline ---
+    def _set_timeline(self, end, value):
+        self._setting_timeline = True   # moving the scale must not look like a user scrub
+        try:
+            self.timeline.config(from_=self.history.first_cycle, to=end)
+            self.timeline.set(value)
+        finally:
+            self._setting_timeline = False
+
+    def _scrub(self, value):
+        if self._setting_timeline or self.running or not self.sim:
+            return
+        self._show_cycle(int(float(value)))
+
+    def _scrub_by(self, delta):
+        if self.running or not self.sim:
+            return
+        self._show_cycle(self.shown.cycle + delta)
+
+    def _show_cycle(self, cycle):
+        """Display the machine at the end of `cycle`, replayed from the history."""
+        cycle = max(self.history.first_cycle, cycle)
+        if cycle >= self.sim.cycle:
+            self._go_live()
+            return
+        self.shown = self.history.seek(cycle)
+        self._render(capture(self.shown, ChangeSet(full=True)))
+        self._set_timeline(self.sim.cycle, cycle)
+        self.state_var.set(f"viewing history (live: cycle {self.sim.cycle})")
+
+    def _go_live(self):
+        if self.sim is None or self.shown is self.sim:
+            return
+        self.shown = self.sim
+        self.changes.mark_all()
+        self.update_all_views()
+        self.state_var.set("")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+# history.py
+# Time travel: rebuild the machine as it was at any earlier cycle of a run.
+#
+#   history = sim.record_history(keyframe_interval=1000)
+#   sim.run(10**6)
+#   past = history.seek(123_456)     # a Tomasulo at the end of cycle 123456
+#
+# Two things are recorded while the run goes on:
+#   keyframes  every ~keyframe_interval cycles, the compressed core state
+#              (checkpoint.encode_core: registers, rename table, ROB, RS, FUs;
+#              a few hundred bytes)
+#   write log  per memory write, the address and the value it replaced
+#              (16 bytes), which is the only state a keyframe leaves out
+# Everything else the core does in a cycle is a function of its state, so
+# seek() restores the nearest keyframe at or before the target, rolls a
+# copy of today's memory back to that keyframe with the write log, and
+# simulates forward to the target: at most keyframe_interval cycles,
+# whatever the length of the run. 10^6 cycles of history take about
+# 10^6 / interval keyframes plus the write log, a few MB in total.
+import bisect
+import zlib
+from array import array
+from typing import List, Tuple
+
+from checkpoint import encode_core, decode_core
+from hooks import Hooks
+from memory import copy_memory
+
+
+class History:
+    def __init__(self, sim, keyframe_interval: int = 1000):
+        if sim.program is None:
+            raise ValueError("history needs a program it can replay (a list, PackedProgram or trace file), "
+                             "not a one-shot iterator")
+        self.sim = sim
+        self.interval = keyframe_interval
+        # (cycle, write-log length at that point, zlib(core state)), in cycle order
+        self.keyframes: List[Tuple[int, int, bytes]] = []
+        self.keyframe_cycles: List[int] = []
+        self.addrs = array("q")
+        self.old_values = array("q")
+        self.replay = None
+        self._replay_key = None   # index of the keyframe self.replay was built from
+        self.hooks = Hooks()
+        self._commit = self.hooks.wrap(sim, "commit", self._commit_stage)
+        self._fast_forward = self.hooks.wrap(sim, "fast_forward", self._fast_forward_keyframe)
+        self._store = self.hooks.wrap(sim.memory, "store", self._logged_store)
+        self._keyframe()
+
+    # --- recording ---
+    def _keyframe(self):
+        sim = self.sim
+        if self.keyframe_cycles and self.keyframe_cycles[-1] == sim.cycle:
+            # same cycle again (after fast_forward): the later state wins
+            self.keyframes.pop()
+            self.keyframe_cycles.pop()
+        self.keyframes.append((sim.cycle, len(self.addrs), zlib.compress(encode_core(sim))))
+        self.keyframe_cycles.append(sim.cycle)
+        self.next_keyframe = sim.cycle + self.interval
+
+    def _commit_stage(self):
+        # commit ends every simulated cycle (run_cycle and drain)
+        self._commit()
+        if self.sim.cycle >= self.next_keyframe:
+            self._keyframe()
+
+    def _fast_forward_keyframe(self, n):
+        # functional execution takes no cycles, so it cannot be replayed by simulating forward
+        done = self._fast_forward(n)
+        self._keyframe()
+        return done
+
+    def _logged_store(self, addr, value):
+        self.addrs.append(addr)
+        self.old_values.append(self.sim.memory.load(addr))
+        self._store(addr, value)
+
+    # --- replay ---
+    @property
+    def first_cycle(self) -> int:
+        return self.keyframe_cycles[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the history (keyframes and write log)."""
+        return (sum(len(k[2]) for k in self.keyframes)
+                + self.addrs.itemsize * len(self.addrs) + self.old_values.itemsize * len(self.old_values))
+
+    def seek(self, cycle: int):
+        """
+        A separate Tomasulo in the state at the end of `cycle` (between the
+        first recorded cycle and the live one). The same object is reused and
+        moved forward when possible, so stepping through cycles in order is
+        cheap; do not modify it.
+        """
+        sim = self.sim
+        if not self.first_cycle <= cycle <= sim.cycle:
+            raise ValueError(f"cycle {cycle} outside the recorded range {self.first_cycle}..{sim.cycle}")
+        key = bisect.bisect_right(self.keyframe_cycles, cycle) - 1
+        replay = self.replay
+        if replay is None or key != self._replay_key or replay.cycle > cycle:
+            replay = self._restore(key)
+        replay.run(cycle, event_driven=True)
+        self.replay, self._replay_key = replay, key
+        return replay
+
+    def _restore(self, key: int):
+        cycle, writes, core = self.keyframes[key]
+        replay = decode_core(zlib.decompress(core), self.sim.program)
+        memory = copy_memory(self.sim.memory)
+        store = memory.store
+        for i in range(len(self.addrs) - 1, writes - 1, -1):
+            store(self.addrs[i], self.old_values[i])
+        replay.memory = memory
+        return replay
+
+    def close(self):
+        self.hooks.remove()
+        if self.sim.history is self:
+            self.sim.history = None
@@ -0,0 +1,37 @@
+# hooks.py
+# Instance-level method wrapping for the opt-in instrumentation
+# (pipeline_trace.py, changes.py). A wrapper replaces a method on one object
+# only, so other instances, and this one once the hooks are removed, run the
+# plain class code. Wrappers installed by different tools chain: each one
+# gets the method that was in place before it.
+
+
+class Hooks:
+    def __init__(self):
+        self.active = True
+        self.saved = []   # (obj, name, installed wrapper, previous instance attribute or None)
+
+    def wrap(self, obj, name: str, fn):
+        """Install fn as obj.<name>; returns the method it replaces, for fn to call."""
+        inner = getattr(obj, name)
+
+        def hooked(*args):
+            return fn(*args) if self.active else inner(*args)
+        self.saved.append((obj, name, hooked, obj.__dict__.get(name)))
+        setattr(obj, name, hooked)
+        return inner
+
+    def remove(self):
+        """
+        Undo wrap(). A wrapper that another tool has wrapped since cannot be
+        unlinked from its chain; it stays in place and just passes through.
+        """
+        self.active = False
+        for obj, name, hooked, prev in reversed(self.saved):
+            if obj.__dict__.get(name) is not hooked:
+                continue
+            if prev is None:
+                del obj.__dict__[name]
+            else:
+                setattr(obj, name, prev)
+        self.saved.clear()
@@ -1,21 +1,127 @@
 # instruction.py
-from typing import Optional
+import struct
+from enum import IntEnum
+from typing import Optional, Union
+
+class Opcode(IntEnum):
+    NOP = 0
+    ADD = 1
+    SUB = 2
+    MUL = 3
+    DIV = 4
+    LD = 5
+    ST = 6
+    # control flow: imm is the absolute target (instruction index)
+    BEQ = 7
+    BNE = 8
+    BLT = 9
+    BGE = 10
+    JMP = 11
+
+# conditional branches are BEQ..BGE
+BRANCH_OPS = (Opcode.BEQ, Opcode.BNE, Opcode.BLT, Opcode.BGE)
+
+# reservation station / functional unit class an opcode issues to
+UNIT_NONE, UNIT_ADD, UNIT_MUL, UNIT_LDST = -1, 0, 1, 2
+# operand kinds resolved by the pre-decode pass
+OPND_NONE, OPND_REG, OPND_IMM = 0, 1, 2
+
+_UNITS = {
+    Opcode.ADD: (UNIT_ADD, "ALU"), Opcode.SUB: (UNIT_ADD, "ALU"),
+    Opcode.MUL: (UNIT_MUL, "MUL"), Opcode.DIV: (UNIT_MUL, "MUL"),
+    Opcode.LD: (UNIT_LDST, "LOAD"), Opcode.ST: (UNIT_LDST, "STORE"),
+    # branches compare on the ALUs; JMP never leaves the front end
+    Opcode.BEQ: (UNIT_ADD, "BRANCH"), Opcode.BNE: (UNIT_ADD, "BRANCH"),
+    Opcode.BLT: (UNIT_ADD, "BRANCH"), Opcode.BGE: (UNIT_ADD, "BRANCH"),
+}
+
+_reg_names = []
+
+def reg_name(idx: int) -> str:
+    """Index -> "R<idx>" (strings are built once and shared)."""
+    while len(_reg_names) <= idx:
+        _reg_names.append(f"R{len(_reg_names)}")
+    return _reg_names[idx]
+
+def reg_index(reg) -> Optional[int]:
+    """"R5" / "r5" / 5 -> 5, None -> None."""
+    if reg is None or isinstance(reg, int):
+        return reg
+    if reg[:1] in ("R", "r") and reg[1:].isdigit():
+        return int(reg[1:])
+    raise ValueError(f"bad register name {reg!r}")
+
 
 class Instruction:
     """
     Simple instruction representation.
-    opcode: string like "ADD", "SUB", "MUL", "DIV", "LD", "ST"
+    opcode: string like "ADD", "SUB", "MUL", "DIV", "LD", "ST" (unknown opcodes become NOP),
+            or a branch "BEQ", "BNE", "BLT", "BGE" / jump "JMP"
     dest: destination register (for LD/ALU), or None for stores (stores use src2 as value)
-    src1, src2: source registers or immediate (for LD store address we use immediate)
-    imm: immediate for load/store addresses
-    """
-    def __init__(self, opcode: str, dest: Optional[str]=None,
-                 src1: Optional[str]=None, src2: Optional[str]=None, imm: Optional[int]=None):
-        self.opcode = opcode.upper()
-        self.dest = dest
-        self.src1 = src1
-        self.src2 = src2
+    src1, src2: source registers or immediate (for LD store address we use immediate);
+                branches compare src1 with src2 (with 0 if there is no src2)
+    imm: immediate for load/store addresses, target instruction index for branches and JMP
+    Registers are given as "R5"-style names or integer indices (None: no register).
+    Internally the opcode is an Opcode and registers are integer indices;
+    dest/src1/src2/opcode are views kept for printing and existing callers.
+    """
+    __slots__ = ("op", "rd", "rs1", "rs2", "imm", "_decoded")
+
+    def __init__(self, opcode, dest: Union[str, int, None]=None,
+                 src1: Union[str, int, None]=None, src2: Union[str, int, None]=None, imm: Optional[int]=None):
+        if isinstance(opcode, str):
+            opcode = Opcode.__members__.get(opcode.upper(), Opcode.NOP)
+        self.op = int(opcode)
+        self.rd = reg_index(dest)
+        self.rs1 = reg_index(src1)
+        self.rs2 = reg_index(src2)
         self.imm = imm
+        self._decoded = None
+
+    @property
+    def opcode(self) -> str:
+        return Opcode(self.op).name
+
+    @property
+    def dest(self) -> Optional[str]:
+        return reg_name(self.rd) if self.rd is not None else None
+
+    @property
+    def src1(self) -> Optional[str]:
+        return reg_name(self.rs1) if self.rs1 is not None else None
+
+    @property
+    def src2(self) -> Optional[str]:
+        return reg_name(self.rs2) if self.rs2 is not None else None
+
+    @property
+    def decoded(self):
+        """Pre-decoded form, computed once per static instruction (see predecode)."""
+        d = self._decoded
+        if d is None:
+            d = self._decoded = predecode(self)
+        return d
+
+    # --- packed form: one fixed-width record per instruction ---
+    # u8 opcode, u8 flags (which fields are present), u16 dest, u16 src1, u16 src2, i32 imm
+    RECORD = struct.Struct("<BBHHHi")
+    HAS_DEST, HAS_SRC1, HAS_SRC2, HAS_IMM = 1, 2, 4, 8
+
+    def pack(self) -> bytes:
+        flags = ((self.HAS_DEST if self.rd is not None else 0) | (self.HAS_SRC1 if self.rs1 is not None else 0)
+                 | (self.HAS_SRC2 if self.rs2 is not None else 0) | (self.HAS_IMM if self.imm is not None else 0))
+        return self.RECORD.pack(self.op, flags, self.rd or 0, self.rs1 or 0, self.rs2 or 0, self.imm or 0)
+
+    @classmethod
+    def from_record(cls, op: int, flags: int, rd: int, rs1: int, rs2: int, imm: int) -> "Instruction":
+        instr = cls.__new__(cls)
+        instr.op = op
+        instr.rd = rd if flags & cls.HAS_DEST else None
+        instr.rs1 = rs1 if flags & cls.HAS_SRC1 else None
+        instr.rs2 = rs2 if flags & cls.HAS_SRC2 else None
+        instr.imm = imm if flags & cls.HAS_IMM else None
+        instr._decoded = None
+        return instr
 
     def __repr__(self):
         parts = [self.opcode]
@@ -24,3 +130,117 @@ class Instruction:
         if self.src2: parts.append(self.src2)
         if self.imm is not None: parts.append(f"#{self.imm}")
         return "<" + " ".join(parts) + ">"
+
+
+def predecode(instr: Instruction) -> tuple:
+    """
+    Resolve everything issue needs from a static instruction, once:
+      (op, unit, typ, rd, j_kind, j_val, k_kind, k_val)
+    unit is the RS/FU class (UNIT_*), typ the ROB entry type, and the
+    j/k operands are (OPND_REG, reg index), (OPND_IMM, value) or (OPND_NONE, None).
+    LD/ST address = Vj + imm, where Vj is the base register or 0.
+    Branches compare Vj with Vk; their target stays in instr.imm.
+    """
+    op = instr.op
+    unit, typ = _UNITS.get(op, (UNIT_NONE, None))
+    if Opcode.BEQ <= op <= Opcode.BGE:
+        j = (OPND_REG, instr.rs1) if instr.rs1 is not None else (OPND_IMM, 0)
+        k = (OPND_REG, instr.rs2) if instr.rs2 is not None else (OPND_IMM, 0)
+        rd = None
+    elif op == Opcode.LD or op == Opcode.ST:
+        j = (OPND_REG, instr.rs1) if instr.rs1 is not None else (OPND_IMM, 0)
+        if op == Opcode.LD:
+            k = (OPND_NONE, None)
+        else:
+            # store value: src2 register, or the immediate
+            k = (OPND_REG, instr.rs2) if instr.rs2 is not None else (OPND_IMM, instr.imm)
+        rd = instr.rd if op == Opcode.LD else None
+    else:
+        j = (OPND_REG, instr.rs1) if instr.rs1 is not None else (OPND_NONE, None)
+        if instr.rs2 is not None:
+            k = (OPND_REG, instr.rs2)
+        elif instr.imm is not None:
+            k = (OPND_IMM, instr.imm)
+        else:
+            k = (OPND_NONE, None)
+        rd = instr.rd
+    return (op, unit, typ, rd, j[0], j[1], k[0], k[1])
+
+
+class InstructionCache(dict):
+    """
+    RECORD fields -> Instruction, built (and pre-decoded) the first time a
+    record is seen. Packed programs and traces index through it, so a loop
+    body or a hot instruction of a trace is decoded once, not every time it
+    is fetched. Keyed by content, it holds one object per distinct
+    instruction; with maxsize, the oldest entry is dropped once that many
+    are held, so a long trace of mostly distinct records stays bounded. The
+    instructions are shared and must be treated as read-only.
+    """
+    def __init__(self, maxsize: Optional[int] = None):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __missing__(self, fields):
+        if self.maxsize is not None and len(self) >= self.maxsize:
+            del self[next(iter(self))]
+        instr = self[fields] = Instruction.from_record(*fields)
+        return instr
+
+
+class PackedProgram:
+    """
+    Program stored as one Instruction.RECORD (12 bytes) per instruction in a
+    bytearray instead of one Python object each. Indexing returns an
+    Instruction (shared per distinct record, see InstructionCache), so it
+    can be passed straight to Tomasulo.
+    """
+    def __init__(self, instructions=()):
+        self.data = bytearray()
+        self.cache = InstructionCache()
+        for instr in instructions:
+            self.append(instr)
+
+    @classmethod
+    def frombytes(cls, data) -> "PackedProgram":
+        if len(data) % Instruction.RECORD.size:
+            raise ValueError("packed program size is not a multiple of the record size")
+        prog = cls()
+        prog.data = bytearray(data)
+        return prog
+
+    def append(self, instr: Instruction):
+        self.data += instr.pack()
+
+    def extend(self, instructions):
+        for instr in instructions:
+            self.append(instr)
+
+    def __len__(self):
+        return len(self.data) // Instruction.RECORD.size
+
+    def __getitem__(self, i: int) -> Instruction:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return self.cache[Instruction.RECORD.unpack_from(self.data, i * Instruction.RECORD.size)]
+
+    def __iter__(self):
+        cache = self.cache
+        for fields in Instruction.RECORD.iter_unpack(self.data):
+            yield cache[fields]
+
+    def records(self, start: int = 0, stop: Optional[int] = None):
+        """Raw RECORD tuples of instructions start..stop-1 (no Instruction objects)."""
+        size = Instruction.RECORD.size
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start < stop:
+            yield from Instruction.RECORD.iter_unpack(memoryview(self.data)[start * size:stop * size])
+
+    def tobytes(self) -> bytes:
+        return bytes(self.data)
+
+    def __repr__(self):
+        return f"<PackedProgram {len(self)} instructions>"
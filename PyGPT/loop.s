@@ -0,0 +1,25 @@
+; loop.s - sum and maximum of an array, a loop with a data-dependent branch
+;   python run_program.py loop.s --stats --dump 40:42
+;   python run_program.py loop.s --set branch_predictor=gshare --stats
+        .equ    N, 16
+        .data
+        .org    8
+xs:     .word   3, 9, 1, 14, 2, 7, 7, 20, 5, 11, 0, 6, 19, 4, 8, 13
+        .org    40
+sum:    .space  1
+max:    .space  1
+
+        .text
+        ADD     R1, R0, #N      ; R1 = elements left
+        ADD     R2, R0, #xs     ; R2 = pointer
+        ADD     R3, R0, #0      ; R3 = sum
+        ADD     R4, R0, #0      ; R4 = max
+loop:   LD      R5, 0(R2)
+        ADD     R3, R3, R5
+        BGE     R4, R5, next    ; keep the max unless R5 is larger
+        ADD     R4, R5, #0
+next:   ADD     R2, R2, #1
+        SUB     R1, R1, #1
+        BNE     R1, loop
+        ST      R3, sum
+        ST      R4, max
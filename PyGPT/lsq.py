@@ -0,0 +1,113 @@
+# lsq.py
+# Load/store queue: memory disambiguation for the out-of-order core
+# (Config.lsq, counterpart of include/LoadBuffer.h / StoreBuffer.h).
+#
+# Loads still execute as soon as their address is known, also ahead of
+# older stores whose address is not known yet (speculative load issue).
+# The queue makes that safe:
+#   - a load takes its value from the youngest older store to the same
+#     address that has executed (store-to-load forwarding), else from memory;
+#   - when a store executes, every younger load to its address that has
+#     already executed without seeing it read a stale value: the oldest of
+#     them is reported, and the core squashes and refetches from that load
+#     (replay).
+# Both queues are indexed by word address, so a lookup touches only the
+# operations on that address, not the whole window. Entries leave at commit
+# or when squashed; the ROB bounds how many there can be.
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+
+class LoadStoreQueue:
+    def __init__(self):
+        self.load_pcs: Dict[int, int] = {}                    # issued load tag -> pc (where a replay restarts)
+        self.loads: Dict[int, Tuple[int, int]] = {}           # executed load tag -> (addr, forwarding store tag or 0)
+        self.stores: Dict[int, Tuple[int, int]] = {}          # executed store tag -> (addr, value)
+        self.loads_at: Dict[int, List[int]] = {}              # addr -> executed load tags, sorted
+        self.stores_at: Dict[int, List[int]] = {}             # addr -> executed store tags, sorted
+        self.forwarded = 0      # loads served by an older in-flight store
+        self.replays = 0        # loads squashed and refetched after an ordering violation
+
+    def issue_load(self, tag: int, pc: int):
+        self.load_pcs[tag] = pc
+
+    def load(self, tag: int, addr: int, memory) -> int:
+        """Value load `tag` reads from `addr`: forwarded from an older store, or from memory."""
+        older = self.stores_at.get(addr)
+        source = 0
+        if older:
+            i = bisect_left(older, tag)
+            if i:
+                source = older[i - 1]
+        if source:
+            self.forwarded += 1
+            value = self.stores[source][1]
+        else:
+            value = memory.load(addr)
+        self.loads[tag] = (addr, source)
+        insort(self.loads_at.setdefault(addr, []), tag)
+        return value
+
+    def forwards(self, tag: int, addr: int) -> bool:
+        """True if load `tag` would forward from an older executed store to `addr` right now."""
+        older = self.stores_at.get(addr)
+        return bool(older) and older[0] < tag
+
+    def store(self, tag: int, addr: int, value: int) -> Optional[int]:
+        """
+        Record an executed store. Returns the oldest younger load that has
+        already read `addr` without this store's value (it must be replayed),
+        or None.
+        """
+        self.stores[tag] = (addr, value)
+        insort(self.stores_at.setdefault(addr, []), tag)
+        for t in self.loads_at.get(addr, ()):
+            if t > tag and self.loads[t][1] < tag:
+                return t
+        return None
+
+    def retire_load(self, tag: int):
+        self.load_pcs.pop(tag, None)
+        entry = self.loads.pop(tag, None)
+        if entry is not None:
+            self._unlink(self.loads_at, entry[0], tag)
+
+    def retire_store(self, tag: int):
+        entry = self.stores.pop(tag, None)
+        if entry is not None:
+            self._unlink(self.stores_at, entry[0], tag)
+
+    @staticmethod
+    def _unlink(index, addr, tag):
+        tags = index[addr]
+        tags.remove(tag)
+        if not tags:
+            del index[addr]
+
+    def squash(self, tag: int):
+        """Drop every operation younger than ROB tag `tag`."""
+        for t in [t for t in self.load_pcs if t > tag]:
+            self.retire_load(t)
+        for t in [t for t in self.stores if t > tag]:
+            self.retire_store(t)
+
+    def state(self) -> dict:
+        """JSON-friendly contents, for checkpoints."""
+        return {"load_pcs": list(self.load_pcs.items()), "loads": [[t, a, s] for t, (a, s) in self.loads.items()],
+                "stores": [[t, a, v] for t, (a, v) in self.stores.items()],
+                "forwarded": self.forwarded, "replays": self.replays}
+
+    def restore(self, state: dict):
+        self.__init__()
+        self.load_pcs = dict((t, pc) for t, pc in state["load_pcs"])
+        for t, addr, source in state["loads"]:
+            self.loads[t] = (addr, source)
+            insort(self.loads_at.setdefault(addr, []), t)
+        for t, addr, value in state["stores"]:
+            self.stores[t] = (addr, value)
+            insort(self.stores_at.setdefault(addr, []), t)
+        self.forwarded, self.replays = state["forwarded"], state["replays"]
+
+    def __repr__(self):
+        return (f"<LSQ loads={len(self.load_pcs)} stores={len(self.stores)} "
+                f"forwarded={self.forwarded} replays={self.replays}>")
@@ -2,6 +2,9 @@
 from instruction import Instruction
 from tomasulo import Tomasulo
 
+# memory initial values for the sample program
+SAMPLE_MEMORY = {10: 5, 11: 7}
+
 def sample_program():
     # memory initial values
     # LD R1, #10  ; R1 = mem[10]
@@ -24,8 +27,8 @@ def main():
     prog = sample_program()
     sim = Tomasulo(prog, reg_count=16, rob_size=8)
     # initialize memory values
-    sim.memory.store(10, 5)
-    sim.memory.store(11, 7)
+    for addr, value in SAMPLE_MEMORY.items():
+        sim.memory.store(addr, value)
     print("Starting simulation...")
     sim.run(max_cycles=100, verbose=True)
     print("Final registers (R0..R7):")
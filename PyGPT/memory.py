@@ -1,14 +1,229 @@
 # memory.py
+# Word-addressed data memory backends. All of them offer
+#   load(addr) / store(addr, value)            single words (used by the core)
+#   load_range(addr, n) / store_range(addr, values)   bulk setup / checkpointing
+#   iter_pages(page_words)                     (page number, int64 bytes) for checkpoints
+# and are selected with make_memory(kind, size, ...).
+import mmap
+import os
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+
 class Memory:
+    """Flat list of Python ints; fine for small address spaces."""
     def __init__(self, size=1024):
         self.mem = [0] * size
 
+    @property
+    def size(self):
+        return len(self.mem)
+
     def load(self, addr: int):
         return self.mem[addr]
 
     def store(self, addr: int, value: int):
         self.mem[addr] = value
 
+    def load_range(self, addr: int, n: int) -> List[int]:
+        if addr < 0 or addr + n > len(self.mem):
+            raise IndexError(f"range {addr}..{addr + n} outside memory")
+        return self.mem[addr:addr + n]
+
+    def store_range(self, addr: int, values: Iterable[int]):
+        values = list(values)
+        if addr < 0 or addr + len(values) > len(self.mem):
+            raise IndexError(f"range {addr}..{addr + len(values)} outside memory")
+        self.mem[addr:addr + len(values)] = values
+
+    def iter_pages(self, page_words: int):
+        for pno, addr in enumerate(range(0, len(self.mem), page_words)):
+            yield pno, array("q", self.mem[addr:addr + page_words]).tobytes()
+
     def __repr__(self):
         # show first few
         return "Memory[" + ", ".join(str(x) for x in self.mem[:16]) + " ...]"
+
+
+class SparseMemory:
+    """
+    Page-granular sparse memory of 64-bit words.
+    A page (array of page_words int64) is allocated on the first store to
+    it; loads from untouched pages return 0 without allocating, so a large
+    address space only costs the pages that are actually written.
+    """
+    def __init__(self, size: int = 1 << 23, page_words: int = 1024):
+        if page_words & (page_words - 1):
+            raise ValueError("page_words must be a power of two")
+        self.size = size
+        self.page_words = page_words
+        self.page_shift = page_words.bit_length() - 1
+        self.pages: Dict[int, array] = {}
+
+    def _check(self, addr: int):
+        if not 0 <= addr < self.size:
+            raise IndexError(f"address {addr} outside memory of {self.size} words")
+
+    def _page(self, pno: int) -> array:
+        page = self.pages.get(pno)
+        if page is None:
+            page = self.pages[pno] = array("q", bytes(8 * self.page_words))
+        return page
+
+    def load(self, addr: int):
+        self._check(addr)
+        page = self.pages.get(addr >> self.page_shift)
+        return page[addr & (self.page_words - 1)] if page is not None else 0
+
+    def store(self, addr: int, value: int):
+        self._check(addr)
+        self._page(addr >> self.page_shift)[addr & (self.page_words - 1)] = value
+
+    def load_range(self, addr: int, n: int) -> List[int]:
+        if n == 0:
+            return []
+        self._check(addr)
+        self._check(addr + n - 1)
+        out = []
+        end = addr + n
+        while addr < end:
+            pno, off = addr >> self.page_shift, addr & (self.page_words - 1)
+            take = min(self.page_words - off, end - addr)
+            page = self.pages.get(pno)
+            out.extend(page[off:off + take] if page is not None else [0] * take)
+            addr += take
+        return out
+
+    def store_range(self, addr: int, values: Iterable[int]):
+        vals = array("q", values)
+        if not vals:
+            return
+        self._check(addr)
+        self._check(addr + len(vals) - 1)
+        pos = 0
+        while pos < len(vals):
+            pno, off = addr >> self.page_shift, addr & (self.page_words - 1)
+            take = min(self.page_words - off, len(vals) - pos)
+            self._page(pno)[off:off + take] = vals[pos:pos + take]
+            addr += take
+            pos += take
+
+    def iter_pages(self, page_words: int):
+        # only pages overlapping a resident page can hold anything but zeros
+        if page_words == self.page_words:
+            for pno in sorted(self.pages):
+                yield pno, self.pages[pno].tobytes()
+            return
+        wanted = set()
+        for pno in self.pages:
+            start = pno * self.page_words
+            wanted.update(range(start // page_words, (start + self.page_words - 1) // page_words + 1))
+        for pno in sorted(wanted):
+            addr = pno * page_words
+            n = min(page_words, self.size - addr)
+            if n > 0:
+                yield pno, array("q", self.load_range(addr, n)).tobytes()
+
+    def resident_words(self) -> int:
+        return len(self.pages) * self.page_words
+
+    def __repr__(self):
+        return f"<SparseMemory {self.size} words, {len(self.pages)} pages resident>"
+
+
+class MmapMemory:
+    """
+    Flat memory of 64-bit words backed by mmap.
+    With `image`, the data-image file is mapped copy-on-write: nothing is
+    read or copied up front, pages are faulted in on access and stores
+    never reach the file. Without it, an anonymous zero-filled mapping of
+    `size` words is used.
+    """
+    def __init__(self, size: Optional[int] = None, image: Optional[str] = None):
+        self.image = image
+        if image is not None:
+            nbytes = os.path.getsize(image)
+            if size is not None and size * 8 > nbytes:
+                raise ValueError(f"{image}: image holds {nbytes // 8} words, {size} requested")
+            with open(image, "rb") as f:
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            self.size = size if size is not None else nbytes // 8
+        else:
+            if size is None:
+                raise ValueError("size or image is required")
+            self.mm = mmap.mmap(-1, size * 8)
+            self.size = size
+        self.words = memoryview(self.mm)[:self.size * 8].cast("q")
+
+    def load(self, addr: int):
+        if addr < 0:
+            raise IndexError(addr)
+        return self.words[addr]
+
+    def store(self, addr: int, value: int):
+        if addr < 0:
+            raise IndexError(addr)
+        self.words[addr] = value
+
+    def load_range(self, addr: int, n: int) -> List[int]:
+        if addr < 0 or addr + n > self.size:
+            raise IndexError(f"range {addr}..{addr + n} outside memory")
+        return self.words[addr:addr + n].tolist()
+
+    def store_range(self, addr: int, values: Iterable[int]):
+        vals = array("q", values)
+        if addr < 0 or addr + len(vals) > self.size:
+            raise IndexError(f"range {addr}..{addr + len(vals)} outside memory")
+        self.mm[addr * 8:(addr + len(vals)) * 8] = vals.tobytes()
+
+    def iter_pages(self, page_words: int):
+        for pno, addr in enumerate(range(0, self.size, page_words)):
+            yield pno, self.mm[addr * 8:min(addr + page_words, self.size) * 8]
+
+    def save_image(self, path: str):
+        """Write the current contents as a data image (usable as `image=` later)."""
+        with open(path, "wb") as f:
+            f.write(self.mm[:self.size * 8])
+
+    def close(self):
+        self.words.release()
+        self.mm.close()
+
+    def __repr__(self):
+        src = f" image={self.image}" if self.image else ""
+        return f"<MmapMemory {self.size} words{src}>"
+
+
+MEMORY_KINDS = {
+    "list": Memory,
+    "sparse": SparseMemory,
+    "mmap": MmapMemory,
+}
+
+
+def make_memory(kind: str = "list", size: Optional[int] = 256, **kwargs):
+    """Build a memory backend by name ("list", "sparse" or "mmap")."""
+    try:
+        cls = MEMORY_KINDS[kind]
+    except KeyError:
+        raise ValueError(f"unknown memory kind {kind!r}, expected one of {sorted(MEMORY_KINDS)}") from None
+    if size is None and cls is not MmapMemory:
+        return cls(**kwargs)
+    return cls(size, **kwargs)
+
+
+def write_image(path: str, values: Iterable[int]):
+    """Write a data-image file (native-endian int64 words) for MmapMemory."""
+    with open(path, "wb") as f:
+        f.write(array("q", values).tobytes())
+
+
+def copy_memory(memory, page_words: int = 1024):
+    """Independent copy of a memory backend (same class and size), e.g. for a replay."""
+    copy = type(memory)(memory.size)
+    for pno, data in memory.iter_pages(page_words):
+        if data.strip(b"\0"):
+            words = array("q")
+            words.frombytes(data)
+            copy.store_range(pno * page_words, words)
+    return copy
@@ -0,0 +1,287 @@
+# pipeline_trace.py
+# Per-instruction pipeline trace: issue, dispatch, complete and commit cycle
+# of every instruction, plus the RS entry and FU unit it used.
+#
+#   sim.enable_trace("run.ptr", compress=True)   # binary log
+#   sim.run(10**7, event_driven=True)
+#   sim.trace.close()
+#   python pipeline_trace.py run.ptr --kanata run.kanata   # open in Konata
+#
+# One record is produced per instruction when it commits. Binary logs are
+# written in chunks of `batch` records, each chunk optionally zlib
+# compressed:
+#   header: magic b"TPTR", u16 version, u16 record size, u16 flags (1: compressed)
+#   chunk:  u32 record count, u32 payload bytes, payload
+#   record: u64 seq (ROB tag), u64 pc, Instruction.RECORD (12 bytes),
+#           u64 issue, dispatch, complete, commit cycle, u8 unit class,
+#           u16 RS entry, u16 FU unit
+# Tracing is installed on one Tomasulo instance by wrapping its issue,
+# dispatch, writeback and commit methods (hooks.py); an untraced core runs
+# unchanged.
+import argparse
+import struct
+import sys
+import zlib
+from collections import namedtuple
+from functools import partial
+from heapq import heappush, heappop
+from typing import Iterator
+
+from hooks import Hooks
+from instruction import Instruction
+
+MAGIC = b"TPTR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHH")
+CHUNK = struct.Struct("<II")
+RECORD = struct.Struct("<QQ12sQQQQBHH")
+COMPRESSED = 1
+
+RS_PREFIX = ("A", "M", "L")       # ReservationStation name prefixes, by unit class
+FU_NAMES = ("ALU", "MUL", "LD")   # FunctionalUnit names, by unit class
+
+TraceRecord = namedtuple("TraceRecord", "seq pc instr issue dispatch complete commit unit rs fu")
+
+
+def rs_name(rec: TraceRecord) -> str:
+    return f"{RS_PREFIX[rec.unit]}{rec.rs}"
+
+
+def fu_name(rec: TraceRecord) -> str:
+    return f"{FU_NAMES[rec.unit]}{rec.fu}"
+
+
+class BinaryTraceWriter:
+    """Buffered binary log (layout above)."""
+    def __init__(self, path: str, batch: int = 65536, compress: bool = False):
+        self.f = open(path, "wb")
+        self.batch = batch
+        self.compress = compress
+        self.f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, COMPRESSED if compress else 0))
+        self.pending = bytearray()
+        self.count = 0
+        self.written = 0
+
+    def write(self, seq, pc, instr, issue, dispatch, complete, commit, unit, rs, fu):
+        self.pending += RECORD.pack(seq, pc, instr.pack(), issue, dispatch, complete, commit, unit, rs, fu)
+        self.count += 1
+        if self.count >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self.count:
+            return
+        payload = zlib.compress(self.pending, 1) if self.compress else self.pending
+        self.f.write(CHUNK.pack(self.count, len(payload)))
+        self.f.write(payload)
+        self.f.flush()
+        self.written += self.count
+        self.pending = bytearray()
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+
+class TextTraceWriter:
+    """One key=value line per instruction to a text stream (what run(verbose=True) prints)."""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, seq, pc, instr, issue, dispatch, complete, commit, unit, rs, fu):
+        self.stream.write(f"#{seq} pc={pc} {instr} rs={RS_PREFIX[unit]}{rs} fu={FU_NAMES[unit]}{fu} "
+                          f"issue={issue} dispatch={dispatch} complete={complete} commit={commit}\n")
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class PipelineTracer:
+    """
+    Records the lifecycle of every instruction of `sim` into `writer`.
+    FU unit numbers are assigned like the pool hands out units: the lowest
+    numbered unit that is free in the dispatch cycle and does not hold a
+    result waiting for the CDB.
+    """
+    def __init__(self, sim, writer):
+        self.sim = sim
+        self.writer = writer
+        # tag -> [pc, instr, issue, dispatch, complete, unit, rs, fu]
+        self.inflight = {}
+        # per class and unit: first cycle the unit can take a new op
+        self.unit_free = [[0] * fu.count for fu in sim.fus]
+        self.hooks = Hooks()
+        self._issue = self.hooks.wrap(sim, "issue_one", self._issue_one)
+        self._produce = self.hooks.wrap(sim, "produce_result", self._produce_result)
+        self._commit = self.hooks.wrap(sim, "commit_one", self._commit_one)
+        self._fu_assign = [self.hooks.wrap(fu, "assign", partial(self._assign, unit, fu))
+                           for unit, fu in enumerate(sim.fus)]
+        # results waiting in an output latch for the CDB: id(entry) -> unit number,
+        # and per class and unit how many such results it holds
+        self.held = {}
+        self.unit_held = [[0] * fu.count for fu in sim.fus]
+        self._fu_latch = [self.hooks.wrap(fu, "latch", partial(self._latch, unit))
+                          for unit, fu in enumerate(sim.fus)]
+        self._fu_release = [self.hooks.wrap(fu, "release", partial(self._release, unit))
+                            for unit, fu in enumerate(sim.fus)]
+
+    def _issue_one(self):
+        sim = self.sim
+        tag = sim.rob.next_tag
+        pc = sim.pc
+        instr = sim.fetch.peek()
+        if not self._issue():
+            return False
+        if sim.rob.next_tag != tag:   # not a NOP / jump
+            unit = instr.decoded[1]
+            entries = sim.stations[unit].entries
+            rs = next(i for i, e in enumerate(entries) if e.busy and e.dest == tag)
+            # a squashed instruction never commits; its tag is issued again and overwrites this
+            self.inflight[tag] = [pc, instr, sim.cycle, 0, 0, unit, rs, 0]
+        return True
+
+    def _assign(self, unit, fu, rs_entry, cycles, busy=None):
+        cycle = self.sim.cycle
+        free = self.unit_free[unit]
+        held = self.unit_held[unit]
+        n = next(i for i, t in enumerate(free) if t <= cycle and not held[i])
+        occupancy = cycles if busy is None else busy
+        free[n] = cycle + (occupancy if fu.initiation_interval is None else min(fu.initiation_interval, occupancy))
+        rec = self.inflight[rs_entry.dest]
+        rec[3] = cycle
+        rec[7] = n
+        return self._fu_assign[unit](rs_entry, cycles, busy)
+
+    def _latch(self, unit, entries):
+        # a result waiting for the CDB holds its unit until it broadcasts (or is squashed)
+        held = self.unit_held[unit]
+        for e in entries:
+            n = self.inflight[e.dest][7]
+            self.held[id(e)] = n
+            held[n] += 1
+        return self._fu_latch[unit](entries)
+
+    def _release(self, unit, rs_entry):
+        n = self.held.pop(id(rs_entry), None)
+        if n is not None:
+            self.unit_held[unit][n] -= 1
+            free = self.unit_free[unit]
+            free[n] = max(free[n], self.sim.cycle)
+        return self._fu_release[unit](rs_entry)
+
+    def _produce_result(self, rs_entry):
+        self.inflight[rs_entry.dest][4] = self.sim.cycle
+        self._produce(rs_entry)
+
+    def _commit_one(self):
+        sim = self.sim
+        head = sim.rob.peek_head()
+        tag = head.tag if head is not None else None
+        if not self._commit():
+            return False
+        pc, instr, issue, dispatch, complete, unit, rs, fu = self.inflight.pop(tag)
+        self.writer.write(tag, pc, instr, issue, dispatch, complete, sim.cycle, unit, rs, fu)
+        return True
+
+    def flush(self):
+        self.writer.flush()
+
+    def detach(self):
+        """Remove the hooks; the core runs untraced again."""
+        self.hooks.remove()
+        if self.sim.trace is self:
+            self.sim.trace = None
+
+    def close(self):
+        self.detach()
+        self.writer.close()
+
+
+def read_trace(path: str) -> Iterator[TraceRecord]:
+    """Records of a binary pipeline trace, in commit order."""
+    with open(path, "rb") as f:
+        magic, version, rec_size, flags = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+            raise ValueError(f"{path}: not a version {VERSION} pipeline trace")
+        while True:
+            head = f.read(CHUNK.size)
+            if len(head) < CHUNK.size:
+                return
+            count, nbytes = CHUNK.unpack(head)
+            payload = f.read(nbytes)
+            if flags & COMPRESSED:
+                payload = zlib.decompress(payload)
+            for seq, pc, raw, issue, dispatch, complete, commit, unit, rs, fu in RECORD.iter_unpack(payload):
+                instr = Instruction.from_record(*Instruction.RECORD.unpack(raw))
+                yield TraceRecord(seq, pc, instr, issue, dispatch, complete, commit, unit, rs, fu)
+
+
+def export_kanata(records, out, batch: int = 4096) -> int:
+    """
+    Write records (commit order) as a Kanata 0004 log for the Konata
+    pipeline viewer. Stages: Is (waiting in the RS), Ex (in the FU), Wb
+    (done, waiting to commit), Cm (commit cycle). Streams with memory
+    bounded by the instructions in flight; returns the record count.
+    """
+    lines = []
+    heap = []
+    cycle = None
+    n = 0
+
+    def emit_until(limit):
+        nonlocal cycle
+        while heap and (limit is None or heap[0][0] < limit):
+            at, _, _, text = heappop(heap)
+            if cycle is None:
+                lines.append(f"C=\t{at}")
+            elif at > cycle:
+                lines.append(f"C\t{at - cycle}")
+            cycle = at
+            lines.append(text)
+        if len(lines) >= batch:
+            out.write("\n".join(lines) + "\n")
+            lines.clear()
+
+    out.write("Kanata\t0004\n")
+    for n, rec in enumerate(records, 1):
+        i = n - 1
+        # issue order == commit order, so nothing after this point can start before rec.issue
+        emit_until(rec.issue)
+        ex_end = rec.complete + 1
+        events = [
+            (rec.issue, 0, f"I\t{i}\t{rec.seq}\t0\nL\t{i}\t0\t{rec.pc}: {rec.instr}\n"
+                           f"L\t{i}\t1\tRS {rs_name(rec)}, FU {fu_name(rec)}\nS\t{i}\t0\tIs"),
+            (rec.dispatch, 1, f"E\t{i}\t0\tIs\nS\t{i}\t0\tEx"),
+            (ex_end, 2, f"E\t{i}\t0\tEx\nS\t{i}\t0\tWb"),
+            (max(rec.commit, ex_end), 3, f"E\t{i}\t0\tWb\nS\t{i}\t0\tCm"),
+            (max(rec.commit, ex_end) + 1, 4, f"E\t{i}\t0\tCm\nR\t{i}\t{i}\t0"),
+        ]
+        for at, step, text in events:
+            heappush(heap, (at, i, step, text))
+    emit_until(None)
+    out.write("\n".join(lines) + ("\n" if lines else ""))
+    return n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Inspect / convert a binary pipeline trace")
+    ap.add_argument("trace", help="pipeline trace written by Tomasulo.enable_trace")
+    ap.add_argument("--kanata", metavar="OUT", help="write a Kanata log for the Konata viewer")
+    ap.add_argument("--text", action="store_true", help="print one line per instruction")
+    args = ap.parse_args(argv)
+    if args.kanata:
+        with open(args.kanata, "w") as out:
+            n = export_kanata(read_trace(args.trace), out)
+        print(f"{n} instructions written to {args.kanata}")
+    if args.text or not args.kanata:
+        writer = TextTraceWriter(sys.stdout)
+        for rec in read_trace(args.trace):
+            writer.write(*rec)
+
+
+if __name__ == "__main__":
+    main()
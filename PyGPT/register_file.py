@@ -1,25 +1,152 @@
 # register_file.py
-from typing import Dict, Optional
+from array import array
+from collections import deque
+from typing import List, Optional
+
+from instruction import reg_index, reg_name
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+def wrap64(value: int) -> int:
+    """Two's complement wrap to a signed 64-bit value."""
+    if INT64_MIN <= value <= INT64_MAX:
+        return value
+    return ((value - INT64_MIN) & 0xFFFFFFFFFFFFFFFF) + INT64_MIN
 
 class RegisterFile:
+    """
+    Architectural registers and rename table, indexed by register number.
+    regs is a flat array of signed 64-bit values, reg_status the rename
+    table (reg -> ROB tag, or None if the value in regs is current).
+    The simulator core uses the integer index directly; read/write and
+    get_status/set_status also accept "R5"-style names for main.py and the GUI.
+    """
     def __init__(self, num_regs=32):
         self.num_regs = num_regs
-        self.regs: Dict[str, int] = {f"R{i}": 0 for i in range(num_regs)}
-        # reg_status maps reg -> ROB tag (or None if value is ready)
-        self.reg_status: Dict[str, Optional[int]] = {f"R{i}": None for i in range(num_regs)}
+        self.regs = array("q", bytes(8 * num_regs))
+        self.reg_status: List[Optional[int]] = [None] * num_regs
+
+    def read(self, reg):
+        return self.regs[reg_index(reg)]
 
-    def read(self, reg: str):
-        return self.regs[reg]
+    def write(self, reg, value: int):
+        self.regs[reg_index(reg)] = wrap64(value)
 
-    def write(self, reg: str, value: int):
-        self.regs[reg] = value
+    def set_status(self, reg, rob_tag: Optional[int]):
+        self.reg_status[reg_index(reg)] = rob_tag
 
-    def set_status(self, reg: str, rob_tag: Optional[int]):
-        self.reg_status[reg] = rob_tag
+    def get_status(self, reg) -> Optional[int]:
+        return self.reg_status[reg_index(reg)]
 
-    def get_status(self, reg: str) -> Optional[int]:
-        return self.reg_status[reg]
+    def names(self):
+        return [reg_name(i) for i in range(self.num_regs)]
 
     def __repr__(self):
-        reg_vals = ", ".join(f"{r}:{v}" for r,v in list(self.regs.items())[:8]) + " ..."
+        reg_vals = ", ".join(f"{reg_name(i)}:{self.regs[i]}" for i in range(min(8, self.num_regs))) + " ..."
         return f"<RegisterFile {reg_vals}>"
+
+
+class PhysicalRegisterFile(RegisterFile):
+    """
+    Merged physical register file, for Config.use_rob = False.
+    Every result is written once into a physical register (values, ready)
+    and stays there: nothing is copied at commit. reg_status is the
+    speculative rename map (register -> physical register, always set) and
+    retired the retirement map (the committed mapping); get_status still
+    answers with the ROB tag a register waits for, and the map is only
+    changed through rename(). Issue takes a
+    register from the free list; commit frees the one the retirement map
+    pointed to before, a squash frees the ones of the squashed instructions.
+    producer holds the ROB tag writing each physical register, which is the
+    tag consumers wait for on the CDB.
+    regs is a list-like view of the committed values, so code that reads or
+    writes architectural registers works in both modes.
+    """
+    def __init__(self, num_regs=32, num_physical=64):
+        if num_physical <= num_regs:
+            raise ValueError("num_physical must be > num_regs")
+        self.num_regs = num_regs
+        self.num_physical = num_physical
+        self.values = array("q", bytes(8 * num_physical))
+        self.ready = bytearray([1]) * num_physical
+        self.producer: List[int] = [0] * num_physical
+        self.reg_status: List[int] = list(range(num_regs))
+        self.retired: List[int] = list(range(num_regs))
+        self.free = deque(range(num_regs, num_physical))
+
+    @property
+    def regs(self) -> "ArchRegisters":
+        return ArchRegisters(self)
+
+    @regs.setter
+    def regs(self, values):
+        # load committed values (the pipeline is empty, so both maps agree)
+        for r, v in enumerate(values):
+            self.values[self.retired[r]] = v
+
+    def rename(self, reg: int, tag: int) -> int:
+        """Map reg to a free physical register written by ROB tag `tag`; returns it."""
+        p = self.free.popleft()
+        self.ready[p] = 0
+        self.producer[p] = tag
+        self.reg_status[reg] = p
+        return p
+
+    def get_status(self, reg) -> Optional[int]:
+        """ROB tag that will write reg, None if its value is committed (as in RegisterFile)."""
+        p = self.reg_status[reg_index(reg)]
+        return None if self.ready[p] else self.producer[p]
+
+    def set_status(self, reg, rob_tag: Optional[int]):
+        raise TypeError("the rename map holds physical registers; use rename()")
+
+    def complete(self, p: int, value: int):
+        self.values[p] = value
+        self.ready[p] = 1
+
+    def retire(self, reg: int, p: int):
+        """Commit of a write of reg into p: the previously committed register is free again."""
+        self.free.append(self.retired[reg])
+        self.retired[reg] = p
+
+    def state(self) -> dict:
+        """Maps, free list and producers, for checkpoints (values / ready go as raw bytes)."""
+        return {"map": self.reg_status, "retired": self.retired, "free": list(self.free),
+                "producer": self.producer}
+
+    def restore(self, state: dict, values: bytes, ready: bytes):
+        self.reg_status = list(state["map"])
+        self.retired = list(state["retired"])
+        self.free = deque(state["free"])
+        self.producer = list(state["producer"])
+        self.values = array("q", values)
+        self.ready = bytearray(ready)
+
+    def __repr__(self):
+        return f"<PhysicalRegisterFile {self.num_physical} registers, {len(self.free)} free>"
+
+
+class ArchRegisters:
+    """Committed register values of a PhysicalRegisterFile, indexed like RegisterFile.regs."""
+    def __init__(self, prf: PhysicalRegisterFile):
+        self.prf = prf
+
+    def __len__(self):
+        return self.prf.num_regs
+
+    def __getitem__(self, reg: int) -> int:
+        return self.prf.values[self.prf.retired[reg]]
+
+    def __setitem__(self, reg: int, value: int):
+        self.prf.values[self.prf.retired[reg]] = value
+
+    def __iter__(self):
+        values = self.prf.values
+        return (values[p] for p in self.prf.retired)
+
+    def tobytes(self) -> bytes:
+        return array("q", self).tobytes()
+
+    def __repr__(self):
+        return repr(list(self))
@@ -1,41 +1,78 @@
 # reorder_buffer.py
-from typing import Optional, List, Dict
+from typing import Optional, List
+
+from instruction import reg_name
 
 class ROBEntry:
-    def __init__(self, tag: int, instr, dest: Optional[str], typ: str):
+    def __init__(self, tag: int = 0, instr=None, dest: Optional[int] = None, typ: Optional[str] = None):
+        self.reset(tag, instr, dest, typ)
+
+    def reset(self, tag: int, instr, dest: Optional[int], typ: Optional[str]):
         self.tag = tag            # unique ROB id
         self.instr = instr        # original instruction
-        self.dest = dest          # destination register (None for stores only if store has no reg dest)
-        self.typ = typ            # "ALU", "LOAD", "STORE"
+        self.dest: Optional[int] = dest  # destination register index (None for stores)
+        self.typ: Optional[str] = typ    # "ALU", "LOAD", "STORE"
         self.ready = False        # true when result is available
         self.value = None         # produced value (for stores this may be the store value; address may be stored separately)
         self.addr = None          # for store / load address computed during execute
+        self.preg = None          # physical register written (Config.use_rob = False)
         self.committed = False
 
     def __repr__(self):
-        return f"<ROB#{self.tag} {self.instr} dest={self.dest} ready={self.ready} val={self.value}>"
+        return f"<ROB#{self.tag} {self.instr} dest={self.dest_name} ready={self.ready} val={self.value}>"
+
+    @property
+    def dest_name(self) -> Optional[str]:
+        return reg_name(self.dest) if self.dest is not None else None
 
 class ReorderBuffer:
+    """
+    Fixed-capacity circular buffer.
+    Tags are handed out consecutively, so the live tags are always
+    head_tag .. next_tag-1 and a tag lives in slot (tag - 1) % size.
+    That makes get_entry, allocate and commit_head O(1).
+    The ROBEntry objects are preallocated and reused.
+    """
     def __init__(self, size: int):
         self.size = size
-        self.entries: List[ROBEntry] = []
+        self.slots: List[ROBEntry] = [ROBEntry() for _ in range(size)]
+        self.count = 0
         self.next_tag = 1
 
+    @property
+    def head_tag(self) -> int:
+        return self.next_tag - self.count
+
+    @property
+    def entries(self) -> List[ROBEntry]:
+        # live entries, oldest first (read-only view for printing / GUI)
+        return list(self)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        slots, size = self.slots, self.size
+        for tag in range(self.head_tag, self.next_tag):
+            yield slots[(tag - 1) % size]
+
     def is_full(self):
-        return len(self.entries) >= self.size
+        return self.count >= self.size
+
+    def is_empty(self):
+        return self.count == 0
 
-    def allocate(self, instr, dest: Optional[str], typ: str) -> int:
+    def allocate(self, instr, dest: Optional[int], typ: str) -> int:
         tag = self.next_tag
         self.next_tag += 1
-        entry = ROBEntry(tag, instr, dest, typ)
-        self.entries.append(entry)
+        self.count += 1
+        self.slots[(tag - 1) % self.size].reset(tag, instr, dest, typ)
         return tag
 
     def get_entry(self, tag: int) -> Optional[ROBEntry]:
-        for e in self.entries:
-            if e.tag == tag:
-                return e
-        return None
+        if tag is None or not (self.next_tag - self.count <= tag < self.next_tag):
+            return None
+        return self.slots[(tag - 1) % self.size]
 
     def mark_ready(self, tag: int, value=None, addr=None):
         e = self.get_entry(tag)
@@ -46,17 +83,18 @@ class ReorderBuffer:
                 e.addr = addr
 
     def peek_head(self) -> Optional[ROBEntry]:
-        return self.entries[0] if self.entries else None
+        if self.count == 0:
+            return None
+        return self.slots[(self.next_tag - self.count - 1) % self.size]
 
     def commit_head(self):
-        if not self.entries:
-            return None
-        head = self.entries[0]
-        if head.ready:
-            self.entries.pop(0)
+        head = self.peek_head()
+        if head is not None and head.ready:
+            # the slot stays valid until it is reallocated
+            self.count -= 1
             head.committed = True
             return head
         return None
 
     def __repr__(self):
-        return "ROB[" + ", ".join(repr(e) for e in self.entries) + "]"
+        return "ROB[" + ", ".join(repr(e) for e in self) + "]"
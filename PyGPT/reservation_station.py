@@ -1,9 +1,11 @@
 # reservation_station.py
+import heapq
 from typing import Optional, List, Dict
 
 class RSEntry:
-    def __init__(self, name: str):
+    def __init__(self, name: str, station=None):
         self.name = name
+        self.station = station   # owning ReservationStation (for its ready queue)
         self.busy = False
         self.op = None           # opcode
         self.Vj = None
@@ -17,15 +19,48 @@ class RSEntry:
     def is_ready(self):
         return (self.busy and self.Qj is None and self.Qk is None and self.exec_cycles_left is None)
 
+    def on_broadcast(self, tag: int, value):
+        # called by the CDB for every tag this entry subscribed to at issue
+        if self.Qj == tag:
+            self.Vj = value
+            self.Qj = None
+        if self.Qk == tag:
+            self.Vk = value
+            self.Qk = None
+        if self.is_ready() and self.station is not None:
+            self.station.push_ready(self)
+
     def clear(self):
-        self.__init__(self.name)
+        self.__init__(self.name, self.station)
 
     def __repr__(self):
         return f"<RS {self.name} op={self.op} busy={self.busy} Vj={self.Vj} Vk={self.Vk} Qj={self.Qj} Qk={self.Qk} dest=ROB{self.dest} exec_left={self.exec_cycles_left}>"
 
 class ReservationStation:
     def __init__(self, name_prefix: str, n: int):
-        self.entries: List[RSEntry] = [RSEntry(f"{name_prefix}{i}") for i in range(n)]
+        self.entries: List[RSEntry] = [RSEntry(f"{name_prefix}{i}", self) for i in range(n)]
+        # ready queue: entries whose operands are all available, oldest (lowest ROB tag) first
+        self.ready: List[tuple] = []
+        self._seq = 0
+
+    def push_ready(self, entry: RSEntry):
+        """Called once per entry, when its last operand arrives (at issue or broadcast)."""
+        self._seq += 1
+        heapq.heappush(self.ready, (entry.dest, self._seq, entry))
+
+    def _drop_stale(self):
+        ready = self.ready
+        while ready and not (ready[0][2].dest == ready[0][0] and ready[0][2].is_ready()):
+            heapq.heappop(ready)
+
+    def has_ready(self):
+        self._drop_stale()
+        return bool(self.ready)
+
+    def pop_ready(self) -> Optional[RSEntry]:
+        """Oldest ready entry, or None."""
+        self._drop_stale()
+        return heapq.heappop(self.ready)[2] if self.ready else None
 
     def find_free(self) -> Optional[RSEntry]:
         for e in self.entries:
@@ -0,0 +1,65 @@
+# run_program.py
+# Assemble (or load from the assembler cache) a program and simulate it.
+#
+#   python run_program.py kernel.s --set rob_size=32 --set issue_width=2
+#   python run_program.py kernel.s --verbose --dump 10:16
+#   python run_program.py kernel.s --emit-trace kernel.trc   # for sweep.py / sampling.py
+import argparse
+import sys
+
+from assembler import AsmError, load_program
+from config import Config
+from tomasulo import Tomasulo
+
+
+def main(argv=None):
+    from sweep import expand_grid, _parse_value
+    ap = argparse.ArgumentParser(description="Assemble and simulate a program (assembler.py format)")
+    ap.add_argument("source", help="assembly source file")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="config field, e.g. rob_size=32 or fu_latencies.MUL=10 (repeatable)")
+    ap.add_argument("--max-cycles", type=int, default=10 ** 7)
+    ap.add_argument("--verbose", action="store_true", help="print one line per committed instruction")
+    ap.add_argument("--stats", action="store_true", help="print machine statistics (stats.py)")
+    ap.add_argument("--dump", metavar="START:END", help="print memory words START..END-1 after the run")
+    ap.add_argument("--no-cache", action="store_true", help="always assemble, do not read or write the cache")
+    ap.add_argument("--emit-trace", metavar="PATH", help="write the assembled program as a trace file and exit")
+    args = ap.parse_args(argv)
+
+    try:
+        prog = load_program(args.source, cache=not args.no_cache)
+    except AsmError as e:
+        sys.exit(f"error: {e}")
+    if args.emit_trace:
+        from trace_file import write_trace
+        n = write_trace(args.emit_trace, prog.instructions)
+        print(f"{n} instructions written to {args.emit_trace}")
+        return
+
+    changes = {}
+    for item in args.set:
+        key, sep, value = item.partition("=")
+        if not sep:
+            ap.error(f"bad --set {item!r}, expected KEY=VALUE")
+        changes[key.strip()] = [_parse_value(value.strip())]
+    cfg = prog.fit(expand_grid(Config(), changes)[0])
+    sim = Tomasulo(prog.instructions, config=cfg, stats=args.stats)
+    prog.load_memory(sim.memory)
+    stats = sim.run(args.max_cycles, verbose=args.verbose, event_driven=True)
+    if not sim.done():
+        print(f"stopped at the cycle limit ({args.max_cycles})")
+    if stats is not None:
+        print(stats)
+    else:
+        print(f"{sim.cycle} cycles, {sim.completed_instructions} instructions, IPC {sim.ipc():.3f}")
+    print("registers:", ", ".join(f"R{i}={sim.rf.regs[i]}" for i in range(prog.num_registers)))
+    if args.dump:
+        start, _, end = args.dump.partition(":")
+        start = int(start, 0)
+        end = int(end, 0) if end else start + 1
+        for addr, val in zip(range(start, end), sim.memory.load_range(start, end - start)):
+            print(f"mem[{addr}] = {val}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+; sample.s - main.sample_program in assembler.py syntax
+;   python run_program.py sample.s --verbose --dump 10:13
+        .data
+        .org    10
+a:      .word   5           ; mem[10]
+b:      .word   7           ; mem[11]
+result: .space  1           ; mem[12]
+
+        .text
+        LD      R1, a       ; R1 = mem[10]
+        LD      R2, b       ; R2 = mem[11]
+        ADD     R3, R1, R2
+        MUL     R4, R3, R1
+        SUB     R5, R4, R2
+        ST      R5, result  ; mem[12] = R5
@@ -0,0 +1,177 @@
+# sampling.py
+# Sampled simulation: estimate the cycle count of a long run from short
+# detailed windows.
+#
+#   python sampling.py trace.bin --period 100000 --window 1000 --warmup 2000
+#
+# The run is cut into periods of `period` instructions. Each period is
+#   fast_forward(period - warmup - window)   functional, no timing
+#   warmup instructions                      detailed, not measured (refills
+#                                            the ROB, RS and FUs)
+#   window instructions                      detailed, measured
+#   drain                                    in-flight work finishes
+# Every window gives one CPI sample. Total cycles are extrapolated as mean
+# CPI x instruction count, with a normal-approximation confidence interval
+# from the sample variance (systematic sampling, as in SMARTS). With a few
+# dozen samples or more the approximation is sound; the report says how
+# many samples a target error would need.
+import argparse
+import math
+import time
+from dataclasses import dataclass, field
+from statistics import NormalDist, fmean, stdev
+from typing import List, Tuple
+
+from config import Config
+from tomasulo import Tomasulo
+
+_NO_LIMIT = 1 << 62
+
+
+@dataclass
+class SamplingResult:
+    instructions: int             # whole run: functional (NOPs included) and committed by the detailed core
+    detailed_instructions: int    # committed by the detailed core (warm-up, windows, drains)
+    samples: List[float] = field(default_factory=list)   # CPI of each measured window
+    confidence: float = 0.95
+    wall_seconds: float = 0.0
+
+    @property
+    def n(self) -> int:
+        return len(self.samples)
+
+    @property
+    def z(self) -> float:
+        return NormalDist().inv_cdf((1 + self.confidence) / 2)
+
+    @property
+    def cpi(self) -> float:
+        return fmean(self.samples)
+
+    @property
+    def cpi_half_width(self) -> float:
+        if self.n < 2:
+            return math.inf
+        return self.z * stdev(self.samples) / math.sqrt(self.n)
+
+    @property
+    def cpi_interval(self) -> Tuple[float, float]:
+        hw = self.cpi_half_width
+        return max(self.cpi - hw, 0.0), self.cpi + hw
+
+    @property
+    def relative_error(self) -> float:
+        """Half-width of the confidence interval relative to the estimate."""
+        return self.cpi_half_width / self.cpi
+
+    @property
+    def cycles(self) -> float:
+        return self.cpi * self.instructions
+
+    @property
+    def cycles_interval(self) -> Tuple[float, float]:
+        lo, hi = self.cpi_interval
+        return lo * self.instructions, hi * self.instructions
+
+    @property
+    def ipc(self) -> float:
+        return 1 / self.cpi
+
+    @property
+    def ipc_interval(self) -> Tuple[float, float]:
+        lo, hi = self.cpi_interval
+        return 1 / hi, (1 / lo if lo > 0 else math.inf)
+
+    def required_samples(self, relative_error: float) -> int:
+        """Samples needed for the given relative half-width at this confidence."""
+        if self.n < 2:
+            raise ValueError("need at least two samples to estimate the variance")
+        cv = stdev(self.samples) / self.cpi
+        return math.ceil((self.z * cv / relative_error) ** 2)
+
+    def __str__(self):
+        lo, hi = self.cycles_interval
+        ilo, ihi = self.ipc_interval
+        pct = round(self.confidence * 100)
+        return (f"{self.n} samples, {self.detailed_instructions} of {self.instructions} instructions detailed "
+                f"({100 * self.detailed_instructions / max(self.instructions, 1):.2f}%), {self.wall_seconds:.2f}s\n"
+                f"  IPC    {self.ipc:.4f}  [{ilo:.4f}, {ihi:.4f}] {pct}% CI\n"
+                f"  cycles {self.cycles:.0f}  [{lo:.0f}, {hi:.0f}]  +-{100 * self.relative_error:.2f}%")
+
+
+def run_sampled(sim: Tomasulo, period: int = 100_000, window: int = 1_000, warmup: int = 2_000,
+                confidence: float = 0.95, offset: int = 0) -> SamplingResult:
+    """
+    Run `sim` to the end of its program in sampled mode (see the top of
+    this file). offset instructions are fast-forwarded before the first
+    period. Windows cut short by the end of the program are not used.
+    """
+    if window < 1 or warmup < 0 or warmup + window > period:
+        raise ValueError("need window >= 1, warmup >= 0 and warmup + window <= period")
+    start = time.perf_counter()
+    result = SamplingResult(0, 0, confidence=confidence)
+    detailed_from = sim.completed_instructions
+    sim.drain()
+    if offset:
+        sim.fast_forward(offset)
+    while not sim.done():
+        sim.fast_forward(period - warmup - window)
+        if sim.done():
+            break
+        if warmup:
+            sim.run(_NO_LIMIT, event_driven=True, max_instructions=sim.completed_instructions + warmup)
+        c0, n0 = sim.cycle, sim.completed_instructions
+        sim.run(_NO_LIMIT, event_driven=True, max_instructions=n0 + window)
+        n = sim.completed_instructions - n0
+        if n >= window:
+            result.samples.append((sim.cycle - c0) / n)
+        sim.drain()
+    result.instructions = sim.functional_instructions + sim.completed_instructions
+    result.detailed_instructions = sim.completed_instructions - detailed_from
+    result.wall_seconds = time.perf_counter() - start
+    if not result.samples:
+        raise ValueError(f"no complete window in {result.instructions} instructions, the program is shorter than one period")
+    return result
+
+
+def main(argv=None):
+    from sweep import expand_grid, _parse_value
+    from trace_file import TraceReader
+    ap = argparse.ArgumentParser(description="Sampled simulation with IPC extrapolation")
+    ap.add_argument("trace", help="trace file (trace_file.py format)")
+    ap.add_argument("--period", type=int, default=100_000, help="instructions per sampling period")
+    ap.add_argument("--window", type=int, default=1_000, help="measured detailed instructions per period")
+    ap.add_argument("--warmup", type=int, default=2_000, help="unmeasured detailed instructions before each window")
+    ap.add_argument("--offset", type=int, default=0, help="instructions fast-forwarded before the first period")
+    ap.add_argument("--confidence", type=float, default=0.95)
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="config field, e.g. rob_size=32 or fu_latencies.MUL=10 (repeatable)")
+    ap.add_argument("--full", action="store_true", help="also run the whole trace in detail and compare")
+    args = ap.parse_args(argv)
+
+    changes = {}
+    for item in args.set:
+        key, sep, value = item.partition("=")
+        if not sep:
+            ap.error(f"bad --set {item!r}, expected KEY=VALUE")
+        changes[key.strip()] = [_parse_value(value.strip())]
+    cfg = expand_grid(Config(), changes)[0]
+    with TraceReader(args.trace) as trace:
+        res = run_sampled(Tomasulo(trace, config=cfg), args.period, args.window, args.warmup,
+                          args.confidence, args.offset)
+        print(res)
+        print(f"  {res.required_samples(0.01)} samples would give +-1% at this confidence")
+        if args.full:
+            t0 = time.perf_counter()
+            sim = Tomasulo(trace, config=cfg)
+            sim.run(_NO_LIMIT, event_driven=True)
+            wall = time.perf_counter() - t0
+            lo, hi = res.cycles_interval
+            inside = "inside" if lo <= sim.cycle <= hi else "OUTSIDE"
+            print(f"full detailed: {sim.cycle} cycles, IPC {sim.ipc():.4f}, {wall:.2f}s "
+                  f"(sampled error {100 * (res.cycles - sim.cycle) / sim.cycle:+.2f}%, {inside} the interval, "
+                  f"{wall / res.wall_seconds:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
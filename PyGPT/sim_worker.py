@@ -0,0 +1,155 @@
+# sim_worker.py
+# Runs a Tomasulo on a background thread for the GUI and publishes what
+# changed as Frames through a queue.
+#
+#   frames = queue.Queue()
+#   worker = SimWorker(sim, tracker, frames, until_cycle=10_000)
+#   worker.start()
+#   ...   # GUI timer: drain frames, merge, render the result once per frame
+#   worker.stop()
+#
+# The simulator runs at full speed in slices of about SLICE_SECONDS
+# (event-driven, the slice length in cycles adapts), and a frame is
+# published at most every PUBLISH_SECONDS, so the display never holds the
+# simulator back and stays responsive. A frame carries the ready-to-show rows
+# of everything the ChangeTracker reported dirty since the previous frame;
+# frames the GUI had no time to draw are merged, not lost. With a delay set,
+# the worker runs one cycle per delay instead (slow-motion run).
+# A thread rather than a process: the GUI only draws a few dirty rows per
+# frame, so the simulator keeps nearly all of the interpreter, and frames
+# need no pickling.
+import threading
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Dict, Optional, Tuple
+
+from changes import ChangeSet
+from instruction import reg_name
+
+SLICE_SECONDS = 0.01
+PUBLISH_SECONDS = 0.02
+
+
+def rob_row(e) -> tuple:
+    return (e.tag, repr(e.instr), e.dest_name, e.typ, str(e.ready), str(e.value), str(e.addr))
+
+
+def rs_row(e) -> tuple:
+    exec_left = getattr(e, 'exec_cycles_left', None)
+    return (e.name, str(e.op), str(e.busy), str(e.Vj), str(e.Vk), str(e.Qj), str(e.Qk), str(e.dest), str(exec_left))
+
+
+def reg_row(sim, r: int) -> tuple:
+    return (reg_name(r), sim.rf.regs[r], str(sim.rf.reg_status[r]))
+
+
+@dataclass
+class Frame:
+    """Visible state that changed. In a full frame rob / rs / regs hold every row."""
+    cycle: int
+    completed: int
+    pc: int
+    done: bool
+    full: bool = False
+    rob: Dict[int, Optional[tuple]] = field(default_factory=dict)    # tag -> row, None once retired
+    rs: Dict[Tuple[int, int], tuple] = field(default_factory=dict)   # (unit class, index) -> row
+    regs: Dict[int, tuple] = field(default_factory=dict)
+    mem: Dict[int, int] = field(default_factory=dict)                # address -> value (not in full frames)
+
+    def merge(self, newer: "Frame") -> "Frame":
+        """This frame followed by `newer`, as one frame."""
+        if newer.full:
+            return newer
+        self.cycle, self.completed, self.pc, self.done = newer.cycle, newer.completed, newer.pc, newer.done
+        self.rob.update(newer.rob)
+        self.rs.update(newer.rs)
+        self.regs.update(newer.regs)
+        self.mem.update(newer.mem)
+        return self
+
+
+def capture(sim, changes: ChangeSet) -> Frame:
+    """Frame of `sim` for a change set taken from its tracker."""
+    frame = Frame(sim.cycle, sim.completed_instructions, sim.pc, sim.done(), changes.full)
+    if changes.full:
+        frame.rob = {e.tag: rob_row(e) for e in sim.rob}
+        frame.rs = {(unit, i): rs_row(e) for unit, station in enumerate(sim.stations)
+                    for i, e in enumerate(station.entries)}
+        frame.regs = {r: reg_row(sim, r) for r in range(sim.rf.num_regs)}
+        return frame
+    for tag in changes.rob:
+        e = sim.rob.get_entry(tag)
+        frame.rob[tag] = rob_row(e) if e is not None else None
+    for unit, i in changes.rs:
+        frame.rs[unit, i] = rs_row(sim.stations[unit].entries[i])
+    for r in changes.regs:
+        frame.regs[r] = reg_row(sim, r)
+    for addr in changes.mem:
+        frame.mem[addr] = sim.memory.load(addr)
+    return frame
+
+
+class SimWorker(threading.Thread):
+    """
+    Runs `sim` until it is done, cycle until_cycle is reached, instruction
+    number until_instruction has committed, or stop() is called. stop_reason
+    says which ("done", "cycle", "instruction", "stopped").
+    `tracker` is the sim's ChangeTracker; only this thread may take() from
+    it while the worker runs.
+    """
+    def __init__(self, sim, tracker, frames, until_cycle: Optional[int] = None,
+                 until_instruction: Optional[int] = None, delay: float = 0.0):
+        super().__init__(daemon=True)
+        self.sim = sim
+        self.tracker = tracker
+        self.frames = frames
+        self.until_cycle = until_cycle
+        self.until_instruction = until_instruction
+        self.delay = delay   # seconds per cycle, 0 for full speed; may be changed while running
+        self.stop_reason = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _publish(self):
+        self.frames.put(capture(self.sim, self.tracker.take()))
+
+    def _reason(self) -> Optional[str]:
+        sim = self.sim
+        if self._stop_event.is_set():
+            return "stopped"
+        if sim.done():
+            return "done"
+        if self.until_cycle is not None and sim.cycle >= self.until_cycle:
+            return "cycle"
+        if self.until_instruction is not None and sim.completed_instructions >= self.until_instruction:
+            return "instruction"
+        return None
+
+    def run(self):
+        sim = self.sim
+        chunk = 1
+        published = perf_counter()
+        while (reason := self._reason()) is None:
+            if self.delay:
+                sim.run_cycle()
+                self._publish()
+                self._stop_event.wait(self.delay)
+                continue
+            limit = sim.cycle + chunk
+            if self.until_cycle is not None:
+                limit = min(limit, self.until_cycle)
+            t0 = perf_counter()
+            sim.run(limit, event_driven=True, max_instructions=self.until_instruction)
+            t1 = perf_counter()
+            # keep a slice around SLICE_SECONDS whatever the speed of the program
+            if t1 - t0 < SLICE_SECONDS / 2:
+                chunk *= 2
+            elif t1 - t0 > SLICE_SECONDS and chunk > 1:
+                chunk //= 2
+            if t1 - published >= PUBLISH_SECONDS:
+                self._publish()
+                published = t1
+        self.stop_reason = reason
+        self._publish()
@@ -0,0 +1,186 @@
+# stats.py
+# Opt-in instrumentation for Tomasulo: wall-clock time per pipeline stage
+# and machine counters (stall causes, ROB / RS occupancy histograms, FU
+# utilization).
+#
+#   sim = Tomasulo(program, config=cfg, stats=True)
+#   s = sim.run(10**6)            # returns a Stats snapshot when enabled
+#   print(s); print(s.diff(other))
+#
+# Enabling wraps the stage methods of that one instance (hooks.py) with
+# timers and samplers, so a core without stats runs exactly the plain code
+# and a core with stats runs the same cycle loop.
+import copy
+from time import perf_counter
+from typing import Dict, List
+
+from config import UNITS
+from hooks import Hooks
+from tomasulo import COUNTERS
+
+# stage_seconds keys: the Tomasulo methods that implement each stage
+STAGES = ("issue", "start_execution", "step_functional_units", "produce_result", "commit")
+
+
+class Stats:
+    """
+    Counters of one run. ROB / RS occupancy histograms are sampled at the
+    end of every cycle (index = entries in use), FU occupancy right after
+    dispatch. fu_busy_<unit> counts cycles in which a ready RS entry could
+    not start because every unit of its class was occupied. stall_cycles
+    holds the core's issue-stall counters plus those, filled in by snapshot().
+    counters holds the core's event counters (tomasulo.COUNTERS: branches,
+    LSQ forwarding / replays, cache hits and misses, CDB contention).
+    """
+    def __init__(self, sim):
+        cfg = sim.config
+        self.cycles = 0
+        self.instructions = 0
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.stage_seconds: Dict[str, float] = {s: 0.0 for s in STAGES}
+        self.stall_cycles: Dict[str, int] = {}
+        self.fu_busy: Dict[str, int] = {u: 0 for u in UNITS}
+        self.rob_occupancy: List[int] = [0] * (cfg.rob_size + 1)
+        self.rs_occupancy: Dict[str, List[int]] = {u: [0] * (cfg.rs_sizes[u] + 1) for u in UNITS}
+        self.fu_units: Dict[str, int] = dict(cfg.fu_counts)
+        self.fu_busy_unit_cycles: Dict[str, int] = {u: 0 for u in UNITS}
+
+    def sample(self, sim, n: int = 1):
+        """Account n end-of-cycle states like the current one."""
+        self.rob_occupancy[sim.rob.count] += n
+        for u, rs in zip(UNITS, sim.stations):
+            self.rs_occupancy[u][rs.busy_count()] += n
+
+    def sample_dispatch(self, sim, n: int = 1):
+        """Account n post-dispatch states like the current one."""
+        for u, rs, fu in zip(UNITS, sim.stations, sim.fus):
+            self.fu_busy_unit_cycles[u] += (fu.count - max(fu.free, 0)) * n
+            if not fu.can_accept() and rs.has_ready():
+                self.fu_busy[u] += n
+
+    def snapshot(self, sim) -> "Stats":
+        """Copy of the counters with cycle / instruction / stall totals filled in."""
+        s = copy.deepcopy(self)
+        s.cycles = sim.cycle
+        s.instructions = sim.completed_instructions
+        s.counters = sim.counters()
+        s.stall_cycles = dict(sim.stall_cycles)
+        s.stall_cycles.update({"fu_busy_" + u: n for u, n in self.fu_busy.items()})
+        return s
+
+    # --- derived metrics ---
+    @property
+    def ipc(self) -> float:
+        return self.instructions / self.cycles if self.cycles else 0.0
+
+    @property
+    def fu_utilization(self) -> Dict[str, float]:
+        """Fraction of unit-cycles in which a unit was occupied."""
+        return {u: self.fu_busy_unit_cycles[u] / (self.cycles * self.fu_units[u]) if self.cycles else 0.0
+                for u in UNITS}
+
+    @staticmethod
+    def _mean(hist: List[int]) -> float:
+        total = sum(hist)
+        return sum(i * n for i, n in enumerate(hist)) / total if total else 0.0
+
+    @property
+    def mean_rob_occupancy(self) -> float:
+        return self._mean(self.rob_occupancy)
+
+    @property
+    def mean_rs_occupancy(self) -> Dict[str, float]:
+        return {u: self._mean(h) for u, h in self.rs_occupancy.items()}
+
+    def flatten(self) -> Dict[str, float]:
+        """Scalar metrics as one flat dict (histograms as their means)."""
+        row = {"cycles": self.cycles, "instructions": self.instructions, "ipc": self.ipc,
+               **self.counters, "rob_occupancy": self.mean_rob_occupancy}
+        row.update({"rs_occupancy." + u: v for u, v in self.mean_rs_occupancy.items()})
+        row.update({"fu_utilization." + u: v for u, v in self.fu_utilization.items()})
+        row.update({"stall." + k: v for k, v in self.stall_cycles.items()})
+        row.update({"seconds." + k: v for k, v in self.stage_seconds.items()})
+        return row
+
+    def to_dict(self) -> dict:
+        return {"cycles": self.cycles, "instructions": self.instructions,
+                "counters": dict(self.counters), "stage_seconds": dict(self.stage_seconds), "stall_cycles": dict(self.stall_cycles),
+                "rob_occupancy": list(self.rob_occupancy),
+                "rs_occupancy": {u: list(h) for u, h in self.rs_occupancy.items()},
+                "fu_units": dict(self.fu_units), "fu_busy_unit_cycles": dict(self.fu_busy_unit_cycles)}
+
+    def diff(self, other: "Stats") -> Dict[str, tuple]:
+        """{metric: (self, other, other - self)} for every metric that differs."""
+        a, b = self.flatten(), other.flatten()
+        return {k: (a.get(k, 0), b.get(k, 0), b.get(k, 0) - a.get(k, 0))
+                for k in sorted(set(a) | set(b)) if a.get(k, 0) != b.get(k, 0)}
+
+    def __str__(self):
+        lines = [f"{self.cycles} cycles, {self.instructions} instructions, IPC {self.ipc:.3f}"]
+        total = sum(self.stage_seconds.values())
+        if total:
+            lines.append("  stage time:   " + ", ".join(f"{k} {100 * v / total:.0f}%" for k, v in self.stage_seconds.items()))
+        c = self.counters
+        if c["branches"]:
+            lines.append(f"  branches      {c['branches']}, {c['mispredictions']} mispredicted "
+                         f"({100 * c['mispredictions'] / c['branches']:.1f}%)")
+        if c["forwarded_loads"] or c["load_replays"]:
+            lines.append(f"  LSQ           {c['forwarded_loads']} loads forwarded, {c['load_replays']} replayed")
+        if c["cdb_stalls"]:
+            lines.append(f"  CDB           {c['cdb_stalls']} result-cycles waiting for the bus")
+        for level in ("l1", "l2"):
+            hits, misses = c[level + "_hits"], c[level + "_misses"]
+            if hits or misses:
+                lines.append(f"  {level.upper()} cache      {hits} hits, {misses} misses "
+                             f"({100 * misses / (hits + misses):.1f}% miss rate)")
+        lines.append("  stalls:       " + (", ".join(f"{k} {v}" for k, v in self.stall_cycles.items() if v) or "none"))
+        lines.append(f"  ROB occupancy {self.mean_rob_occupancy:.2f} of {len(self.rob_occupancy) - 1}")
+        lines.append("  RS occupancy  " + ", ".join(f"{u} {v:.2f}/{len(self.rs_occupancy[u]) - 1}"
+                                                   for u, v in self.mean_rs_occupancy.items()))
+        lines.append("  FU busy       " + ", ".join(f"{u} {100 * v:.0f}%" for u, v in self.fu_utilization.items()))
+        return "\n".join(lines)
+
+
+def instrument(sim, stats: Stats) -> Hooks:
+    """
+    Time the stage methods Tomasulo.run_cycle (and drain) call and sample
+    the counters around them, by wrapping them on this one instance. The
+    cycle loop itself stays the core's own.
+    """
+    hooks = Hooks()
+    for name in STAGES:
+        _time_stage(hooks, sim, name, stats.stage_seconds)
+    # FU occupancy right after dispatch, ROB / RS occupancy at the end of the cycle
+    # (commit is the last stage)
+    _after(hooks, sim, "start_execution", lambda: stats.sample_dispatch(sim))
+    _after(hooks, sim, "commit", lambda: stats.sample(sim))
+    inner = None
+
+    def skip_cycles(n):
+        # nothing changes in skipped cycles, so they all look like the current one
+        stats.sample_dispatch(sim, n)
+        inner(n)
+        stats.sample(sim, n)
+    inner = hooks.wrap(sim, "skip_cycles", skip_cycles)
+    return hooks
+
+
+def _time_stage(hooks, sim, name, seconds):
+    inner = None
+
+    def timed(*args):
+        t0 = perf_counter()
+        result = inner(*args)
+        seconds[name] += perf_counter() - t0
+        return result
+    inner = hooks.wrap(sim, name, timed)
+
+
+def _after(hooks, sim, name, fn):
+    inner = None
+
+    def call(*args):
+        result = inner(*args)
+        fn()
+        return result
+    inner = hooks.wrap(sim, name, call)
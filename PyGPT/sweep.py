@@ -0,0 +1,209 @@
+# sweep.py
+# Run one program against a grid of machine configurations on all cores.
+#
+#   python sweep.py sample --grid rob_size=8,16,32 --grid issue_width=1,2,4 \
+#       --grid fu_latencies.MUL=3,10 --out results.csv
+#
+# The program (a trace file, see trace_file.py, an assembly source, see
+# assembler.py, or "sample") is shipped to each worker process once, packed,
+# through the pool initializer; tasks only carry a config. Rows are written to the CSV in grid order as soon as all
+# earlier rows are done, so the output is identical for any worker count.
+# With --batch all configurations run in one process on the NumPy batch
+# engine (batch_engine.py) instead, which gives the same rows.
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional
+
+from config import Config, UNITS
+from instruction import PackedProgram
+from tomasulo import Tomasulo
+
+ASM_SUFFIXES = (".s", ".asm")   # program arguments assembled with assembler.py
+NESTED = ("rs_sizes", "fu_latencies", "fu_counts", "fu_initiation_intervals")
+
+
+def expand_grid(base: Config, grid: Dict[str, Iterable]) -> List[Config]:
+    """
+    Cartesian product of `grid` applied on top of `base`.
+    Keys are Config fields ("rob_size") or "<dict field>.<unit>"
+    ("rs_sizes.ALU", "fu_latencies.MUL"); the last key varies fastest.
+    """
+    keys = list(grid)
+    configs = []
+    for values in itertools.product(*(list(grid[k]) for k in keys)):
+        changes = {}
+        for key, value in zip(keys, values):
+            if "." in key:
+                field, unit = key.split(".", 1)
+                if field not in NESTED:
+                    raise ValueError(f"{field} is not a per-unit field")
+                if field not in changes:
+                    changes[field] = dict(getattr(base, field))
+                changes[field][unit] = value
+            else:
+                if not hasattr(base, key):
+                    raise ValueError(f"unknown config field {key!r}")
+                changes[key] = value
+        configs.append(replace(base, **changes))
+    return configs
+
+
+def flatten_config(cfg: Config) -> dict:
+    row = {}
+    for key, value in cfg.to_dict().items():
+        if key in NESTED:
+            for unit in UNITS:
+                row[f"{key}.{unit}"] = value[unit]
+        else:
+            row[key] = value
+    return row
+
+
+# --- worker side ---
+_program = None
+_mem_init = None
+
+
+def _init_worker(program_bytes: bytes, mem_init):
+    global _program, _mem_init
+    _program = PackedProgram.frombytes(program_bytes)
+    _mem_init = mem_init
+
+
+def simulate(program, cfg: Config, mem_init=None, max_cycles: int = 10 ** 7) -> dict:
+    """Run one configuration and return its result row."""
+    sim = Tomasulo(program, config=cfg)
+    for addr, values in (mem_init or ()):
+        sim.memory.store_range(addr, values)
+    sim.run(max_cycles=max_cycles, event_driven=True)
+    row = flatten_config(cfg)
+    row.update(cycles=sim.cycle, instructions=sim.completed_instructions,
+               ipc=round(sim.ipc(), 6), finished=sim.done(), **sim.counters())
+    for cause, n in sim.stall_cycles.items():
+        row["stall_" + cause] = n
+    return row
+
+
+def _run_task(index: int, cfg_dict: dict, max_cycles: int):
+    return index, simulate(_program, Config.from_dict(cfg_dict), _mem_init, max_cycles)
+
+
+def run_sweep(program, configs: List[Config], out_path: Optional[str] = None, workers: Optional[int] = None,
+              mem_init=None, max_cycles: int = 10 ** 7, progress=None) -> List[dict]:
+    """
+    Simulate `program` on every config using a process pool.
+    mem_init: optional list of (addr, [values]) written to memory before each run.
+    Returns the rows in config order and, with out_path, streams them into a CSV.
+    """
+    program_bytes = PackedProgram(program).tobytes()
+    rows: List[Optional[dict]] = [None] * len(configs)
+    out = writer = None
+    next_row = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(program_bytes, mem_init)) as pool:
+            futures = [pool.submit(_run_task, i, cfg.to_dict(), max_cycles) for i, cfg in enumerate(configs)]
+            for fut in as_completed(futures):
+                index, row = fut.result()
+                rows[index] = row
+                if progress:
+                    progress(index, row)
+                # flush the in-order prefix that is complete
+                while next_row < len(rows) and rows[next_row] is not None:
+                    if out_path is not None:
+                        if writer is None:
+                            out = open(out_path, "w", newline="")
+                            writer = csv.DictWriter(out, fieldnames=["run"] + list(rows[next_row]))
+                            writer.writeheader()
+                        writer.writerow({"run": next_row, **rows[next_row]})
+                        out.flush()
+                    next_row += 1
+    finally:
+        if out is not None:
+            out.close()
+    return rows
+
+
+def write_csv(out_path: str, rows: List[dict]):
+    with open(out_path, "w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=["run"] + list(rows[0]))
+        writer.writeheader()
+        for i, row in enumerate(rows):
+            writer.writerow({"run": i, **row})
+
+
+def _parse_value(text: str):
+    low = text.lower()
+    if low == "none":
+        return None
+    if low in ("true", "false"):
+        return low == "true"
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def _load_program(name: str):
+    if name == "sample":
+        from main import sample_program, SAMPLE_MEMORY
+        return sample_program(), [(addr, [v]) for addr, v in SAMPLE_MEMORY.items()]
+    if name.endswith(ASM_SUFFIXES):
+        from assembler import load_program
+        prog = load_program(name)
+        return prog.instructions, prog.data
+    from trace_file import TraceReader
+    with TraceReader(name) as tr:
+        return PackedProgram(tr), None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parallel machine-configuration sweep")
+    ap.add_argument("program", help='trace file (trace_file.py format), assembly source (.s/.asm) or "sample"')
+    ap.add_argument("--grid", action="append", default=[], metavar="KEY=V1,V2,...",
+                    help="config field to sweep, e.g. rob_size=8,16 or rs_sizes.ALU=2,4 (repeatable)")
+    ap.add_argument("--out", default="sweep.csv", help="CSV file for the results")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    ap.add_argument("--max-cycles", type=int, default=10 ** 7)
+    ap.add_argument("--mem-image", help="data image (int64 words) loaded at address 0 before each run")
+    ap.add_argument("--batch", action="store_true", help="simulate all configs in lockstep with the NumPy batch engine")
+    args = ap.parse_args(argv)
+
+    grid = {}
+    for item in args.grid:
+        key, sep, values = item.partition("=")
+        if not sep or not values:
+            ap.error(f"bad --grid {item!r}, expected KEY=V1,V2,...")
+        grid[key.strip()] = [_parse_value(v.strip()) for v in values.split(",")]
+    program, mem_init = _load_program(args.program)
+    if args.mem_image:
+        from array import array
+        words = array("q")
+        with open(args.mem_image, "rb") as f:
+            words.frombytes(f.read())
+        mem_init = [(0, words.tolist())] + (mem_init or [])
+    configs = expand_grid(Config(), grid)
+    if mem_init:
+        # memory must hold the data image / the program's data section
+        need = max(addr + len(values) for addr, values in mem_init)
+        configs = [c if c.mem_size >= need else replace(c, mem_size=need) for c in configs]
+    print(f"{len(configs)} configurations, {len(program)} instructions")
+
+    def progress(index, row):
+        print(f"  run {index}: {row['cycles']} cycles, IPC {row['ipc']:.3f}")
+
+    if args.batch:
+        from batch_engine import simulate_batch
+        rows = simulate_batch(program, configs, mem_init, args.max_cycles)
+        write_csv(args.out, rows)
+    else:
+        run_sweep(program, configs, args.out, args.workers, mem_init, args.max_cycles, progress)
+    print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# conftest.py
+# The simulator modules import each other by plain module name, so the
+# tests run with PyGPT/ on the path (python -m pytest PyGPT/tests).
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
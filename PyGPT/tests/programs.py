@@ -0,0 +1,115 @@
+# programs.py
+# Random programs and helpers shared by the tests.
+import random
+from array import array
+from dataclasses import replace
+
+from config import Config
+from functional import execute_program
+from instruction import Instruction, PackedProgram
+from memory import make_memory
+
+NUM_REGS = 16
+DATA_WORDS = 160
+
+
+def straight_line(seed: int, n: int = 60, loads=(0, 64), stores=(64, 128)):
+    """
+    ALU / MUL / LD / ST mix without branches. loads / stores are the
+    address ranges; the core does not order loads against older stores,
+    so only disjoint ranges give a timing-independent result.
+    """
+    r = random.Random(seed)
+    prog = []
+    for _ in range(n):
+        op = r.choice(["ADD", "SUB", "MUL", "DIV", "LD", "ST", "ADD", "LD"])
+        reg = lambda: f"R{r.randrange(NUM_REGS)}"
+        if op == "LD":
+            prog.append(Instruction("LD", dest=reg(), imm=r.randrange(*loads)))
+        elif op == "ST":
+            prog.append(Instruction("ST", src2=reg(), imm=r.randrange(*stores)))
+        else:
+            prog.append(Instruction(op, dest=reg(), src1=reg(), src2=reg()))
+    return prog
+
+
+def branchy(seed: int, loads=(0, 32), stores=(32, 64)):
+    """
+    Counted loops and straight blocks with forward branches and jumps.
+    R14 is the loop counter, R13 stays 0. loads / stores as for straight_line.
+    """
+    r = random.Random(seed)
+    prog = []
+
+    def body(n):
+        fix = []
+        for _ in range(n):
+            reg = lambda: f"R{r.randrange(12)}"
+            op = r.choice(["ADD", "SUB", "MUL", "DIV", "LD", "ST", "ADD", "LD", "BR", "BR", "JMP", "NOP"])
+            if op == "LD":
+                prog.append(Instruction("LD", dest=reg(), imm=r.randrange(*loads)))
+            elif op == "ST":
+                prog.append(Instruction("ST", src2=reg(), imm=r.randrange(*stores)))
+            elif op == "BR":
+                fix.append(len(prog))
+                prog.append(Instruction(r.choice(["BEQ", "BNE", "BLT", "BGE"]), src1=reg(),
+                                        src2=reg() if r.random() < 0.7 else None, imm=0))
+            elif op == "JMP":
+                fix.append(len(prog))
+                prog.append(Instruction("JMP", imm=0))
+            elif op == "NOP":
+                prog.append(Instruction("NOP"))
+            else:
+                prog.append(Instruction(op, dest=reg(), src1=reg(), src2=reg()))
+        return fix
+
+    for _ in range(r.randrange(1, 4)):
+        if r.random() < 0.6:
+            prog.append(Instruction("ADD", dest="R14", src1="R13", imm=r.randrange(1, 12)))
+            top = len(prog)
+            fix = body(r.randrange(2, 12))
+            end = len(prog)
+            prog.append(Instruction("SUB", dest="R14", src1="R14", imm=1))
+            prog.append(Instruction("BNE", src1="R14", imm=top))
+        else:
+            fix = body(r.randrange(2, 15))
+            end = len(prog)
+        for i in fix:
+            prog[i].imm = r.randrange(i + 1, end + 1)
+    return prog
+
+
+def memory_image(seed: int):
+    r = random.Random(seed + 1000)
+    return [r.randrange(-50, 50) for _ in range(DATA_WORDS)]
+
+
+def load_memory(sim, seed: int):
+    for addr, value in enumerate(memory_image(seed)):
+        sim.memory.store(addr, value)
+
+
+def golden(prog, seed: int):
+    """(registers, data words) after running prog on the functional model."""
+    regs = array("q", bytes(8 * NUM_REGS))
+    mem = make_memory("list", 256)
+    mem.store_range(0, memory_image(seed))
+    execute_program(PackedProgram(prog), 0, 10 ** 6, regs, mem)
+    return list(regs), mem.load_range(0, DATA_WORDS)
+
+
+def state(sim):
+    """(registers, data words) of a simulator."""
+    return ([sim.rf.read(f"R{i}") for i in range(NUM_REGS)],
+            [sim.memory.load(a) for a in range(DATA_WORDS)])
+
+
+def random_config(r: random.Random, **fields) -> Config:
+    cfg = Config(num_registers=NUM_REGS, mem_size=256, rob_size=r.choice([4, 8, 32]),
+                 rs_sizes={u: r.choice([1, 2, 4, 16]) for u in ("ALU", "MUL", "LDST")},
+                 fu_latencies={"ALU": r.choice([1, 2]), "MUL": r.choice([3, 10]), "LDST": r.choice([2, 5])},
+                 fu_counts={u: r.choice([1, 2, 4]) for u in ("ALU", "MUL", "LDST")},
+                 fu_initiation_intervals={u: r.choice([None, 1, 2]) for u in ("ALU", "MUL", "LDST")},
+                 issue_width=r.choice([1, 2, 4]), commit_width=r.choice([1, 2, 4]),
+                 dispatch_width=r.choice([None, 1, 2]))
+    return replace(cfg, **fields)
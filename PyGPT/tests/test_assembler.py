@@ -0,0 +1,111 @@
+# test_assembler.py
+import os
+
+import pytest
+
+import assembler
+from assembler import AsmError, assemble, load_program
+from main import SAMPLE_MEMORY, sample_program
+from run_program import main
+from trace_file import TraceReader
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE = os.path.join(HERE, "sample.s")
+
+SOURCE = """
+        .equ    N, 4            ; named constant
+        .data
+        .org    16
+xs:     .word   5, 7, -1, 0x10
+buf:    .space  N
+ys:     .word   xs, N+1
+        .text
+start:  LD      R1, xs
+        LD      R2, xs+1(R0)
+        add     r3, R1, R2
+        ADD     R4, R3, #N
+        ST      R4, 4(R6)
+        ST      R4, (R6)
+end:    NOP
+"""
+
+
+def _fields(instr):
+    return (instr.opcode, instr.dest, instr.src1, instr.src2, instr.imm)
+
+
+def test_syntax():
+    prog = assemble(SOURCE)
+    assert prog.labels == {"xs": 16, "buf": 20, "ys": 24, "start": 0, "end": 6}
+    assert prog.data == [(16, [5, 7, -1, 16]), (24, [16, 5])]
+    assert prog.data_end == 26
+    assert prog.num_registers == 7
+    assert [_fields(i) for i in prog.instructions] == [
+        ("LD", "R1", None, None, 16),
+        ("LD", "R2", "R0", None, 17),
+        ("ADD", "R3", "R1", "R2", None),
+        ("ADD", "R4", "R3", None, 4),
+        ("ST", None, "R6", "R4", 4),
+        ("ST", None, "R6", "R4", 0),
+        ("NOP", None, None, None, None),
+    ]
+
+
+@pytest.mark.parametrize("source, line, message", [
+    ("ADD R1, R2", 1, "takes 3 operands"),
+    ("NOP\nLD R1, nowhere", 2, "undefined symbol"),
+    ("x: NOP\nx: NOP", 2, "defined twice"),
+    ("ADD R1, R2, #0x100000000", 1, "32 bits"),
+    (".data\nADD R1, R2, R3", 2, "instruction in the .data section"),
+    (".word 1", 1, "outside the .data section"),
+    ("FOO 4", 1, "unknown instruction"),
+    ("ADD R1, X2, R3", 1, "expected a register"),
+])
+def test_errors_carry_the_line(source, line, message):
+    with pytest.raises(AsmError) as err:
+        assemble(source, "t.s")
+    assert err.value.line == line
+    assert str(err.value).startswith(f"t.s:{line}:")
+    assert message in str(err.value)
+
+
+def test_sample_matches_main():
+    prog = load_program(SAMPLE, cache=False)
+    assert [_fields(i) for i in prog.instructions] == [_fields(i) for i in sample_program()]
+    assert prog.data == [(10, [SAMPLE_MEMORY[10], SAMPLE_MEMORY[11]])]
+
+
+def test_cache(tmp_path, monkeypatch):
+    src = tmp_path / "k.s"
+    src.write_text(SOURCE)
+    cache = str(tmp_path / "cache")
+    first = load_program(str(src), cache_dir=cache)
+    assert len(os.listdir(cache)) == 1
+
+    def fail(*args):
+        raise AssertionError("assembled again")
+    monkeypatch.setattr(assembler, "assemble", fail)
+    again = load_program(str(src), cache_dir=cache)
+    assert [_fields(i) for i in again.instructions] == [_fields(i) for i in first.instructions]
+    assert (again.data, again.labels, again.num_registers) == (first.data, first.labels, first.num_registers)
+    monkeypatch.undo()
+
+    # an edited source gets its own entry, a damaged entry is rebuilt
+    src.write_text(SOURCE + "        NOP\n")
+    assert len(load_program(str(src), cache_dir=cache)) == len(first) + 1
+    assert len(os.listdir(cache)) == 2
+    for name in os.listdir(cache):
+        (tmp_path / "cache" / name).write_bytes(b"junk")
+    assert len(load_program(str(src), cache_dir=cache)) == len(first) + 1
+
+
+def test_run_program(tmp_path, capsys, monkeypatch):
+    monkeypatch.setenv("TOMASULO_ASM_CACHE", str(tmp_path / "cache"))
+    main([SAMPLE, "--set", "rob_size=4", "--dump", "10:13"])
+    out = capsys.readouterr().out
+    assert "6 instructions" in out
+    assert "mem[12] = 53" in out
+    trace = str(tmp_path / "sample.trc")
+    main([SAMPLE, "--emit-trace", trace])
+    with TraceReader(trace) as tr:
+        assert [_fields(i) for i in tr] == [_fields(i) for i in sample_program()]
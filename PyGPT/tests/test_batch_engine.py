@@ -0,0 +1,42 @@
+# test_batch_engine.py
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch_engine import BatchEngine, simulate_batch
+from config import Config
+from instruction import Instruction
+from sweep import simulate
+
+from programs import memory_image, random_config, straight_line
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_matches_scalar_core(seed):
+    r = random.Random(seed)
+    cfgs = [random_config(r) for _ in range(6)]
+    prog = straight_line(seed, loads=(0, 64), stores=(0, 64))
+    prog.insert(3, Instruction("NOP"))
+    # validate=True steps a scalar core next to every simulation and asserts they agree
+    BatchEngine(prog, cfgs, [(0, memory_image(seed))], validate=True).run(5000)
+
+
+def test_rows_match_sweep():
+    r = random.Random(99)
+    cfgs = [random_config(r) for _ in range(8)]
+    prog = straight_line(99)
+    mem_init = [(0, memory_image(99))]
+    assert simulate_batch(prog, cfgs, mem_init) == [simulate(prog, cfg, mem_init) for cfg in cfgs]
+
+
+def test_rejects_empty_batch():
+    with pytest.raises(ValueError):
+        BatchEngine(straight_line(0), [])
+
+
+@pytest.mark.parametrize("fields", [{"lsq": True}, {"l1_sets": 4}, {"cdb_width": 1}, {"use_rob": False}])
+def test_rejects_unmodelled_features(fields):
+    with pytest.raises(ValueError):
+        BatchEngine(straight_line(0), [Config(), Config(**fields)])
@@ -0,0 +1,80 @@
+# test_branches.py
+import os
+import random
+
+import pytest
+
+from assembler import load_program
+from branch_predictor import BimodalPredictor, GsharePredictor, StaticPredictor
+from config import Config
+from instruction import Instruction
+from tomasulo import Tomasulo
+
+from programs import branchy, golden, load_memory, random_config, state
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(prog, cfg, seed, event_driven):
+    sim = Tomasulo(prog, config=cfg)
+    load_memory(sim, seed)
+    sim.run(100000, event_driven=event_driven)
+    assert sim.done()
+    return sim
+
+
+@pytest.mark.parametrize("predictor", ["static", "bimodal", "gshare"])
+@pytest.mark.parametrize("seed", range(25))
+def test_speculation_matches_golden_model(predictor, seed):
+    cfg = random_config(random.Random(seed), branch_predictor=predictor, history_bits=4,
+                        mispredict_penalty=seed % 3)
+    prog = branchy(seed)
+    a = _run(prog, cfg, seed, event_driven=False)
+    b = _run(prog, cfg, seed, event_driven=True)
+    assert (a.cycle, a.stall_cycles, a.branch_count, a.mispredictions, state(a)) == \
+           (b.cycle, b.stall_cycles, b.branch_count, b.mispredictions, state(b))
+    assert state(a) == golden(prog, seed)
+    assert not a.branches
+
+
+def test_loop_predicts_well():
+    prog = [Instruction("ADD", dest="R1", src1="R0", imm=50),
+            Instruction("ADD", dest="R2", src1="R2", imm=3),
+            Instruction("SUB", dest="R1", src1="R1", imm=1),
+            Instruction("BNE", src1="R1", imm=1)]
+    for predictor in ("static", "bimodal", "gshare"):
+        sim = Tomasulo(prog, config=Config(branch_predictor=predictor, history_bits=2))
+        sim.run(100000)
+        assert sim.rf.read("R2") == 150
+        assert sim.branch_count == 50
+        assert 1 <= sim.mispredictions <= 4
+
+
+def test_predictors():
+    assert StaticPredictor().predict(10, 4)[0] and not StaticPredictor().predict(10, 11)[0]
+    bim = BimodalPredictor(16)
+    for _ in range(3):
+        taken, info = bim.predict(5, 9)
+        bim.update(info, False)
+    assert not bim.predict(5, 9)[0]
+    assert bim.predict(6, 9)[0]
+    # an alternating branch is learned through the global history
+    gs = GsharePredictor(64, history_bits=2)
+    hits = []
+    for i in range(60):
+        outcome = i % 2 == 0
+        taken, info = gs.predict(7, 0)
+        hits.append(taken == outcome)
+        if taken != outcome:
+            gs.repair(info, outcome)
+        gs.update(info, outcome)
+    assert all(hits[40:])
+
+
+def test_loop_example():
+    prog = load_program(os.path.join(HERE, "loop.s"), cache=False)
+    xs = prog.data[0][1]
+    sim = Tomasulo(prog.instructions, config=prog.fit(Config(branch_predictor="gshare")))
+    prog.load_memory(sim.memory)
+    sim.run(100000)
+    assert sim.memory.load_range(40, 2) == [sum(xs), max(xs)]
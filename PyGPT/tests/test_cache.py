@@ -0,0 +1,111 @@
+# test_cache.py
+import random
+
+import pytest
+
+from cache import CacheLevel, make_caches
+from checkpoint import CheckpointStore
+from config import Config
+from tomasulo import Tomasulo
+
+from programs import branchy, golden, load_memory, random_config, state, straight_line
+
+CACHES = {"l1_sets": 2, "l1_ways": 2, "l1_line_words": 2, "l1_mshrs": 2,
+          "l2_sets": 4, "l2_ways": 2, "l2_latency": 3, "memory_latency": 10}
+
+
+def _level(replacement="lru", **kw):
+    args = dict(sets=1, ways=2, line_words=4, latency=1, mshrs=2, replacement=replacement, memory_latency=10)
+    args.update(kw)
+    return CacheLevel("L1", **args)
+
+
+def test_hit_miss_timing():
+    c = _level()
+    assert c.read(0, 0) == 11        # miss: latency + memory
+    assert c.read(3, 5) == 11        # same line, fill still on its way
+    assert c.read(2, 20) == 21       # hit
+    assert (c.hits, c.misses, c.merged) == (1, 2, 1)
+
+
+@pytest.mark.parametrize("replacement, evicted", [("lru", 4), ("fifo", 0)])
+def test_replacement(replacement, evicted):
+    c = _level(replacement)
+    c.read(0, 0)
+    c.read(4, 0)
+    c.read(0, 100)                   # touch line 0 again
+    c.read(8, 100)                   # needs a victim
+    t = 200
+    assert c.read(evicted, t) == t + 11
+    assert c.read(8, t + 50) == t + 51
+
+
+def test_mshrs_limit_outstanding_misses():
+    c = _level(ways=4, mshrs=1)
+    assert c.read(0, 0) == 11
+    assert c.read(4, 0) == 22        # waits for the only MSHR
+    assert c.mshr_stall_cycles == 11
+
+
+def test_l2_and_writeback():
+    caches = make_caches(Config(l1_sets=1, l1_ways=1, l1_line_words=1, l2_sets=4, l2_ways=1, l2_line_words=1,
+                                l2_latency=3, memory_latency=10))
+    assert caches.read(0, 0) == 1 + 3 + 10
+    caches.write(1, 20)              # write-allocate evicts line 0
+    assert caches.read(0, 30) == 30 + 1 + 3   # L2 hit
+    assert caches.l1.writebacks == 1
+    assert caches.counters() == {"l1_hits": 0, "l1_misses": 3, "l2_hits": 1, "l2_misses": 1}
+    assert make_caches(Config()) is None
+
+
+@pytest.mark.parametrize("kw", [{"sets": 3}, {"line_words": 6}, {"ways": 0}, {"replacement": "plru"}])
+def test_bad_geometry(kw):
+    with pytest.raises(ValueError):
+        _level(**kw)
+
+
+@pytest.mark.parametrize("replacement", ["lru", "fifo", "random"])
+@pytest.mark.parametrize("seed", range(15))
+def test_core_with_caches(seed, replacement):
+    cfg = random_config(random.Random(seed), cache_replacement=replacement, **CACHES)
+    prog = branchy(seed) if seed % 2 else straight_line(seed)
+    runs = []
+    for event_driven in (False, True):
+        sim = Tomasulo(prog, config=cfg)
+        load_memory(sim, seed)
+        sim.run(100000, event_driven=event_driven)
+        assert sim.done()
+        runs.append((sim.cycle, sim.stall_cycles, sim.counters(), state(sim)))
+    assert runs[0] == runs[1]
+    assert runs[0][3] == golden(prog, seed)
+    if any(i.opcode in ("LD", "ST") for i in prog):
+        assert runs[0][2]["l1_hits"] + runs[0][2]["l1_misses"] > 0
+
+
+def test_miss_latency_shows_in_cycles():
+    prog = straight_line(4)
+    cycles = []
+    for memory_latency in (10, 100):
+        sim = Tomasulo(prog, config=Config(num_registers=16, **dict(CACHES, memory_latency=memory_latency)))
+        sim.run(100000)
+        cycles.append(sim.cycle)
+    assert cycles[1] > cycles[0]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_resume_from_checkpoint(tmp_path, seed):
+    cfg = random_config(random.Random(seed), cache_replacement="random", **CACHES)
+    prog = straight_line(seed)
+    ref = Tomasulo(prog, config=cfg)
+    load_memory(ref, seed)
+    ref.run(100000)
+    sim = Tomasulo(prog, config=cfg)
+    load_memory(sim, seed)
+    with CheckpointStore(str(tmp_path / "run.ckp")) as store:
+        while not sim.done():
+            store.save(sim)
+            sim.run(sim.cycle + 9)
+        for k in range(len(store)):
+            resumed = store.restore(prog, k)
+            resumed.run(100000)
+            assert (resumed.cycle, resumed.counters(), state(resumed)) == (ref.cycle, ref.counters(), state(ref))
@@ -0,0 +1,78 @@
+# test_cdb.py
+import random
+
+import pytest
+
+from cdb import FUPriorityArbiter, OldestFirstArbiter, RoundRobinArbiter
+from checkpoint import CheckpointStore
+from config import ARBITERS, Config
+from tomasulo import Tomasulo
+
+from programs import branchy, golden, load_memory, random_config, state, straight_line
+
+WAITING = [(1, 2, "a"), (2, 0, "b"), (3, 0, "c"), (4, 1, "d"), (5, 2, "e")]
+
+
+def test_arbiters():
+    assert OldestFirstArbiter().grant(WAITING, 2) == WAITING[:2]
+    assert [w[0] for w in FUPriorityArbiter([1, 2, 0]).grant(WAITING, 3)] == [4, 1, 5]
+    rr = RoundRobinArbiter(3)
+    assert [w[0] for w in rr.grant(WAITING, 2)] == [2, 4]
+    assert [w[0] for w in rr.grant(WAITING, 2)] == [1, 2]
+    assert rr.state() == 1
+    assert [w[0] for w in rr.grant(WAITING, 10)] == [4, 1, 2, 5, 3]
+
+
+def _run(prog, cfg, seed, event_driven):
+    sim = Tomasulo(prog, config=cfg)
+    load_memory(sim, seed)
+    sim.run(100000, event_driven=event_driven)
+    assert sim.done()
+    return sim
+
+
+@pytest.mark.parametrize("arbiter", ARBITERS)
+@pytest.mark.parametrize("seed", range(15))
+def test_limited_bus(seed, arbiter):
+    cfg = random_config(random.Random(seed), cdb_width=1 + seed % 2, cdb_arbiter=arbiter)
+    prog = branchy(seed) if seed % 2 else straight_line(seed)
+    a = _run(prog, cfg, seed, event_driven=False)
+    b = _run(prog, cfg, seed, event_driven=True)
+    assert (a.cycle, a.stall_cycles, a.counters(), state(a)) == (b.cycle, b.stall_cycles, b.counters(), state(b))
+    assert state(a) == golden(prog, seed)
+    assert not any(fu.latched for fu in a.fus)
+
+
+def test_narrow_bus_costs_cycles():
+    prog = straight_line(5, n=200)
+    base = Config(num_registers=16, rob_size=64, issue_width=4, commit_width=4,
+                  rs_sizes={"ALU": 16, "MUL": 16, "LDST": 16}, fu_counts={"ALU": 4, "MUL": 4, "LDST": 4})
+    wide = _run(prog, base, 5, event_driven=True)
+    narrow = _run(prog, Config(**dict(base.to_dict(), cdb_width=1)), 5, event_driven=True)
+    assert narrow.cycle > wide.cycle
+    assert narrow.counters()["cdb_stalls"] > 0
+    assert wide.counters()["cdb_stalls"] == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_resume_from_checkpoint(tmp_path, seed):
+    cfg = random_config(random.Random(seed), cdb_width=1, cdb_arbiter="round_robin")
+    prog = branchy(seed)
+    ref = _run(prog, cfg, seed, event_driven=True)
+    sim = Tomasulo(prog, config=cfg)
+    load_memory(sim, seed)
+    with CheckpointStore(str(tmp_path / "run.ckp")) as store:
+        while not sim.done():
+            store.save(sim)
+            sim.run(sim.cycle + 3)
+        for k in range(len(store)):
+            resumed = store.restore(prog, k)
+            resumed.run(100000)
+            assert (resumed.cycle, resumed.counters(), state(resumed)) == (ref.cycle, ref.counters(), state(ref))
+
+
+def test_bad_config():
+    with pytest.raises(ValueError):
+        Config(cdb_width=0)
+    with pytest.raises(ValueError):
+        Config(cdb_arbiter="fair")
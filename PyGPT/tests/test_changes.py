@@ -0,0 +1,76 @@
+# test_changes.py
+import random
+
+import pytest
+
+from hooks import Hooks
+from tomasulo import Tomasulo
+
+from programs import DATA_WORDS, load_memory, random_config, straight_line
+
+
+def _snapshot(sim):
+    rob = {e.tag: (e.ready, e.value, e.addr) for e in sim.rob}
+    rs = {(u, i): (e.busy, e.dest, e.Vj, e.Vk, e.Qj, e.Qk)
+          for u, station in enumerate(sim.stations) for i, e in enumerate(station.entries)}
+    regs = {i: (sim.rf.regs[i], sim.rf.reg_status[i]) for i in range(sim.rf.num_regs)}
+    mem = dict(enumerate(sim.memory.load_range(0, DATA_WORDS)))
+    return rob, rs, regs, mem
+
+
+def _changed(a, b):
+    return {k for k in set(a) | set(b) if a.get(k) != b.get(k)}
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_change_sets_cover_every_visible_change(seed):
+    sim = Tomasulo(straight_line(seed), config=random_config(random.Random(seed)))
+    load_memory(sim, seed)
+    tracker = sim.track_changes()
+    assert tracker.take().full
+    before = _snapshot(sim)
+    while not sim.done():
+        sim.run_cycle()
+        cs = tracker.take()
+        after = _snapshot(sim)
+        assert not cs.full
+        for changed, reported in zip(map(_changed, before, after), (cs.rob, cs.rs, cs.regs, cs.mem)):
+            assert changed <= reported
+        before = after
+
+
+def test_fast_forward_reports_full_and_close_unhooks():
+    sim = Tomasulo(straight_line(1), config=random_config(random.Random(1)))
+    tracker = sim.track_changes()
+    assert sim.track_changes() is tracker
+    tracker.take()
+    assert not tracker.take()
+    sim.fast_forward(5)
+    assert tracker.take().full
+    tracker.close()
+    assert sim.changes is None
+    assert "issue_one" not in sim.__dict__
+
+
+def test_hooks_chain_and_remove():
+    class Counter:
+        def bump(self, n):
+            return n + 1
+
+    c = Counter()
+    outer, inner = Hooks(), Hooks()
+    first = inner.wrap(c, "bump", lambda n: first(n) * 10)
+    second = outer.wrap(c, "bump", lambda n: second(n) + 5)
+    assert c.bump(1) == 25
+    # removed in reverse order: the plain method is back
+    outer.remove()
+    assert c.bump(1) == 20
+    inner.remove()
+    assert c.bump(1) == 2
+    assert "bump" not in c.__dict__
+    # removed out of order: the inner wrapper stays linked but passes through
+    outer, inner = Hooks(), Hooks()
+    first = inner.wrap(c, "bump", lambda n: first(n) * 10)
+    second = outer.wrap(c, "bump", lambda n: second(n) + 5)
+    inner.remove()
+    assert c.bump(1) == 7
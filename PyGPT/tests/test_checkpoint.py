@@ -0,0 +1,100 @@
+# test_checkpoint.py
+import random
+
+import pytest
+
+from checkpoint import CheckpointStore, load_checkpoint, save_checkpoint
+from instruction import Instruction, PackedProgram
+from memory import SparseMemory
+from tomasulo import Tomasulo
+
+from programs import branchy, golden, load_memory, random_config, state, straight_line
+
+
+def _sim(prog, seed):
+    sim = Tomasulo(prog, config=random_config(random.Random(seed)))
+    load_memory(sim, seed)
+    return sim
+
+
+def _result(sim):
+    return sim.cycle, sim.completed_instructions, sim.stall_cycles, state(sim)
+
+
+@pytest.mark.parametrize("gen", [straight_line, branchy])
+@pytest.mark.parametrize("seed", range(10))
+def test_resume_from_every_checkpoint(tmp_path, seed, gen):
+    prog = gen(seed)
+    ref = _sim(prog, seed)
+    ref.run(100000)
+    sim = _sim(prog, seed)
+    with CheckpointStore(str(tmp_path / "run.ckp")) as store:
+        while not sim.done():
+            store.save(sim)
+            sim.run(sim.cycle + 7)
+        assert _result(sim) == _result(ref)
+    with CheckpointStore(str(tmp_path / "run.ckp")) as store:
+        assert store.points[0] == (0, 0)
+        for k in range(len(store)):
+            resumed = store.restore(prog, k)
+            assert (resumed.cycle, resumed.pc) == store.points[k]
+            resumed.run(100000)
+            assert _result(resumed) == _result(ref)
+
+
+def test_unchanged_pages_are_not_stored_again(tmp_path):
+    sim = _sim(straight_line(1), 1)
+    with CheckpointStore(str(tmp_path / "run.ckp")) as store:
+        store.save(sim)
+        store.save(sim)
+        assert len(store.records[0][4]) == 1
+        assert store.records[1][4] == {}
+        with pytest.raises(IndexError):
+            store.restore([], 2)
+
+
+def test_single_checkpoint_file(tmp_path):
+    prog = straight_line(2)
+    sim = _sim(prog, 2)
+    sim.run(20)
+    path = str(tmp_path / "one.ckp")
+    save_checkpoint(sim, path)
+    save_checkpoint(sim, path)
+    restored = load_checkpoint(path, prog)
+    assert _result(restored) == _result(sim)
+
+
+@pytest.mark.parametrize("gen", [straight_line, branchy])
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("seed", range(5))
+def test_fast_forward_then_detailed(seed, packed, gen):
+    prog = gen(seed)
+    sim = _sim(PackedProgram(prog) if packed else prog, seed)
+    sim.run(8)
+    sim.drain()
+    # short branchy programs can end inside the fast-forwarded stretch
+    assert sim.fast_forward(20) == 20 or sim.done()
+    sim.run(100000)
+    assert sim.done()
+    assert state(sim) == golden(prog, seed)
+
+
+def test_fast_forward_needs_an_empty_pipeline():
+    sim = _sim(straight_line(0), 0)
+    sim.run(2)
+    assert not sim.rob.is_empty()
+    with pytest.raises(RuntimeError):
+        sim.fast_forward(1)
+
+
+def test_restore_keeps_a_memory_instance_backend(tmp_path):
+    # a memory instance passed to the constructor used to be saved as a 256-word list
+    prog = [Instruction("ADD", dest="R1", src1="R0", imm=7), Instruction("ST", src2="R1", imm=5000)]
+    sim = Tomasulo(prog, memory=SparseMemory(size=1 << 16))
+    sim.run(100)
+    path = str(tmp_path / "sparse.ckp")
+    save_checkpoint(sim, path)
+    restored = load_checkpoint(path, prog)
+    assert isinstance(restored.memory, SparseMemory)
+    assert restored.memory.size == 1 << 16
+    assert restored.memory.load(5000) == 7
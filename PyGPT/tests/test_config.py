@@ -0,0 +1,67 @@
+# test_config.py
+import random
+
+import pytest
+
+from config import Config
+from tomasulo import Tomasulo
+
+from programs import load_memory, random_config, state, straight_line
+
+
+@pytest.mark.parametrize("fields", [
+    {"rs_sizes": {"ALU": 4, "MUL": 2}},
+    {"fu_counts": {"ALU": 1, "MUL": 1, "LDST": 1, "FP": 1}},
+    {"rs_sizes": {"ALU": 0, "MUL": 2, "LDST": 2}},
+    {"fu_counts": {"ALU": 1, "MUL": 0, "LDST": 1}},
+    {"fu_latencies": {"ALU": 1, "MUL": 3, "LDST": -1}},
+    {"fu_initiation_intervals": {"ALU": None, "MUL": 0, "LDST": None}},
+    {"rob_size": 0},
+    {"issue_width": 0},
+    {"dispatch_width": 0},
+])
+def test_rejects_bad_fields(fields):
+    with pytest.raises(ValueError):
+        Config(**fields)
+
+
+def test_dict_round_trip():
+    cfg = random_config(random.Random(1)).with_pipelined_fus(2)
+    assert Config.from_dict(cfg.to_dict()) == cfg
+    assert set(cfg.fu_initiation_intervals.values()) == {2}
+
+
+def test_default_machine_matches_keyword_shorthands():
+    prog = straight_line(2)
+    a = Tomasulo(prog, reg_count=16, rob_size=8)
+    b = Tomasulo(prog, config=Config(num_registers=16, rob_size=8))
+    for sim in (a, b):
+        load_memory(sim, 2)
+        sim.run(100000)
+    assert (a.cycle, state(a)) == (b.cycle, state(b))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_wide_machines_compute_the_same_result(seed):
+    # widths, FU counts and latencies change timing, never the architectural result
+    prog = straight_line(seed)
+    narrow = Tomasulo(prog, config=Config(num_registers=16))
+    wide = Tomasulo(prog, config=random_config(random.Random(seed)))
+    for sim in (narrow, wide):
+        load_memory(sim, seed)
+        sim.run(100000)
+        assert sim.done()
+    assert state(wide) == state(narrow)
+
+
+def test_wider_issue_is_not_slower():
+    prog = straight_line(9, n=200)
+    cycles = []
+    for width in (1, 2, 4):
+        sim = Tomasulo(prog, config=Config(num_registers=16, rob_size=64, issue_width=width, commit_width=width,
+                                           rs_sizes={"ALU": 16, "MUL": 16, "LDST": 16},
+                                           fu_counts={"ALU": 4, "MUL": 4, "LDST": 4}))
+        load_memory(sim, 9)
+        sim.run(100000)
+        cycles.append(sim.cycle)
+    assert cycles[0] > cycles[1] >= cycles[2]
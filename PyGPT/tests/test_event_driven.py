@@ -0,0 +1,51 @@
+# test_event_driven.py
+# run(event_driven=True) must give the same cycle count and final state as
+# the per-cycle loop.
+import random
+
+import pytest
+
+from instruction import Instruction
+from tomasulo import Tomasulo
+
+from programs import branchy, load_memory, random_config, state, straight_line
+
+
+def _machine(prog, seed, **fields):
+    sim = Tomasulo(prog, config=random_config(random.Random(seed), **fields))
+    load_memory(sim, seed)
+    return sim
+
+
+def _run(prog, seed, event_driven):
+    sim = _machine(prog, seed)
+    sim.run(100000, event_driven=event_driven)
+    assert sim.done()
+    return sim
+
+
+@pytest.mark.parametrize("gen", [straight_line, branchy])
+@pytest.mark.parametrize("seed", range(40))
+def test_event_driven_matches_per_cycle(seed, gen):
+    prog = gen(seed)
+    a = _run(prog, seed, event_driven=False)
+    b = _run(prog, seed, event_driven=True)
+    assert (a.cycle, state(a)) == (b.cycle, state(b))
+
+
+def test_skips_idle_cycles():
+    prog = [Instruction("MUL", dest="R1", src1="R2", src2="R3")] * 4
+    sim = _machine(prog, 0, fu_latencies={"ALU": 1, "MUL": 100, "LDST": 2},
+                   fu_counts={"ALU": 1, "MUL": 1, "LDST": 1}, fu_initiation_intervals={"ALU": None, "MUL": None, "LDST": None})
+    cycles = []
+    sim.run_cycle = lambda verbose=False, step=sim.run_cycle: cycles.append(sim.cycle) or step(verbose)
+    sim.run(10000, event_driven=True)
+    assert sim.cycle >= 400
+    assert len(cycles) < 40
+
+
+def test_stuck_machine_jumps_to_max_cycles():
+    sim = Tomasulo([Instruction("ADD", dest="R1", src1="R0", src2="R0")])
+    sim.rob.is_full = lambda: True
+    sim.run(5000, event_driven=True)
+    assert sim.cycle == 5000
@@ -0,0 +1,72 @@
+# test_history.py
+import random
+
+import pytest
+
+from tomasulo import Tomasulo
+
+from programs import load_memory, random_config, state, straight_line
+
+
+def _sim(prog, seed):
+    sim = Tomasulo(prog, config=random_config(random.Random(seed)))
+    load_memory(sim, seed)
+    return sim
+
+
+def _view(sim):
+    return (sim.cycle, sim.pc, sim.completed_instructions, [(e.tag, e.ready, e.value) for e in sim.rob],
+            list(sim.rf.reg_status), state(sim))
+
+
+def _reference(prog, seed):
+    # the machine at the end of every cycle
+    sim = _sim(prog, seed)
+    views = [_view(sim)]
+    while not sim.done():
+        sim.run_cycle()
+        views.append(_view(sim))
+    return views
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_seek_rebuilds_every_cycle(seed):
+    prog = straight_line(seed, n=120)
+    views = _reference(prog, seed)
+    sim = _sim(prog, seed)
+    history = sim.record_history(keyframe_interval=16)
+    sim.run(100000, event_driven=True)
+    assert sim.cycle == len(views) - 1
+    assert len(history.keyframes) > 2
+    r = random.Random(seed)
+    targets = list(range(sim.cycle + 1)) + [r.randrange(sim.cycle + 1) for _ in range(30)]
+    for cycle in targets:
+        assert _view(history.seek(cycle)) == views[cycle]
+    # seeking does not disturb the live machine
+    assert _view(sim) == views[-1]
+
+
+def test_seek_across_fast_forward():
+    prog = straight_line(2, n=200)
+    sim = _sim(prog, 2)
+    history = sim.record_history(keyframe_interval=10)
+    sim.run(30)
+    sim.drain()
+    cycle, pc = sim.cycle, sim.pc
+    sim.fast_forward(50)
+    sim.run(100000)
+    # at the fast-forward cycle the later, fast-forwarded state wins
+    assert history.seek(cycle).pc == pc + 50
+    assert _view(history.seek(sim.cycle)) == _view(sim)
+
+
+def test_errors():
+    sim = _sim(straight_line(0), 0)
+    history = sim.record_history()
+    sim.run(20)
+    with pytest.raises(ValueError):
+        history.seek(21)
+    history.close()
+    assert sim.history is None
+    with pytest.raises(ValueError):
+        Tomasulo(iter(straight_line(0))).record_history()
@@ -0,0 +1,52 @@
+# test_instruction.py
+from instruction import Instruction, Opcode, PackedProgram, predecode, OPND_IMM, OPND_REG, UNIT_LDST
+from tomasulo import Tomasulo
+
+from programs import NUM_REGS, load_memory, state, straight_line
+
+
+def _fields(instr):
+    return (instr.opcode, instr.dest, instr.src1, instr.src2, instr.imm)
+
+
+def test_string_and_enum_forms_agree():
+    a = Instruction("mul", dest="R3", src1="r1", src2="R2")
+    b = Instruction(Opcode.MUL, dest=3, src1=1, src2=2)
+    assert _fields(a) == _fields(b) == ("MUL", "R3", "R1", "R2", None)
+    assert Instruction("BOGUS").opcode == "NOP"
+
+
+def test_register_zero():
+    instr = Instruction("ADD", dest=0, src1=0, src2=1)
+    assert (instr.rd, instr.rs1, instr.rs2) == (0, 0, 1)
+    assert _fields(instr) == ("ADD", "R0", "R0", "R1", None)
+    assert _fields(PackedProgram([instr])[0]) == _fields(instr)
+    assert predecode(Instruction("ST", src1=0, src2=0, imm=3))[4:] == (OPND_REG, 0, OPND_REG, 0)
+
+
+def test_packed_round_trip():
+    prog = straight_line(3) + [Instruction("NOP"), Instruction("ST", src1="R2", imm=-4)]
+    packed = PackedProgram(prog)
+    assert len(packed) == len(prog)
+    assert [_fields(i) for i in packed] == [_fields(i) for i in prog]
+    again = PackedProgram.frombytes(packed.tobytes())
+    assert [_fields(again[i]) for i in range(len(prog))] == [_fields(i) for i in prog]
+
+
+def test_predecode_store_operands():
+    d = predecode(Instruction("ST", src1="R4", src2="R5", imm=8))
+    assert d[1] == UNIT_LDST
+    assert d[3] is None
+    assert d[4:] == (OPND_REG, 4, OPND_REG, 5)
+    assert predecode(Instruction("ST", imm=8))[4:6] == (OPND_IMM, 0)
+
+
+def test_packed_program_runs_like_a_list():
+    prog = straight_line(4)
+    sims = []
+    for program in (prog, PackedProgram(prog)):
+        sim = Tomasulo(program, reg_count=NUM_REGS, rob_size=8)
+        load_memory(sim, 4)
+        sim.run(100000)
+        sims.append((sim.cycle, state(sim)))
+    assert sims[0] == sims[1]
@@ -0,0 +1,77 @@
+# test_lsq.py
+# With Config.lsq, loads and stores to the same addresses give the program
+# order result whatever the timing.
+import random
+
+import pytest
+
+from checkpoint import CheckpointStore
+from config import Config
+from instruction import Instruction
+from tomasulo import Tomasulo
+
+from programs import branchy, golden, load_memory, random_config, state, straight_line
+
+
+def _overlapping(seed):
+    if seed % 2:
+        return branchy(seed, loads=(0, 8), stores=(0, 8))
+    return straight_line(seed, loads=(0, 8), stores=(0, 8))
+
+
+def _sim(prog, seed):
+    cfg = random_config(random.Random(seed), lsq=True, mispredict_penalty=seed % 3)
+    sim = Tomasulo(prog, config=cfg)
+    load_memory(sim, seed)
+    return sim
+
+
+def _drained(lsq):
+    return not (lsq.loads or lsq.stores or lsq.load_pcs or lsq.loads_at or lsq.stores_at)
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_matches_golden_model(seed):
+    prog = _overlapping(seed)
+    results = []
+    for event_driven in (False, True):
+        sim = _sim(prog, seed)
+        sim.run(100000, event_driven=event_driven)
+        assert sim.done()
+        assert state(sim) == golden(prog, seed)
+        assert _drained(sim.lsq)
+        results.append((sim.cycle, sim.stall_cycles, sim.lsq.forwarded, sim.lsq.replays))
+    assert results[0] == results[1]
+
+
+def test_forwarding_and_replay():
+    # the slow MUL holds commit: the load of R2 reads the store still in the
+    # queue, the load of R4 runs before the store address is known and is replayed
+    prog = [Instruction("MUL", dest="R3", src1="R0", src2="R0"),
+            Instruction("ADD", dest="R1", src1="R0", imm=7),
+            Instruction("ST", src2="R1", imm=5),
+            Instruction("LD", dest="R2", imm=5),
+            Instruction("ST", src1="R3", src2="R1", imm=6),
+            Instruction("LD", dest="R4", imm=6)]
+    sim = Tomasulo(prog, config=Config(lsq=True, fu_latencies={"ALU": 1, "MUL": 20, "LDST": 2},
+                                       fu_counts={"ALU": 2, "MUL": 1, "LDST": 2}))
+    sim.run(1000)
+    assert (sim.rf.read("R2"), sim.rf.read("R4")) == (7, 7)
+    assert sim.lsq.forwarded == 2
+    assert sim.lsq.replays == 1
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_resume_from_checkpoint(tmp_path, seed):
+    prog = _overlapping(seed)
+    ref = _sim(prog, seed)
+    ref.run(100000)
+    sim = _sim(prog, seed)
+    with CheckpointStore(str(tmp_path / "run.ckp")) as store:
+        while not sim.done():
+            store.save(sim)
+            sim.run(sim.cycle + 5)
+        for k in range(len(store)):
+            resumed = store.restore(prog, k)
+            resumed.run(100000)
+            assert (resumed.cycle, resumed.lsq.replays, state(resumed)) == (ref.cycle, ref.lsq.replays, state(ref))
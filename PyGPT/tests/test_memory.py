@@ -0,0 +1,73 @@
+# test_memory.py
+import pytest
+
+from memory import MmapMemory, SparseMemory, make_memory, write_image
+from tomasulo import Tomasulo
+
+from programs import NUM_REGS, load_memory, state, straight_line
+
+
+@pytest.fixture(params=["list", "sparse", "mmap"])
+def memory(request):
+    mem = make_memory(request.param, 4096)
+    yield mem
+    if isinstance(mem, MmapMemory):
+        mem.close()
+
+
+def test_word_and_range_access(memory):
+    memory.store(7, -3)
+    memory.store_range(1020, range(10))
+    assert memory.load(7) == -3
+    assert memory.load(0) == 0
+    assert memory.load_range(1018, 14) == [0, 0] + list(range(10)) + [0, 0]
+    with pytest.raises(IndexError):
+        memory.load_range(4090, 10)
+    with pytest.raises(IndexError):
+        memory.store_range(-1, [1])
+
+
+def test_sparse_allocates_only_written_pages():
+    mem = SparseMemory(size=1 << 30, page_words=256)
+    assert mem.load(123456789) == 0
+    assert mem.resident_words() == 0
+    mem.store(123456789, 5)
+    mem.store_range(1000, [1] * 300)
+    assert mem.load(123456789) == 5
+    assert mem.resident_words() == 4 * 256
+    with pytest.raises(IndexError):
+        mem.store(1 << 30, 1)
+    with pytest.raises(ValueError):
+        SparseMemory(page_words=1000)
+
+
+def test_mmap_image_is_copy_on_write(tmp_path):
+    path = str(tmp_path / "data.img")
+    write_image(path, range(100))
+    mem = MmapMemory(image=path)
+    assert mem.size == 100
+    assert mem.load_range(40, 3) == [40, 41, 42]
+    mem.store(40, -1)
+    mem.close()
+    mem = MmapMemory(image=path)
+    assert mem.load(40) == 40
+    mem.close()
+    with pytest.raises(ValueError):
+        MmapMemory(size=200, image=path)
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        make_memory("disk")
+
+
+@pytest.mark.parametrize("kind", ["sparse", "mmap"])
+def test_core_runs_the_same_on_every_backend(kind):
+    prog = straight_line(6)
+    results = []
+    for memory in ("list", kind):
+        sim = Tomasulo(prog, reg_count=NUM_REGS, rob_size=8, memory=memory, mem_size=1024)
+        load_memory(sim, 6)
+        sim.run(100000)
+        results.append((sim.cycle, state(sim)))
+    assert results[0] == results[1]
@@ -0,0 +1,79 @@
+# test_pipeline_trace.py
+import io
+import random
+
+import pytest
+
+from pipeline_trace import export_kanata, main, read_trace
+from tomasulo import Tomasulo
+
+from programs import load_memory, random_config, state, straight_line
+
+
+def _sim(prog, seed):
+    sim = Tomasulo(prog, config=random_config(random.Random(seed)))
+    load_memory(sim, seed)
+    return sim
+
+
+def _fields(instr):
+    return (instr.opcode, instr.dest, instr.src1, instr.src2, instr.imm)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("seed", range(8))
+def test_binary_trace(tmp_path, seed, compress):
+    prog = straight_line(seed)
+    plain = _sim(prog, seed)
+    plain.run(100000, event_driven=True)
+    sim = _sim(prog, seed)
+    path = str(tmp_path / "run.ptr")
+    sim.enable_trace(path, compress=compress, batch=7)
+    sim.run(100000, event_driven=True)
+    sim.trace.close()
+    assert sim.trace is None
+    # tracing does not change the run
+    assert (sim.cycle, state(sim)) == (plain.cycle, state(plain))
+    recs = list(read_trace(path))
+    assert len(recs) == sim.completed_instructions == len(prog)
+    assert [r.pc for r in recs] == list(range(len(prog)))
+    assert [_fields(r.instr) for r in recs] == [_fields(i) for i in prog]
+    for r in recs:
+        assert r.issue <= r.dispatch <= r.complete <= r.commit <= sim.cycle
+    assert [r.commit for r in recs] == sorted(r.commit for r in recs)
+
+
+def test_text_trace_and_kanata(tmp_path):
+    prog = straight_line(1, n=30)
+    sim = _sim(prog, 1)
+    out = io.StringIO()
+    sim.enable_trace(out)
+    sim.run(100000)
+    sim.trace.close()
+    lines = out.getvalue().splitlines()
+    assert len(lines) == len(prog)
+    assert lines[0].startswith("#") and "commit=" in lines[0]
+
+    sim = _sim(prog, 1)
+    path = str(tmp_path / "run.ptr")
+    sim.enable_trace(path)
+    sim.run(100000)
+    sim.trace.close()
+    kanata = io.StringIO()
+    assert export_kanata(read_trace(path), kanata, batch=5) == len(prog)
+    log = kanata.getvalue().splitlines()
+    assert log[0] == "Kanata\t0004"
+    assert log[1].startswith("C=\t")
+    assert sum(line.startswith("I\t") for line in log) == len(prog)
+    assert sum(line.startswith("R\t") for line in log) == len(prog)
+    assert all(int(line.split("\t")[1]) > 0 for line in log if line.startswith("C\t"))
+
+    main([path, "--kanata", str(tmp_path / "run.kanata")])
+    assert (tmp_path / "run.kanata").read_text() == kanata.getvalue()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "junk.ptr"
+    path.write_bytes(b"\0" * 32)
+    with pytest.raises(ValueError):
+        list(read_trace(str(path)))
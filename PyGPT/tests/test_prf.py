@@ -0,0 +1,105 @@
+# test_prf.py
+# Config.use_rob = False: values live in a merged physical register file.
+import random
+
+import pytest
+
+from checkpoint import CheckpointStore
+from config import Config
+from register_file import PhysicalRegisterFile
+from tomasulo import Tomasulo
+
+from programs import NUM_REGS, branchy, golden, load_memory, random_config, state, straight_line
+
+
+def _cfg(seed, **fields):
+    return random_config(random.Random(seed), use_rob=False, physical_registers=NUM_REGS + 2 + seed % 20, **fields)
+
+
+def _run(prog, cfg, seed, event_driven=True):
+    sim = Tomasulo(prog, config=cfg)
+    load_memory(sim, seed)
+    sim.run(100000, event_driven=event_driven)
+    assert sim.done()
+    return sim
+
+
+@pytest.mark.parametrize("lsq", [False, True])
+@pytest.mark.parametrize("seed", range(25))
+def test_matches_rob_mode_and_golden_model(seed, lsq):
+    prog = branchy(seed) if seed % 2 else straight_line(seed)
+    cfg = _cfg(seed, lsq=lsq)
+    a = _run(prog, cfg, seed, event_driven=False)
+    b = _run(prog, cfg, seed, event_driven=True)
+    assert (a.cycle, a.stall_cycles, a.counters(), state(a)) == (b.cycle, b.stall_cycles, b.counters(), state(b))
+    assert state(a) == golden(prog, seed)
+    rf = a.rf
+    # every physical register not in the committed map is free again
+    assert sorted(rf.free) == sorted(set(range(rf.num_physical)) - set(rf.retired))
+    assert rf.reg_status == rf.retired
+
+
+def test_small_register_file_stalls_issue():
+    prog = straight_line(3, n=200)
+    small = _run(prog, Config(num_registers=NUM_REGS, use_rob=False, physical_registers=NUM_REGS + 1, rob_size=32), 3)
+    large = _run(prog, Config(num_registers=NUM_REGS, use_rob=False, physical_registers=NUM_REGS + 32, rob_size=32), 3)
+    assert small.stall_cycles["prf_full"] > 0
+    assert large.stall_cycles["prf_full"] == 0
+    assert small.cycle > large.cycle
+    assert state(small) == state(large)
+
+
+def test_register_file():
+    rf = PhysicalRegisterFile(4, 6)
+    rf.regs = [1, 2, 3, 4]
+    assert list(rf.regs) == [1, 2, 3, 4]
+    rf.write("R2", 30)
+    assert rf.read(2) == 30
+    with pytest.raises(ValueError):
+        PhysicalRegisterFile(4, 4)
+
+
+def test_status_is_the_producing_rob_tag():
+    rf = PhysicalRegisterFile(4, 6)
+    assert rf.get_status("R1") is None
+    p = rf.rename(1, 7)
+    assert rf.get_status("R1") == 7
+    rf.complete(p, 5)
+    assert rf.get_status(1) is None
+    with pytest.raises(TypeError):
+        rf.set_status(1, 7)
+
+
+def test_dump_state_prints_rename_map(capsys):
+    sim = _run(straight_line(0), _cfg(0), 0)
+    sim.dump_state()
+    out = capsys.readouterr().out
+    assert "Rename map:" in out and "RF status:" not in out
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_resume_from_checkpoint(tmp_path, seed):
+    cfg = _cfg(seed)
+    prog = branchy(seed)
+    ref = _run(prog, cfg, seed)
+    sim = Tomasulo(prog, config=cfg)
+    load_memory(sim, seed)
+    with CheckpointStore(str(tmp_path / "run.ckp")) as store:
+        while not sim.done():
+            store.save(sim)
+            sim.run(sim.cycle + 4)
+        for k in range(len(store)):
+            resumed = store.restore(prog, k)
+            resumed.run(100000)
+            assert (resumed.cycle, state(resumed)) == (ref.cycle, state(ref))
+
+
+def test_fast_forward():
+    prog = straight_line(8)
+    sim = Tomasulo(prog, config=_cfg(8))
+    load_memory(sim, 8)
+    sim.run(10)
+    sim.drain()
+    sim.fast_forward(20)
+    sim.run(100000)
+    assert state(sim) == golden(prog, 8)
@@ -0,0 +1,65 @@
+# test_sampling.py
+import random
+
+import pytest
+
+from sampling import main, run_sampled
+from tomasulo import Tomasulo
+from trace_file import write_trace
+
+from programs import load_memory, random_config, state, straight_line
+
+
+def _kernel(seed, repeats=40):
+    # a repeated block, so every sampling window sees the same behaviour
+    return straight_line(seed, n=50) * repeats
+
+
+def _sim(prog, seed):
+    sim = Tomasulo(prog, config=random_config(random.Random(seed)))
+    load_memory(sim, seed)
+    return sim
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_estimate_close_to_full_run(seed):
+    prog = _kernel(seed)
+    full = _sim(prog, seed)
+    full.run(10 ** 6, event_driven=True)
+    sim = _sim(prog, seed)
+    res = run_sampled(sim, period=200, window=50, warmup=50)
+    # the window of the last period runs into the end of the program
+    assert res.n == len(prog) // 200 - 1
+    assert res.instructions == len(prog)
+    assert res.detailed_instructions == len(prog) // 2
+    # functional and detailed execution compute the same architectural state
+    assert state(sim) == state(full)
+    assert abs(res.cycles - full.cycle) / full.cycle < 0.1
+    lo, hi = res.ipc_interval
+    assert lo <= res.ipc <= hi
+
+
+def test_bad_parameters():
+    with pytest.raises(ValueError):
+        run_sampled(_sim(_kernel(0), 0), period=100, window=60, warmup=50)
+    with pytest.raises(ValueError):
+        run_sampled(_sim(_kernel(0), 0), period=100, window=0)
+    with pytest.raises(ValueError):
+        run_sampled(_sim(_kernel(0, repeats=1), 0), period=100, window=50, warmup=10)
+
+
+def test_required_samples():
+    prog = straight_line(1, n=4000)
+    res = run_sampled(_sim(prog, 1), period=200, window=50, warmup=50)
+    assert res.relative_error > 0
+    assert res.required_samples(res.relative_error) in (res.n, res.n + 1)
+    assert res.required_samples(res.relative_error / 2) >= 4 * res.n - 1
+
+
+def test_cli(tmp_path, capsys):
+    trace = str(tmp_path / "prog.trc")
+    write_trace(trace, _kernel(2))
+    main([trace, "--period", "200", "--window", "50", "--warmup", "50", "--set", "rob_size=32", "--full"])
+    out = capsys.readouterr().out
+    assert "9 samples" in out
+    assert "full detailed:" in out
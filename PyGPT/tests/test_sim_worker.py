@@ -0,0 +1,66 @@
+# test_sim_worker.py
+import queue
+import random
+
+import pytest
+
+from changes import ChangeSet
+from sim_worker import SimWorker, capture
+from tomasulo import Tomasulo
+
+from programs import load_memory, random_config, straight_line
+
+
+def _sim(seed, n=300):
+    sim = Tomasulo(straight_line(seed, n=n), config=random_config(random.Random(seed)))
+    load_memory(sim, seed)
+    return sim
+
+
+def _run_worker(sim, **kwargs):
+    frames = queue.Queue()
+    worker = SimWorker(sim, sim.track_changes(), frames, **kwargs)
+    worker.start()
+    worker.join(30)
+    assert not worker.is_alive()
+    merged = frames.get_nowait()
+    while not frames.empty():
+        merged = merged.merge(frames.get_nowait())
+    return worker, merged
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_merged_frames_match_final_state(seed):
+    sim = _sim(seed)
+    worker, merged = _run_worker(sim)
+    assert worker.stop_reason == "done"
+    final = capture(sim, ChangeSet(full=True))
+    assert (merged.cycle, merged.completed, merged.pc, merged.done) == (final.cycle, final.completed, final.pc, True)
+    assert merged.regs == final.regs
+    assert merged.rs == final.rs
+    assert {t: row for t, row in merged.rob.items() if row is not None} == final.rob
+    for addr, value in merged.mem.items():
+        assert sim.memory.load(addr) == value
+
+
+def test_stop_conditions():
+    sim = _sim(0)
+    worker, merged = _run_worker(sim, until_cycle=50)
+    assert worker.stop_reason == "cycle"
+    assert sim.cycle == merged.cycle == 50
+    worker, _ = _run_worker(sim, until_instruction=120)
+    assert worker.stop_reason == "instruction"
+    assert sim.completed_instructions >= 120
+
+
+def test_slow_motion_and_stop():
+    sim = _sim(1)
+    frames = queue.Queue()
+    worker = SimWorker(sim, sim.track_changes(), frames, delay=0.001)
+    worker.start()
+    frames.get(timeout=10)
+    frames.get(timeout=10)
+    worker.stop()
+    worker.join(10)
+    assert worker.stop_reason == "stopped"
+    assert not sim.done()
@@ -0,0 +1,62 @@
+# test_stats.py
+import random
+
+import pytest
+
+from config import UNITS
+from stats import STAGES
+from tomasulo import Tomasulo
+
+from programs import branchy, load_memory, random_config, state, straight_line
+
+
+def _run(prog, cfg, seed, stats, event_driven=True):
+    sim = Tomasulo(prog, config=cfg, stats=stats)
+    load_memory(sim, seed)
+    result = sim.run(100000, event_driven=event_driven)
+    return sim, result
+
+
+def _counters(s):
+    d = s.to_dict()
+    del d["stage_seconds"]
+    return d
+
+
+@pytest.mark.parametrize("gen", [straight_line, branchy])
+@pytest.mark.parametrize("seed", range(20))
+def test_stats_do_not_change_the_run(seed, gen):
+    # branchy: the stats path used to produce results for entries a branch had just squashed
+    cfg = random_config(random.Random(seed))
+    prog = gen(seed)
+    plain, none = _run(prog, cfg, seed, stats=False)
+    sim, s = _run(prog, cfg, seed, stats=True)
+    assert none is None
+    assert (sim.cycle, sim.stall_cycles, state(sim)) == (plain.cycle, plain.stall_cycles, state(plain))
+    assert (s.cycles, s.instructions) == (sim.cycle, sim.completed_instructions)
+    assert s.counters["branches"] == plain.branch_count
+    assert sum(s.rob_occupancy) == s.cycles
+    assert all(sum(s.rs_occupancy[u]) == s.cycles for u in UNITS)
+    assert all(0 <= v <= 1 for v in s.fu_utilization.values())
+    assert set(s.stage_seconds) == set(STAGES)
+
+
+@pytest.mark.parametrize("gen", [straight_line, branchy])
+@pytest.mark.parametrize("seed", range(20))
+def test_skipped_cycles_are_counted(seed, gen):
+    cfg = random_config(random.Random(seed))
+    prog = gen(seed)
+    _, a = _run(prog, cfg, seed, stats=True, event_driven=False)
+    _, b = _run(prog, cfg, seed, stats=True, event_driven=True)
+    assert _counters(a) == _counters(b)
+
+
+def test_diff():
+    prog = straight_line(3)
+    r = random.Random(3)
+    _, a = _run(prog, random_config(r), 3, stats=True)
+    _, b = _run(prog, random_config(r), 3, stats=True)
+    d = a.diff(b)
+    assert d["cycles"] == (a.cycles, b.cycles, b.cycles - a.cycles)
+    assert "instructions" not in d
+    assert f"{a.cycles} cycles" in str(a)
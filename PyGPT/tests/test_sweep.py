@@ -0,0 +1,51 @@
+# test_sweep.py
+import csv
+
+import pytest
+
+from config import Config
+from sweep import expand_grid, main, run_sweep, simulate
+from trace_file import write_trace
+
+from programs import memory_image, straight_line
+
+
+def test_expand_grid_last_key_fastest():
+    configs = expand_grid(Config(), {"rob_size": [8, 16], "fu_latencies.MUL": [3, 10]})
+    assert [(c.rob_size, c.fu_latencies["MUL"]) for c in configs] == [(8, 3), (8, 10), (16, 3), (16, 10)]
+    assert all(c.fu_latencies["ALU"] == 1 for c in configs)
+    assert Config().fu_latencies["MUL"] == 3
+
+
+@pytest.mark.parametrize("grid", [{"bogus": [1]}, {"rob_size.ALU": [1]}, {"rob_size": [0]}])
+def test_expand_grid_rejects_bad_keys(grid):
+    with pytest.raises(ValueError):
+        expand_grid(Config(), grid)
+
+
+def test_rows_in_grid_order_and_match_serial_runs(tmp_path):
+    prog = straight_line(5)
+    mem_init = [(0, memory_image(5))]
+    configs = expand_grid(Config(num_registers=16), {"issue_width": [1, 2], "rs_sizes.MUL": [1, 4], "fu_counts.LDST": [1, 2]})
+    out = str(tmp_path / "sweep.csv")
+    rows = run_sweep(prog, configs, out, workers=2, mem_init=mem_init)
+    assert rows == [simulate(prog, cfg, mem_init) for cfg in configs]
+    with open(out, newline="") as f:
+        written = list(csv.DictReader(f))
+    assert [int(r["run"]) for r in written] == list(range(len(configs)))
+    assert [int(r["cycles"]) for r in written] == [r["cycles"] for r in rows]
+    assert [int(r["rs_sizes.MUL"]) for r in written] == [c.rs_sizes["MUL"] for c in configs]
+
+
+def test_cli_with_trace_file(tmp_path, capsys):
+    trace = str(tmp_path / "prog.trc")
+    write_trace(trace, straight_line(7))
+    out = str(tmp_path / "out.csv")
+    main([trace, "--grid", "rob_size=4,32", "--grid", "fu_initiation_intervals.MUL=none,1",
+          "--workers", "1", "--out", out])
+    with open(out, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["rob_size"], r["fu_initiation_intervals.MUL"]) for r in rows] == [
+        ("4", ""), ("4", "1"), ("32", ""), ("32", "1")]
+    assert all(r["finished"] == "True" for r in rows)
+    assert "4 configurations" in capsys.readouterr().out
@@ -0,0 +1,68 @@
+# test_trace_file.py
+import pytest
+
+from instruction import Instruction
+from tomasulo import Tomasulo
+from trace_file import CACHE_ENTRIES, TraceReader, write_trace
+
+from programs import NUM_REGS, load_memory, state, straight_line
+
+
+def _fields(instr):
+    return (instr.opcode, instr.dest, instr.src1, instr.src2, instr.imm)
+
+
+def _run(program, seed=0):
+    sim = Tomasulo(program, reg_count=NUM_REGS, rob_size=8)
+    load_memory(sim, seed)
+    sim.run(100000)
+    assert sim.done()
+    return sim
+
+
+def test_round_trip(tmp_path):
+    prog = straight_line(1) + [Instruction("NOP"), Instruction("LD", dest="R3", imm=-7)]
+    path = str(tmp_path / "prog.trc")
+    assert write_trace(path, iter(prog)) == len(prog)
+    with TraceReader(path) as trace:
+        assert len(trace) == len(prog)
+        assert [_fields(i) for i in trace] == [_fields(i) for i in prog]
+        assert _fields(trace[-1]) == _fields(prog[-1])
+        with pytest.raises(IndexError):
+            trace[len(prog)]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "junk.trc"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        TraceReader(str(path))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_trace_and_stream_replay_like_a_list(tmp_path, seed):
+    prog = straight_line(seed, n=200)
+    path = str(tmp_path / "prog.trc")
+    write_trace(path, prog)
+    ref = _run(prog, seed)
+    with TraceReader(path) as trace:
+        from_trace = _run(trace, seed)
+    from_stream = _run((i for i in prog), seed)
+    for sim in (from_trace, from_stream):
+        assert (sim.cycle, sim.pc, state(sim)) == (ref.cycle, ref.pc, state(ref))
+
+
+def test_decoded_instructions_are_bounded(tmp_path):
+    # distinct records everywhere: the decode cache must not grow with the trace
+    n = 3 * CACHE_ENTRIES
+    path = str(tmp_path / "long.trc")
+    write_trace(path, (Instruction("LD", dest="R1", imm=i) for i in range(n)))
+    with TraceReader(path) as trace:
+        assert sum(1 for _ in trace) == n
+        assert len(trace.cache) == CACHE_ENTRIES
+        sim = Tomasulo(trace, reg_count=NUM_REGS, mem_size=n)
+        sim.run(10 * n, event_driven=True)
+        assert sim.done()
+        assert len(trace.cache) == CACHE_ENTRIES
+        # a repeated record is still decoded once
+        assert trace[n - 1] is trace[n - 1]
@@ -1,210 +1,534 @@
 # tomasulo.py
-from instruction import Instruction
-from register_file import RegisterFile
+import heapq
+import sys
+from array import array
+from dataclasses import replace
+
+from instruction import Instruction, Opcode, PackedProgram, reg_name, UNIT_NONE, OPND_REG, OPND_IMM
+from register_file import RegisterFile, PhysicalRegisterFile, wrap64, INT64_MIN, INT64_MAX
 from reservation_station import ReservationStation, RSEntry
 from reorder_buffer import ReorderBuffer
 from functional_unit import FunctionalUnit
-from memory import Memory
+from memory import Memory, make_memory, MEMORY_KINDS
+from cdb import CDB, make_arbiter
+from frontend import FetchUnit
+from config import Config, UNITS
+from functional import execute, execute_program
+from branch_predictor import make_predictor, PendingBranch
+from lsq import LoadStoreQueue
+from cache import make_caches
 
-# Fix imports (we used module filenames)
-# If you put files together in same package directory, use relative import style or run from that folder.
+# machine event counters reported by Tomasulo.counters() (sweep rows, Stats)
+COUNTERS = ("branches", "mispredictions", "forwarded_loads", "load_replays",
+            "l1_hits", "l1_misses", "l2_hits", "l2_misses", "cdb_stalls")
 
-# For simplicity in this single-file example, I'll re-import classes directly:
-from reservation_station import ReservationStation, RSEntry
-from reorder_buffer import ReorderBuffer
-from functional_unit import FunctionalUnit
-from register_file import RegisterFile
-from memory import Memory
 
 class Tomasulo:
-    def __init__(self, program, reg_count=32, rob_size=16):
-        self.program = program[:]  # list of Instruction
-        self.pc = 0
+    def __init__(self, program, reg_count=32, rob_size=16, pipelined=False, fetch_buffer=16,
+                 memory="list", mem_size=256, config=None, stats=False, trace=None):
+        """
+        program: list of Instruction, a TraceReader, or any iterator of Instruction.
+        config: a Config describing the machine; the other keyword arguments
+        are shorthands for the common fields, only used when config is None.
+        memory may also be a ready memory instance.
+        stats: collect stage timings and machine counters (see stats.py).
+        trace: path of a binary pipeline trace to record (see pipeline_trace.py).
+        """
+        if config is None:
+            config = Config(num_registers=reg_count, rob_size=rob_size, fetch_buffer=fetch_buffer,
+                            memory=memory if isinstance(memory, str) else "list", mem_size=mem_size)
+            if pipelined:
+                config = config.with_pipelined_fus()
+        if not isinstance(memory, str):
+            # record the backend actually in use, so a checkpoint restores the same kind and size
+            kind = next((k for k, cls in MEMORY_KINDS.items() if isinstance(memory, cls)), config.memory)
+            config = replace(config, memory=kind, mem_size=memory.size)
+        self.config = config
+        self.fetch = FetchUnit(program, config.fetch_buffer)
+        self.program = self.fetch.program  # None when streaming from an iterator
+        self.pc = 0  # program index of the next instruction to issue (for a stream: instructions issued)
         self.cycle = 0
-        self.rf = RegisterFile(reg_count)
-        self.rob = ReorderBuffer(rob_size)
+        # registers: committed values + rename table to ROB tags, or a merged physical
+        # register file (then self.prf is self.rf, see register_file.py)
+        if config.use_rob:
+            self.rf = RegisterFile(config.num_registers)
+            self.prf = None
+        else:
+            self.rf = self.prf = PhysicalRegisterFile(config.num_registers, config.physical_registers)
+        self.rob = ReorderBuffer(config.rob_size)
         # reservation stations for ALU (add), MUL, LOAD/STORE
-        self.rs_add = ReservationStation("A", 4)
-        self.rs_mul = ReservationStation("M", 2)
-        self.rs_ldst = ReservationStation("L", 4)
+        self.rs_add = ReservationStation("A", config.rs_sizes["ALU"])
+        self.rs_mul = ReservationStation("M", config.rs_sizes["MUL"])
+        self.rs_ldst = ReservationStation("L", config.rs_sizes["LDST"])
         # functional units
-        self.fu_add = FunctionalUnit("ALU", latency=1, count=2)
-        self.fu_mul = FunctionalUnit("MUL", latency=3, count=1)
-        self.fu_ld = FunctionalUnit("LD", latency=2, count=1)  # load/store address computation and mem access combined
-        self.memory = Memory(256)
+        lat, cnt, ii = config.fu_latencies, config.fu_counts, config.fu_initiation_intervals
+        self.fu_add = FunctionalUnit("ALU", latency=lat["ALU"], count=cnt["ALU"], initiation_interval=ii["ALU"])
+        self.fu_mul = FunctionalUnit("MUL", latency=lat["MUL"], count=cnt["MUL"], initiation_interval=ii["MUL"])
+        self.fu_ld = FunctionalUnit("LD", latency=lat["LDST"], count=cnt["LDST"], initiation_interval=ii["LDST"])  # load/store address computation and mem access combined
+        # indexed by the UNIT_* class from the pre-decode pass
+        self.stations = (self.rs_add, self.rs_mul, self.rs_ldst)
+        self.fus = (self.fu_add, self.fu_mul, self.fu_ld)
+        # memory: backend name for make_memory ("list", "sparse", "mmap") or a ready instance
+        self.memory = make_memory(config.memory, config.mem_size) if isinstance(memory, str) else memory
+        # common data bus: tag -> waiting RS entries
+        self.cdb = CDB()
+        # with config.cdb_width, at most that many results broadcast per cycle
+        # and the arbiter picks them; the others wait in their FU's output latch
+        self.cdb_width = config.cdb_width
+        self.arbiter = make_arbiter(config)
+        self.cdb_stalls = 0         # cycles results spent waiting for the bus (per result)
         self.completed_instructions = 0
+        self.functional_instructions = 0  # executed by fast_forward, not timed
+        # cycles in which issue could not issue anything, by cause
+        # (mispredict: waiting out config.mispredict_penalty after a squash,
+        # prf_full: no free physical register without use_rob)
+        self.stall_cycles = {"rob_full": 0, "rs_full_ALU": 0, "rs_full_MUL": 0, "rs_full_LDST": 0,
+                             "mispredict": 0, "prf_full": 0}
+        # speculation: conditional branches between issue and commit, by ROB tag
+        self.predictor = make_predictor(config)
+        self.branches = {}
+        self.branch_count = 0       # committed conditional branches
+        self.mispredictions = 0     # committed branches that were mispredicted
+        self.redirect_until = 0     # issue waits until after this cycle (misprediction penalty)
+        self._packed = None         # a list program packed once for fast_forward
+        # with config.lsq loads are ordered against older stores, else they just read memory
+        self.lsq = LoadStoreQueue() if config.lsq else None
+        # with config.l1_sets a load's latency comes from the cache hierarchy, else it is fixed
+        self.caches = make_caches(config)
+        self.stats = None
+        if stats:
+            self.enable_stats()
+        self.trace = None
+        self.changes = None
+        self.history = None
+        if trace is not None:
+            self.enable_trace(trace)
+
+    def enable_stats(self):
+        """Start collecting a Stats object; the plain core pays nothing for this."""
+        from stats import Stats, instrument
+        if self.stats is None:
+            self.stats = Stats(self)
+            instrument(self, self.stats)
+        return self.stats
+
+    def enable_trace(self, out, compress=False, batch=65536):
+        """
+        Record every instruction's issue / dispatch / complete / commit cycle.
+        out is a file path (buffered binary log, optionally zlib compressed)
+        or a text stream (one line per instruction). Call self.trace.close()
+        when done; like stats, an untraced core pays nothing.
+        """
+        from pipeline_trace import PipelineTracer, BinaryTraceWriter, TextTraceWriter
+        if self.trace is not None:
+            self.trace.close()
+        writer = BinaryTraceWriter(out, batch, compress) if isinstance(out, str) else TextTraceWriter(out)
+        self.trace = PipelineTracer(self, writer)
+        return self.trace
+
+    def track_changes(self):
+        """Start recording dirty ROB / RS / register / memory state (see changes.py)."""
+        from changes import ChangeTracker
+        if self.changes is None:
+            self.changes = ChangeTracker(self)
+        return self.changes
+
+    def record_history(self, keyframe_interval=1000):
+        """Record keyframes and memory writes so earlier cycles can be rebuilt (see history.py)."""
+        from history import History
+        if self.history is None:
+            self.history = History(self, keyframe_interval)
+        return self.history
 
     def issue(self):
-        if self.pc >= len(self.program):
+        # in-order issue of up to issue_width instructions, stops at the first stall
+        if self.cycle <= self.redirect_until:
+            self._count_issue_stall(1)
             return
-        instr = self.program[self.pc]
-        if self.rob.is_full():
-            return  # stall: no ROB space
-        # choose RS and type
-        if instr.opcode in ("ADD", "SUB"):
-            rs = self.rs_add.find_free()
-            typ = "ALU"
-            fu = self.fu_add
-        elif instr.opcode in ("MUL", "DIV"):
-            rs = self.rs_mul.find_free()
-            typ = "MUL"
-            fu = self.fu_mul
-        elif instr.opcode in ("LD", "ST"):
-            rs = self.rs_ldst.find_free()
-            typ = "LOAD" if instr.opcode == "LD" else "STORE"
-            fu = self.fu_ld
+        for i in range(self.config.issue_width):
+            if not self.issue_one():
+                if i == 0:
+                    self._count_issue_stall(1)
+                break
+
+    def _count_issue_stall(self, n):
+        instr = self.fetch.peek()
+        if instr is None:
+            return  # nothing left to issue, not a stall
+        if self.cycle <= self.redirect_until:
+            self.stall_cycles["mispredict"] += n
+        elif self.rob.is_full():
+            self.stall_cycles["rob_full"] += n
+        elif self._prf_full(instr):
+            self.stall_cycles["prf_full"] += n
         else:
-            # unknown op - treat as NOP and advance pc
-            self.pc += 1
-            return
+            self.stall_cycles["rs_full_" + UNITS[instr.decoded[1]]] += n
 
+    def issue_one(self):
+        """Issue the next instruction; False if it stalled (or the program is done)."""
+        instr = self.fetch.peek()
+        if instr is None:
+            return False
+        if self.rob.is_full():
+            return False  # stall: no ROB space
+        # RS class, ROB type and operand kinds were resolved once by the pre-decode pass
+        op, unit, typ, rd, j_kind, j_val, k_kind, k_val = instr.decoded
+        if rd is not None and self.prf is not None and not self.prf.free:
+            return False  # stall: no physical register free
+        if unit == UNIT_NONE:
+            # unknown op - treat as NOP and advance pc; a jump only redirects fetch
+            self.fetch.pop()
+            if op == Opcode.JMP:
+                self._redirect(instr.imm)
+            else:
+                self.pc += 1
+            return True
+        rs = self.stations[unit].find_free()
         if rs is None:
-            return  # no RS free -> stall
+            return False  # no RS free -> stall
 
-        # allocate ROB entry
-        dest = instr.dest if instr.opcode != "ST" else None
-        rob_tag = self.rob.allocate(instr, dest, typ)
+        # allocate ROB entry (dest is the register index)
+        rob_tag = self.rob.allocate(instr, rd, typ)
         # fill RS entry
         rs.busy = True
         rs.op = instr.opcode
         rs.dest = rob_tag
         rs.instr = instr
 
-        # sources: set V or Q depending on register status (rob mapping)
-        def prepare_src(rs_entry, src_reg, field):
-            if src_reg is None:
-                setattr(rs_entry, field, None)
-                return
-            tag = self.rf.get_status(src_reg)
-            if tag is None:
-                # value ready
-                setattr(rs_entry, "V" + field[-1], self.rf.read(src_reg))
-                setattr(rs_entry, "Q" + field[-1], None)
-            else:
-                setattr(rs_entry, "Q" + field[-1], tag)
-                setattr(rs_entry, "V" + field[-1], None)
-
-        # For LD: imm is address; for ST: src1 may be address base, src2 may be value
-        if instr.opcode == "LD":
-            # we will compute address in execute; treat src1 as base reg optionally
-            if instr.src1:
-                prepare_src(rs, instr.src1, "Vj")
-            else:
-                rs.Vj = instr.imm
-                rs.Qj = None
-            rs.Qk = None
-            rs.Vk = None
-        elif instr.opcode == "ST":
-            # store: src1 = base (address), src2 = value register
-            if instr.src1:
-                prepare_src(rs, instr.src1, "Vj")
-            else:
-                rs.Vj = instr.imm
-                rs.Qj = None
-            if instr.src2:
-                prepare_src(rs, instr.src2, "Vk")
-            else:
-                rs.Vk = instr.imm
-                rs.Qk = None
-        else:
-            # ALU ops: src1, src2 are registers (or imm)
-            prepare_src(rs, instr.src1, "Vj")
-            prepare_src(rs, instr.src2, "Vk")
+        # sources: set V or Q depending on operand kind and register status (rob mapping)
+        # LD/ST: Vj = address base (register or 0), ST: Vk = value to store
+        rs.Vj, rs.Qj = self._read_operand(j_kind, j_val)
+        rs.Vk, rs.Qk = self._read_operand(k_kind, k_val)
+        # register as a waiter on the CDB (once per tag per entry)
+        if rs.Qj is not None:
+            self.cdb.subscribe(rs.Qj, rs)
+        if rs.Qk is not None and rs.Qk != rs.Qj:
+            self.cdb.subscribe(rs.Qk, rs)
+        if rs.Qj is None and rs.Qk is None:
+            rs.station.push_ready(rs)
 
         # update register status for destination (register will be written at commit from ROB)
-        if instr.dest:
-            self.rf.set_status(instr.dest, rob_tag)
+        if rd is not None:
+            if self.prf is None:
+                self.rf.reg_status[rd] = rob_tag
+            else:
+                self.rob.get_entry(rob_tag).preg = self.prf.rename(rd, rob_tag)
 
+        self.fetch.pop()
+        if typ == "BRANCH":
+            self._predict(rob_tag, instr)
+            return True
+        if typ == "LOAD" and self.lsq is not None:
+            self.lsq.issue_load(rob_tag, self.pc)
         self.pc += 1
+        return True
+
+    def _predict(self, tag, instr):
+        """Predict a just issued branch and continue fetching on the predicted path."""
+        if self.program is None:
+            raise ValueError(f"{instr!r}: branches need a program that can be indexed, not a one-shot iterator")
+        taken, info = self.predictor.predict(self.pc, instr.imm)
+        # the rename table as of the branch, restored if it turns out mispredicted
+        self.branches[tag] = PendingBranch(self.pc, instr.imm, taken, info, self.rf.reg_status[:])
+        if taken:
+            self._redirect(instr.imm)
+        else:
+            self.pc += 1
+
+    def _redirect(self, pc):
+        self.fetch.redirect(pc)
+        self.pc = pc
+
+    def _read_operand(self, kind, val):
+        """Return (V, Q) for a pre-decoded source operand."""
+        if kind == OPND_IMM:
+            return val, None
+        if kind != OPND_REG:
+            return None, None
+        prf = self.prf
+        if prf is not None:
+            p = prf.reg_status[val]
+            if prf.ready[p]:
+                return prf.values[p], None
+            return None, prf.producer[p]
+        tag = self.rf.reg_status[val]
+        if tag is None:
+            # value ready
+            return self.rf.regs[val], None
+        producer = self.rob.get_entry(tag)
+        if producer is not None and producer.ready:
+            # result already broadcast but not committed yet: read it from the ROB
+            return producer.value, None
+        return None, tag
 
     def start_execution(self):
-        # scan RS entries and dispatch to FUs if ready and FU available
-        for rs in self.rs_add:
-            if rs.busy and rs.is_ready() and self.fu_add.can_accept():
-                rs.exec_cycles_left = self.fu_add.latency
-                self.fu_add.assign(rs, self.fu_add.latency)
-        for rs in self.rs_mul:
-            if rs.busy and rs.is_ready() and self.fu_mul.can_accept():
-                rs.exec_cycles_left = self.fu_mul.latency
-                self.fu_mul.assign(rs, self.fu_mul.latency)
-        for rs in self.rs_ldst:
-            # loads/stores: need address ready (Vj or Qj resolved)
-            # treat as ready if Qj and (for store) Qk resolved too
-            for rs_e in self.rs_ldst.entries:
-                if rs_e.busy and rs_e.is_ready() and self.fu_ld.can_accept():
-                    # for loads/stores we expect address in Vj (or immediate)
-                    rs_e.exec_cycles_left = self.fu_ld.latency
-                    self.fu_ld.assign(rs_e, self.fu_ld.latency)
+        width = self.config.dispatch_width
+        if width is None:
+            # dispatch from each station's ready queue, oldest first, while its FU has room
+            for rscol, fu in zip(self.stations, self.fus):
+                while fu.can_accept():
+                    rs = rscol.pop_ready()
+                    if rs is None:
+                        break
+                    if fu is self.fu_ld and self.caches is not None:
+                        self._dispatch_memory(rs, fu)
+                        continue
+                    rs.exec_cycles_left = fu.latency
+                    fu.assign(rs, fu.latency)
+            return
+        # limited dispatch width: oldest ready entry (across stations) whose FU has room goes first
+        for _ in range(width):
+            best = None
+            for rscol, fu in zip(self.stations, self.fus):
+                if fu.can_accept() and rscol.has_ready():
+                    if best is None or rscol.ready[0][0] < best[0].ready[0][0]:
+                        best = (rscol, fu)
+            if best is None:
+                break
+            rscol, fu = best
+            rs = rscol.pop_ready()
+            if fu is self.fu_ld and self.caches is not None:
+                self._dispatch_memory(rs, fu)
+                continue
+            rs.exec_cycles_left = fu.latency
+            fu.assign(rs, fu.latency)
+
+    def _dispatch_memory(self, rs, fu):
+        """
+        Start a load or store with the cache model on. The LDST unit is busy
+        for its own latency (address generation); a load's result then waits
+        for the cache, so a miss does not hold up the loads behind it. A load
+        the LSQ will forward from an older store skips the cache; whether it
+        forwards is decided here, from the stores that have executed so far.
+        """
+        cycles = fu.latency
+        if rs.instr.op == Opcode.LD:
+            addr = rs.Vj + (rs.instr.imm or 0)
+            if self.lsq is None or not self.lsq.forwards(rs.dest, addr):
+                cycles = self.caches.read(addr, self.cycle + cycles) - self.cycle
+        rs.exec_cycles_left = cycles
+        fu.assign(rs, cycles, fu.latency)
 
     def step_functional_units(self):
         # advance FUs; collect finished RS entries
+        if self.cdb_width is not None:
+            return self._arbitrate()
         finished = []
         finished += self.fu_add.step()
         finished += self.fu_mul.step()
         finished += self.fu_ld.step()
         return finished
 
+    def _arbitrate(self):
+        """Advance FUs and return the finished entries that win the CDB this cycle."""
+        waiting = []
+        for unit, fu in enumerate(self.fus):
+            fu.latch(fu.step())
+            for e in fu.latched:
+                waiting.append((e.dest, unit, e))
+        if not waiting:
+            return waiting
+        if len(waiting) > self.cdb_width:
+            waiting.sort()
+            granted = self.arbiter.grant(waiting, self.cdb_width)
+            self.cdb_stalls += len(waiting) - len(granted)
+        else:
+            granted = waiting
+        fus = self.fus
+        finished = []
+        for _, unit, e in granted:
+            fus[unit].release(e)
+            finished.append(e)
+        return finished
+
     def produce_result(self, rs_entry):
         instr = rs_entry.instr
+        op = instr.op
         # compute result depending on opcode
-        def val(v):
-            return v
         result = None
         addr = None
-        if instr.opcode == "ADD":
+        if op == Opcode.ADD:
             result = rs_entry.Vj + rs_entry.Vk
-        elif instr.opcode == "SUB":
+        elif op == Opcode.SUB:
             result = rs_entry.Vj - rs_entry.Vk
-        elif instr.opcode == "MUL":
+        elif op == Opcode.MUL:
             result = rs_entry.Vj * rs_entry.Vk
-        elif instr.opcode == "DIV":
+        elif op == Opcode.DIV:
             result = rs_entry.Vj // rs_entry.Vk if rs_entry.Vk != 0 else 0
-        elif instr.opcode == "LD":
-            # address = base + imm (if imm present)
-            base = rs_entry.Vj if rs_entry.Vj is not None else 0
-            addr = base + (instr.imm or 0)
+        elif op == Opcode.LD:
+            # address = base (register or 0) + imm
+            addr = rs_entry.Vj + (instr.imm or 0)
             # perform actual memory read now and put into ROB as value
-            result = self.memory.load(addr)
-        elif instr.opcode == "ST":
-            # compute address and store value at commit. or compute now and put in ROB.
-            base = rs_entry.Vj if rs_entry.Vj is not None else 0
-            addr = base + (instr.imm or 0)
+            try:
+                result = self.memory.load(addr) if self.lsq is None else self.lsq.load(rs_entry.dest, addr, self.memory)
+            except IndexError:
+                if not self._speculative(rs_entry.dest):
+                    raise
+                result = 0   # wrong-path load, squashed when the older branch resolves
+        elif op == Opcode.ST:
+            # compute address now, the store itself happens at commit
+            addr = rs_entry.Vj + (instr.imm or 0)
             result = rs_entry.Vk  # value to be stored
+        else:
+            self._resolve_branch(rs_entry)
+            return
+        if result is not None and not (INT64_MIN <= result <= INT64_MAX):
+            result = wrap64(result)  # registers hold 64-bit values
+        if self.prf is not None:
+            p = self.rob.get_entry(rs_entry.dest).preg
+            if p is not None:
+                self.prf.complete(p, result)
         # write to ROB and broadcast
         self.rob.mark_ready(rs_entry.dest, value=result, addr=addr)
-        # broadcast to RS: update any Qj/Qk waiting for this ROB tag
-        for rscol in (self.rs_add, self.rs_mul, self.rs_ldst):
-            for e in rscol:
-                if e.busy:
-                    if e.Qj == rs_entry.dest:
-                        e.Vj = result
-                        e.Qj = None
-                    if e.Qk == rs_entry.dest:
-                        e.Vk = result
-                        e.Qk = None
+        # broadcast on the CDB: only the RS entries waiting for this ROB tag are touched
+        self.cdb.broadcast(rs_entry.dest, result)
+        if op == Opcode.ST and self.lsq is not None:
+            # younger loads that already read this address got a stale value: replay the oldest
+            victim = self.lsq.store(rs_entry.dest, addr, result)
+            if victim is not None:
+                rs_entry.clear()
+                self._replay(victim)
+                return
         # free this RS entry
         rs_entry.clear()
 
+    def _speculative(self, tag):
+        """True if an older branch is still unresolved (tag may be on a wrong path)."""
+        return any(t < tag and b.taken is None for t, b in self.branches.items())
+
+    def _resolve_branch(self, rs_entry):
+        tag, op, a, b = rs_entry.dest, rs_entry.instr.op, rs_entry.Vj, rs_entry.Vk
+        taken = a == b if op == Opcode.BEQ else a != b if op == Opcode.BNE else a < b if op == Opcode.BLT else a >= b
+        branch = self.branches[tag]
+        branch.taken = taken
+        self.rob.mark_ready(tag, value=int(taken), addr=branch.target)
+        rs_entry.clear()
+        if taken != branch.predicted:
+            self.squash(tag)
+            self.predictor.repair(branch.info, taken)
+            self._redirect(branch.target if taken else branch.pc + 1)
+            self.redirect_until = self.cycle + self.config.mispredict_penalty
+
+    def _replay(self, load_tag):
+        """Squash a load that read memory out of order and everything after it, and fetch it again."""
+        pc = self.lsq.load_pcs[load_tag]
+        self.lsq.replays += 1
+        self.squash(load_tag - 1)
+        self._redirect(pc)
+
+    def squash(self, tag):
+        """
+        Throw away everything younger than ROB tag `tag` (a mispredicted
+        branch, or the instruction before a replayed load): their ROB
+        entries (the tags are handed out again), RS entries, FU slots, CDB
+        subscriptions, LSQ entries and physical registers, and put the
+        rename table back to what it was right after `tag` issued.
+        """
+        rob = self.rob
+        younger = rob.next_tag - 1 - tag
+        if younger:
+            for station in self.stations:
+                for e in station.entries:
+                    if e.busy and e.dest > tag:
+                        e.clear()
+                station.ready = [r for r in station.ready if r[0] <= tag]
+                heapq.heapify(station.ready)
+            # squashed entries are no longer busy; units they occupy free up on schedule
+            for fu in self.fus:
+                if any(not e.busy for _, _, e in fu.in_flight):
+                    fu.in_flight = [r for r in fu.in_flight if r[2].busy]
+                    heapq.heapify(fu.in_flight)
+                for e in [e for e in fu.latched if not e.busy]:
+                    fu.release(e)
+            waiters = self.cdb.waiters
+            for t in list(waiters):
+                live = [w for w in waiters[t] if w.busy] if t <= tag else None
+                if live:
+                    waiters[t] = live
+                else:
+                    del waiters[t]
+            if self.prf is not None:
+                free = self.prf.free
+                for t in range(tag + 1, rob.next_tag):
+                    p = rob.get_entry(t).preg
+                    if p is not None:
+                        free.append(p)
+            rob.next_tag = tag + 1
+            rob.count -= younger
+            squashed = [t for t in self.branches if t > tag]
+            if squashed:
+                # speculative predictor history back to before the oldest squashed branch
+                self.predictor.rollback(self.branches[min(squashed)].info)
+                for t in squashed:
+                    del self.branches[t]
+            if self.lsq is not None:
+                self.lsq.squash(tag)
+        head = rob.head_tag
+        branch = self.branches.get(tag)
+        if self.prf is not None:
+            # the map snapshot, or the retirement map plus the surviving renames
+            status = self.prf.reg_status
+            if branch is not None:
+                status[:] = branch.rename
+            else:
+                status[:] = self.prf.retired
+                for e in rob:
+                    if e.preg is not None:
+                        status[e.dest] = e.preg
+        elif branch is not None:
+            # producers that committed since the branch issued wrote their registers
+            self.rf.reg_status[:] = [t if t is not None and t >= head else None for t in branch.rename]
+        else:
+            # no snapshot: the youngest surviving writer of each register
+            status = self.rf.reg_status
+            status[:] = [None] * len(status)
+            for e in rob:
+                if e.dest is not None:
+                    status[e.dest] = e.tag
+
     def commit(self):
+        # retire up to commit_width ready instructions from the ROB head, in order
+        for _ in range(self.config.commit_width):
+            if not self.commit_one():
+                break
+
+    def commit_one(self):
         head = self.rob.peek_head()
         if head and head.ready:
             committed = self.rob.commit_head()
-            if committed.typ == "ALU" or committed.typ == "LOAD":
+            if committed.typ in ("ALU", "MUL", "LOAD"):
                 # write to register file
-                if committed.dest:
-                    # only commit if the register still maps to this ROB tag
-                    if self.rf.get_status(committed.dest) == committed.tag:
-                        self.rf.write(committed.dest, committed.value)
-                        self.rf.set_status(committed.dest, None)
+                rd = committed.dest
+                if rd is not None and self.prf is not None:
+                    # the value is already in its physical register
+                    self.prf.retire(rd, committed.preg)
+                elif rd is not None:
+                    # always written, so a squash can map the register back to it;
+                    # the mapping is only cleared if no younger producer renamed it
+                    self.rf.regs[rd] = committed.value
+                    if self.rf.reg_status[rd] == committed.tag:
+                        self.rf.reg_status[rd] = None
+                if self.lsq is not None and committed.typ == "LOAD":
+                    self.lsq.retire_load(committed.tag)
             elif committed.typ == "STORE":
                 # actually write to memory
                 self.memory.store(committed.addr, committed.value)
+                if self.caches is not None:
+                    self.caches.write(committed.addr, self.cycle)
+                if self.lsq is not None:
+                    self.lsq.retire_store(committed.tag)
+            elif committed.typ == "BRANCH":
+                # train the predictor on correct-path outcomes only
+                branch = self.branches.pop(committed.tag)
+                self.predictor.update(branch.info, branch.taken)
+                self.branch_count += 1
+                self.mispredictions += branch.mispredicted
             self.completed_instructions += 1
+            return True
+        return False
 
     def run_cycle(self, verbose=False):
         self.cycle += 1
-        if verbose:
-            print(f"\n=== Cycle {self.cycle} ===")
         # Commit first? Classical Tomasulo does commit at end of cycle; we'll struct: issue -> exec -> writeback -> commit
         self.issue()
         # start execution (dispatch ready RS to FU)
@@ -212,21 +536,168 @@ class Tomasulo:
         # advance FUs
         finished = self.step_functional_units()
         # writeback: finished produce results and broadcast
+        # (an entry is no longer busy if an older branch finishing this cycle squashed it)
         for rs_entry in finished:
-            self.produce_result(rs_entry)
-        # commit stage: commit at most one per cycle (common Tomasulo variant)
+            if rs_entry.busy:
+                self.produce_result(rs_entry)
+        # commit stage: up to commit_width in order (1 by default, the common Tomasulo variant)
         self.commit()
         if verbose:
-            print("ROB:", self.rob)
-            print("RF status:", self.rf.reg_status)
-            print("Registers (R0..R7):", {f"R{i}": self.rf.read(f"R{i}") for i in range(8)})
-            print("RS ADD:", self.rs_add)
-            print("RS MUL:", self.rs_mul)
-            print("RS LDST:", self.rs_ldst)
-            print("Mem(0..8):", self.memory.mem[:9])
-
-    def run(self, max_cycles=200, verbose=False):
-        while (self.completed_instructions < len(self.program)) and self.cycle < max_cycles:
-            self.run_cycle(verbose=verbose)
+            self.dump_state()
+
+    def dump_state(self):
+        print(f"\n=== Cycle {self.cycle} ===")
+        print("ROB:", self.rob)
+        if self.prf is None:
+            print("RF status:", {reg_name(i): t for i, t in enumerate(self.rf.reg_status) if t is not None})
+        else:
+            print("Rename map:", {reg_name(i): f"P{p}" for i, p in enumerate(self.rf.reg_status)})
+        print("Registers (R0..R7):", {reg_name(i): self.rf.regs[i] for i in range(min(8, self.rf.num_regs))})
+        print("RS ADD:", self.rs_add)
+        print("RS MUL:", self.rs_mul)
+        print("RS LDST:", self.rs_ldst)
+        print("Mem(0..8):", self.memory.load_range(0, 9))
+
+    def drain(self, max_cycles=None):
+        """Run cycles without issuing until everything in flight has committed."""
+        while not self.rob.is_empty() and (max_cycles is None or self.cycle < max_cycles):
+            self.cycle += 1
+            self.start_execution()
+            for rs_entry in self.step_functional_units():
+                if rs_entry.busy:
+                    self.produce_result(rs_entry)
+            self.commit()
+
+    def fast_forward(self, n: int) -> int:
+        """
+        Execute the next n instructions functionally: registers and memory
+        are updated, the cycle count is not. The pipeline must be empty
+        (see drain). Returns the number of instructions executed.
+        The caches are not warmed: their contents stay as they were.
+        """
+        if not self.rob.is_empty():
+            raise RuntimeError("fast_forward needs an empty pipeline, call drain() first")
+        fetch = self.fetch
+        if fetch.program is not None:
+            # run straight off the packed records from pc, following branches
+            program = fetch.program
+            if not hasattr(program, "records"):
+                if self._packed is None:
+                    self._packed = PackedProgram(program)
+                program = self._packed
+            regs = self.rf.regs if self.prf is None else array("q", self.rf.regs)
+            done, pc = execute_program(program, self.pc, n, regs, self.memory)
+            self._redirect(pc)
+        else:
+            regs = self.rf.regs if self.prf is None else array("q", self.rf.regs)
+            done = execute(fetch.take(n), regs, self.memory)
+            self.pc += done
+        if self.prf is not None:
+            self.rf.regs = regs   # write the committed values back through the retirement map
+        self.functional_instructions += done
+        return done
+
+    def counters(self):
+        """The COUNTERS of this run so far, as a dict."""
+        lsq = self.lsq
+        out = {"branches": self.branch_count, "mispredictions": self.mispredictions,
+               "forwarded_loads": lsq.forwarded if lsq is not None else 0,
+               "load_replays": lsq.replays if lsq is not None else 0,
+               "l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0, "cdb_stalls": self.cdb_stalls}
+        if self.caches is not None:
+            out.update(self.caches.counters())
+        return out
+
+    def ipc(self):
+        return self.completed_instructions / self.cycle if self.cycle else 0.0
+
+    def done(self):
+        """True once the whole program has been issued and the ROB has drained."""
+        return self.rob.is_empty() and self.fetch.done()
+
+    def _can_issue(self):
+        # whether the next cycle can issue
+        if self.cycle < self.redirect_until:
+            return False
+        instr = self.fetch.peek()
+        if instr is None:
+            return False
+        if self.rob.is_full() or self._prf_full(instr):
+            return False
+        unit = instr.decoded[1]
+        if unit == UNIT_NONE:
+            return True  # unknown op is skipped as a NOP
+        return self.stations[unit].find_free() is not None
+
+    def _prf_full(self, instr):
+        # the instruction needs a physical register and none is free
+        return self.prf is not None and instr.decoded[3] is not None and not self.prf.free
+
+    def idle_cycles(self):
+        """
+        Number of upcoming cycles in which nothing but the clock can
+        change: nothing can issue, dispatch, finish or commit.
+        Issue only unblocks on a commit or a freed RS, dispatch only on a
+        broadcast or a freed FU unit, and all of those follow an FU event
+        (completion or a pipelined unit freeing up), so every cycle before
+        the earliest event is idle.
+        Returns None if the machine can never make progress again.
+        """
+        head = self.rob.peek_head()
+        if head is not None and head.ready:
+            return 0
+        if self._can_issue():
+            return 0
+        for rscol, fu in zip(self.stations, self.fus):
+            if fu.latched or fu.can_accept() and rscol.has_ready():
+                return 0
+        pending = [n for n in (fu.next_event() for fu in self.fus) if n is not None]
+        if self.cycle < self.redirect_until:
+            pending.append(self.redirect_until - self.cycle + 1)   # first cycle issue may resume
+        if not pending:
+            return None
+        return min(pending) - 1
+
+    def skip_cycles(self, n: int):
+        """Advance n idle cycles (see idle_cycles) without simulating them."""
+        self.cycle += n
+        for fu in self.fus:
+            fu.advance(n)
+        # issue is stalled for the same reason in every skipped cycle
+        # (idle_cycles never skips past the end of a misprediction penalty)
+        if self.cycle <= self.redirect_until or not self._can_issue():
+            self._count_issue_stall(n)
+
+    def run(self, max_cycles=200, verbose=False, event_driven=False, max_instructions=None):
+        """
+        Run until all instructions completed or max_cycles.
+        Termination does not need the program length, so streamed traces work.
+        With event_driven=True, stretches of idle cycles (e.g. waiting on a
+        long MUL/DIV or load with issue stalled) are jumped over in one step;
+        cycle counts and final state are the same as the per-cycle loop.
+        max_instructions also stops once completed_instructions reaches it
+        (commit_width > 1 may overshoot it by a few).
+        verbose prints one line per committed instruction (see
+        enable_trace); run_cycle(verbose=True) / dump_state() print the
+        whole machine state instead.
+        """
+        printer = None
+        if verbose and self.trace is None:
+            printer = self.enable_trace(sys.stdout)
+        while not self.done() and self.cycle < max_cycles:
+            if max_instructions is not None and self.completed_instructions >= max_instructions:
+                break
+            if event_driven:
+                idle = self.idle_cycles()
+                if idle != 0:
+                    limit = max_cycles - self.cycle
+                    self.skip_cycles(limit if idle is None else min(idle, limit))
+                    continue
+            self.run_cycle()
+        if printer is not None:
+            printer.close()
+        elif self.trace is not None:
+            self.trace.flush()
         if verbose:
             print(f"\nFinished after {self.cycle} cycles, completed {self.completed_instructions} instructions.")
+        return self.stats.snapshot(self) if self.stats is not None else None
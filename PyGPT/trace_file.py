@@ -0,0 +1,125 @@
+# trace_file.py
+# Compact on-disk instruction traces.
+#
+# Layout: 16-byte header, then one fixed-width 12-byte record per instruction
+#   header: magic b"TTRC", u16 version, u16 record size, u64 record count
+#   record: Instruction.RECORD (u8 opcode, u8 flags, u16 dest, u16 src1,
+#           u16 src2, i32 imm), registers stored as their index.
+# Traces are memory-mapped and decoded one record at a time, so replaying a
+# 10^8 instruction trace never holds more than the fetch buffer and a
+# bounded cache of decoded instructions (CACHE_ENTRIES) in memory.
+import mmap
+import struct
+from typing import Iterable, Optional
+
+from instruction import Instruction, InstructionCache
+
+MAGIC = b"TTRC"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+RECORD = Instruction.RECORD
+CACHE_ENTRIES = 4096   # decoded instructions kept per reader (loop bodies, hot records)
+
+
+class TraceWriter:
+    """Buffered trace writer; the record count is patched in on close()."""
+    def __init__(self, path: str, batch: int = 4096):
+        self.f = open(path, "wb")
+        self.f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        self.count = 0
+        self.batch = batch
+        self.pending = []
+
+    def write(self, instr: Instruction):
+        self.pending.append(instr.pack())
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.f.write(b"".join(self.pending))
+            self.count += len(self.pending)
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, self.count))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_trace(path: str, instructions: Iterable[Instruction]) -> int:
+    """Write any iterable of instructions (e.g. a generator) to `path`."""
+    with TraceWriter(path) as w:
+        for instr in instructions:
+            w.write(instr)
+    return w.count
+
+
+class TraceReader:
+    """
+    Memory-mapped, lazily decoded trace.
+    Behaves like a read-only sequence of Instruction, so it can be passed
+    straight to Tomasulo(program=...).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path, "rb")
+        self.mm: Optional[mmap.mmap] = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rec_size, count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path}: not a version {VERSION} trace file")
+        self.count = count
+        self.cache = InstructionCache(CACHE_ENTRIES)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i: int) -> Instruction:
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self.cache[RECORD.unpack_from(self.mm, HEADER.size + i * RECORD.size)]
+
+    def __iter__(self):
+        view = memoryview(self.mm)[HEADER.size:HEADER.size + self.count * RECORD.size]
+        try:
+            cache = self.cache
+            for fields in RECORD.iter_unpack(view):
+                yield cache[fields]
+        finally:
+            view.release()
+
+    def records(self, start: int = 0, stop: Optional[int] = None):
+        """Raw Instruction.RECORD tuples of instructions start..stop-1 (no Instruction objects)."""
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return
+        view = memoryview(self.mm)[HEADER.size + start * RECORD.size:HEADER.size + stop * RECORD.size]
+        try:
+            yield from RECORD.iter_unpack(view)
+        finally:
+            view.release()
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"<TraceReader {self.path} {self.count} instructions>"